@@ -129,6 +129,7 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 INSTALLED_APPS += [
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'projects',
@@ -140,6 +141,71 @@ MIDDLEWARE.insert(0, 'corsheaders.middleware.CorsMiddleware')
 CORS_ALLOW_ALL_ORIGINS = True
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
-    'PAGE_SIZE': 10
-}
\ No newline at end of file
+    # limit/offset by default, keyset pages when the request passes ?cursor=
+    'DEFAULT_PAGINATION_CLASS': 'projects.pagination.KeysetPagination',
+    'PAGE_SIZE': 10,
+    # JSON encoded and decoded with orjson, falling back to the stdlib
+    # json module when it is not installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'projects.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'projects.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Response cache for the polled read endpoints (see projects/cache.py).
+# RESPONSE_CACHE_BACKEND is locmem, file or redis; redis needs the redis
+# package and a redis:// RESPONSE_CACHE_LOCATION shared by all workers.
+# locmem only suits a single process, writes made by other processes (the
+# run_jobs worker included) never invalidate it.
+RESPONSE_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': RESPONSE_CACHE_BACKENDS[os.getenv('RESPONSE_CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.getenv('RESPONSE_CACHE_LOCATION', 'responses'),
+    },
+}
+
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True') == 'True'
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+# Portfolio stats are not invalidated by writes, they expire after this many seconds
+STATS_CACHE_TIMEOUT = int(os.getenv('STATS_CACHE_TIMEOUT', '60'))
+
+# Requests the async read views (projects/async_views.py) let work with the
+# database at once in each process, each of them holds a connection
+ASYNC_DATABASE_CONCURRENCY = int(os.getenv('ASYNC_DATABASE_CONCURRENCY', '16'))
+
+# Live project updates streamed by /api/projects/events/ (projects/live.py).
+# LIVE_EVENTS_BROKER is local, reaching the streams of the writer's process
+# only, or postgres, sharing updates between processes with LISTEN/NOTIFY.
+LIVE_EVENTS_BROKERS = {
+    'local': 'projects.live.LocalBroker',
+    'postgres': 'projects.live.PostgresBroker',
+}
+LIVE_EVENTS_BROKER = LIVE_EVENTS_BROKERS[os.getenv('LIVE_EVENTS_BROKER', 'local')]
+# Seconds between keep-alive comments on an idle stream
+LIVE_EVENTS_HEARTBEAT = int(os.getenv('LIVE_EVENTS_HEARTBEAT', '15'))
+# Projects a stream may fall behind on before it is told to resync
+LIVE_EVENTS_MAX_PENDING = int(os.getenv('LIVE_EVENTS_MAX_PENDING', '1000'))
+
+# Change feed (/api/projects/changes/, projects/changes.py). Hard deletes
+# stay in the change log this many days, see manage.py prune_changes.
+CHANGE_LOG_RETENTION_DAYS = int(os.getenv('CHANGE_LOG_RETENTION_DAYS', '30'))
+
+# Background jobs (projects/jobs.py, run by manage.py run_jobs). A worker
+# renews its lease on a job after every chunk, a job whose lease expired is
+# taken over by another worker, up to JOB_MAX_ATTEMPTS times.
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '60'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
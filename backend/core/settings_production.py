@@ -0,0 +1,58 @@
+"""
+Production settings for core project, used by the Docker image:
+
+    DJANGO_SETTINGS_MODULE=core.settings_production
+
+Everything not set here comes from core/settings.py.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import ASYNC_DATABASE_CONCURRENCY, CACHES, DATABASES, LIVE_EVENTS_BROKERS, RESPONSE_CACHE_BACKENDS
+
+# DEBUG also keeps every query run in memory
+DEBUG = False
+
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+
+# Opening a Postgres connection for every request costs a few milliseconds.
+# Each process keeps a pool of open connections instead (psycopg 3), lent
+# to a request and handed back when it finishes. Connections are checked
+# before they are reused, so ones the server dropped are replaced.
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+if os.getenv('DATABASE_POOL', 'True') == 'True':
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', '2')),
+            # at least ASYNC_DATABASE_CONCURRENCY for uvicorn workers, the
+            # threads per process for sync ones
+            'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', ASYNC_DATABASE_CONCURRENCY)),
+            # seconds a request waits for a connection before failing
+            'timeout': float(os.getenv('DATABASE_POOL_TIMEOUT', '10')),
+        },
+    }
+else:
+    # Without the pool connections are kept open between requests, only for
+    # sync workers: under ASGI every request runs in a thread of its own
+    # and each would keep its own connection open
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('CONN_MAX_AGE', '60'))
+
+# Every worker process serves event streams, writes made in one must reach
+# the streams of the others
+LIVE_EVENTS_BROKER = LIVE_EVENTS_BROKERS[os.getenv('LIVE_EVENTS_BROKER', 'postgres')]
+
+# Cached responses are invalidated by the process handling the write (or
+# the run_jobs worker), in the cache it can see. With locmem every process
+# has a cache of its own and the others keep serving stale lists, stats
+# and 304s until RESPONSE_CACHE_TIMEOUT, so the response cache needs a
+# shared RESPONSE_CACHE_BACKEND (redis, or file on a volume all processes
+# mount). Without one it is off, and asking for it is an error.
+_shared_response_cache = CACHES['responses']['BACKEND'] != RESPONSE_CACHE_BACKENDS['locmem']
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', str(_shared_response_cache)) == 'True'
+if RESPONSE_CACHE_ENABLED and not _shared_response_cache:
+    raise ImproperlyConfigured(
+        "RESPONSE_CACHE_ENABLED needs a RESPONSE_CACHE_BACKEND shared by all processes (redis or file), not locmem"
+    )
@@ -0,0 +1,63 @@
+# Gunicorn settings for the production container:
+#
+#     gunicorn -c gunicorn.conf.py core.asgi:application
+#
+# Workers are uvicorn workers serving the ASGI application. Each one runs an
+# event loop, so a single process holds thousands of open connections, idle
+# dashboards between polls or slow clients, without a thread per
+# connection, and the read endpoints in projects/urls.py await the database
+# through the async ORM. Everything can be overridden from the environment.
+#
+# For the previous thread-per-request setup run the WSGI application with
+# GUNICORN_WORKER_CLASS=sync (or gthread with GUNICORN_THREADS):
+#
+#     GUNICORN_WORKER_CLASS=sync gunicorn -c gunicorn.conf.py core.wsgi:application
+#
+# Every open connection is a file descriptor, raise the container's
+# `ulimit -n` above the number of connections you expect per process.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
+
+# Processes and threads follow the CPU count. A uvicorn worker's event loop
+# keeps one core busy, so one per core. Sync workers serve one request at a
+# time and wait on the database, so 2 x cores + 1, and gthread workers get
+# 2 x cores threads each.
+cores = multiprocessing.cpu_count()
+uvicorn_workers = 'uvicorn' in worker_class.lower()
+workers = int(os.getenv('WEB_CONCURRENCY', cores if uvicorn_workers else 2 * cores + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 2 * cores if worker_class == 'gthread' else 1))
+
+# Each process lends out at most DATABASE_POOL_MAX_SIZE connections (see
+# core/settings_production.py), uvicorn workers let ASYNC_DATABASE_CONCURRENCY
+# requests use one at once. Keep workers x pool size below the database's
+# max_connections, and the pool at least as large as the threads.
+
+# Import the application once in the master before forking: workers start
+# faster and share its memory. Code changes need a restart rather than a
+# HUP, as the master already holds the old code.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Seconds an idle keep-alive connection is held open between requests.
+# Dashboards poll every 30-60s, so keep them longer than that to save the
+# reconnect. Sync workers ignore it and close after every response.
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '75'))
+
+# Pending connections the kernel queues while the workers are busy
+backlog = int(os.getenv('GUNICORN_BACKLOG', '2048'))
+
+# A worker silent for this long is restarted, requests are given
+# graceful_timeout to finish on reload or shutdown
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Recycle workers now and then, jittered so they do not restart together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
@@ -0,0 +1,87 @@
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+
+# Semaphore per event loop, see database_slots()
+_database_slots = weakref.WeakKeyDictionary()
+
+
+def database_slots():
+    """
+    Bounds how many async view requests of this process work with the
+    database at once. Under ASGI every request runs its queries in a
+    thread with its own connection, so without a bound a burst of
+    connections would open as many database connections. Requests over the
+    limit wait on the event loop, which costs next to nothing.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _database_slots.get(loop)
+    if slots is None:
+        slots = _database_slots[loop] = asyncio.Semaphore(settings.ASYNC_DATABASE_CONCURRENCY)
+    return slots
+
+
+# A DRF Response after rendering. Without a render() method Django's async
+# handler does not hop to a thread to render it again. Keeps .data.
+class RenderedResponse(HttpResponse):
+    def __init__(self, response):
+        super().__init__(response.content, status=response.status_code)
+        for header, value in response.items():
+            self[header] = value
+        self.data = response.data
+
+
+def rendered(response):
+    if not hasattr(response, 'render'):
+        return response
+    response.render()
+    return RenderedResponse(response)
+
+
+def async_read_view(sync_view, handler):
+    """
+    Wraps a DRF view so its GET requests are answered by `handler`, an
+    async function of (view, request) such as a viewset's alist(), which
+    awaits its queries through the async ORM instead of holding a worker
+    thread. The view instance is set up the way DRF's dispatch() does it:
+    authentication, permissions, throttling and content negotiation run
+    first, in a thread as they may query. Other methods and requests for
+    anything but JSON (the browsable API) go to `sync_view` in a thread.
+    At most ASYNC_DATABASE_CONCURRENCY requests per process are handled at
+    once, the rest wait their turn.
+    """
+    cls = sync_view.cls
+    initkwargs = sync_view.initkwargs
+    actions = getattr(sync_view, 'actions', None)
+    sync_view_in_thread = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        async with database_slots():
+            if request.method != 'GET':
+                return await sync_view_in_thread(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            if actions is not None:
+                self.action_map = actions
+            self.args, self.kwargs = args, kwargs
+            request = self.initialize_request(request, *args, **kwargs)
+            self.request = request
+            self.headers = self.default_response_headers
+            try:
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+                if request.accepted_renderer.format != 'json':
+                    return await sync_view_in_thread(request._request, *args, **kwargs)
+                response = await handler(self, request)
+            except Exception as exc:
+                response = self.handle_exception(exc)
+        return rendered(self.finalize_response(request, response, *args, **kwargs))
+
+    view.cls = cls
+    view.initkwargs = initkwargs
+    view.actions = actions
+    # DRF views are csrf exempt, SessionAuthentication enforces CSRF itself
+    view.csrf_exempt = True
+    return view
@@ -0,0 +1,238 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+
+from .models import Milestone, Project
+from .signals import projects_changed
+
+# Endpoints wrapped with cached_response(), for the hit/miss report
+CACHED_ENDPOINTS = []
+
+
+def response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'responses')]
+
+
+def cache_enabled():
+    return getattr(settings, 'RESPONSE_CACHE_ENABLED', True)
+
+
+# Version tokens. Cached responses embed the tokens they were built under,
+# bumping a token orphans every response that depended on it. Scopes:
+# 'projects' project lists, 'milestones' milestone lists, 'project:<id>'
+# one project's milestones, 'all_projects' every project's milestones,
+# 'users' the user list and 'roster:<id>' one project's team roster.
+
+def version_key(scope):
+    return f'responses:version:{scope}'
+
+
+def get_versions(scopes):
+    cache = response_cache()
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        # a fresh random token, so an evicted version can never match old entries
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(scopes):
+    response_cache().set_many({version_key(scope): uuid.uuid4().hex for scope in scopes}, timeout=None)
+
+
+def invalidate(scopes):
+    """
+    Bump the given version scopes now, so the writer reads its own change,
+    and again after commit, so a response cached by a concurrent reader
+    before the commit is not served afterwards.
+    """
+    scopes = list(scopes)
+    bump_versions(scopes)
+    transaction.on_commit(lambda: bump_versions(scopes))
+
+
+def invalidate_projects(project_ids=None):
+    scopes = ['projects', 'milestones']
+    if project_ids is None:
+        scopes.append('all_projects')
+    else:
+        scopes += [f'project:{project_id}' for project_id in project_ids if project_id is not None]
+    invalidate(scopes)
+
+
+def invalidate_users():
+    invalidate(['users'])
+
+
+def invalidate_rosters(project_ids):
+    invalidate([f'roster:{project_id}' for project_id in project_ids])
+
+
+# Hit/miss counters
+
+def record(name, outcome):
+    cache = response_cache()
+    key = f'responses:stats:{name}:{outcome}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def cache_stats():
+    cache = response_cache()
+    stats = {}
+    for name in CACHED_ENDPOINTS:
+        hits = cache.get(f'responses:stats:{name}:hit', 0)
+        misses = cache.get(f'responses:stats:{name}:miss', 0)
+        total = hits + misses
+        stats[name] = {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 3) if total else None}
+    return stats
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+
+def cached_response(name, scopes, timeout=None):
+    """
+    Caches the rendered JSON of a GET endpoint. `scopes(request)` returns
+    the version scopes the response depends on, the key also covers the
+    full query string and today's date. Responses carry an ETag and
+    If-None-Match is answered with 304. `timeout` overrides
+    RESPONSE_CACHE_TIMEOUT, a callable is read on every request. Async
+    handlers share the entries of their sync twins, the cache is read and
+    written in a thread.
+    """
+    if name not in CACHED_ENDPOINTS:
+        CACHED_ENDPOINTS.append(name)
+
+    def entry_timeout():
+        if timeout is None:
+            return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+        return timeout() if callable(timeout) else timeout
+
+    def cacheable(request):
+        return cache_enabled() and request.method == 'GET' and request.accepted_renderer.format == 'json'
+
+    def lookup(request):
+        """The cache key for the request and the cached response, None on a miss"""
+        versions = get_versions(scopes(request))
+        fingerprint = '|'.join([name, request.get_full_path(), str(timezone.now().date()), *versions])
+        key = 'responses:entry:' + hashlib.sha256(fingerprint.encode()).hexdigest()
+
+        entry = response_cache().get(key)
+        if entry is None:
+            record(name, 'miss')
+            return key, None
+        record(name, 'hit')
+        if etag_matches(request, entry['etag']):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        response['ETag'] = entry['etag']
+        response['X-Cache'] = 'HIT'
+        return key, response
+
+    def store(request, key, response):
+        if response.status_code != 200:
+            return response
+
+        # render now so the bytes can be cached, DRF skips rendering again
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = {'request': request, 'response': response}
+        response.render()
+        etag = '"%s"' % hashlib.md5(response.content).hexdigest()
+        response_cache().set(key, {
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'etag': etag,
+        }, timeout=entry_timeout())
+
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def decorator(func):
+        # works for viewset methods (self, request) and function views (request)
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                request = args[-1]
+                if not cacheable(request):
+                    return await func(*args, **kwargs)
+                key, response = await sync_to_async(lookup)(request)
+                if response is not None:
+                    return response
+                return await sync_to_async(store)(request, key, await func(*args, **kwargs))
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            request = args[-1]
+            if not cacheable(request):
+                return func(*args, **kwargs)
+            key, response = lookup(request)
+            if response is not None:
+                return response
+            return store(request, key, func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+# Invalidation
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_written(sender, instance, **kwargs):
+    invalidate_projects([instance.pk])
+
+
+# Milestone.delete() sends projects_changed itself, a post_delete receiver
+# would stop cascades from deleting milestones without loading them
+@receiver(post_save, sender=Milestone)
+def milestone_written(sender, instance, **kwargs):
+    invalidate_projects([instance.project_id])
+
+
+@receiver(projects_changed)
+def projects_bulk_written(sender, project_ids=None, **kwargs):
+    invalidate_projects(project_ids)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_written(sender, instance, **kwargs):
+    invalidate_users()
+
+
+@receiver(m2m_changed, sender=Project.team_roster.through)
+def roster_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_rosters([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        # changed from the user side, pk_set holds project ids
+        invalidate_rosters(pk_set)
+    elif action == 'pre_clear':
+        # the user's projects can only be read before they are cleared
+        invalidate_rosters(list(instance.team_projects.values_list('pk', flat=True)))
@@ -0,0 +1,92 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.utils import timezone
+
+from .compiled import CompiledMilestoneSerializer, CompiledProjectSerializer
+from .models import Change, Milestone, Project
+from .serializers import ProjectListSerializer
+
+# A position in the change feed is the (txid, id) of the last change sent,
+# (0, 0) before the first. Tokens also carry the time they were issued.
+START = (0, 0)
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def encode_token(position, issued_at=None):
+    txid, pk = position
+    issued_at = issued_at or timezone.now()
+    return base64.urlsafe_b64encode(json.dumps([txid, pk, issued_at.isoformat()]).encode()).decode()
+
+
+def decode_token(token):
+    """Returns the position and issue time of a token"""
+    try:
+        txid, pk, issued_at = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        issued_at = datetime.datetime.fromisoformat(issued_at)
+        if issued_at.tzinfo is None or not isinstance(txid, int) or not isinstance(pk, int):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise InvalidToken("Invalid since token")
+    return (txid, pk), issued_at
+
+
+def token_expired(issued_at, now=None):
+    """
+    Deletions are only kept in the change log for CHANGE_LOG_RETENTION_DAYS,
+    a client that last synced before that would miss some and has to sync
+    from scratch.
+    """
+    now = now or timezone.now()
+    return issued_at < now - datetime.timedelta(days=settings.CHANGE_LOG_RETENTION_DAYS)
+
+
+def changes_since(position, limit, today=None):
+    """
+    The projects and milestones created, updated, soft or hard deleted after
+    `position` (None for everything), read from at most `limit` changes.
+    Objects are sent as they are now, once however often they changed, and
+    the ones no longer there as deleted ids. Changes are read in the order
+    of the transactions that wrote them, up to the oldest one still running:
+    a long import holds the feed back until it commits instead of being
+    skipped. The log is read from its (txid, id) index, so the cost follows
+    the number of changes.
+    """
+    changes = list(
+        Change.objects.visible().after(position)
+        .order_by('txid', 'id')
+        .values_list('txid', 'id', 'kind', 'object_id')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if changes:
+        position = changes[-1][:2]
+
+    changed = {Change.PROJECT: {}, Change.MILESTONE: {}}
+    for txid, pk, kind, object_id in changes:
+        changed[kind][object_id] = None
+    project_ids, milestone_ids = list(changed[Change.PROJECT]), list(changed[Change.MILESTONE])
+
+    projects = CompiledProjectSerializer(fields=ProjectListSerializer.Meta.fields, today=today)
+    milestones = CompiledMilestoneSerializer(today=today)
+    project_rows, milestone_rows = {}, {}
+    if project_ids:
+        project_rows = {row['id']: row for row in projects.values(Project.objects.filter(pk__in=project_ids).order_by())}
+    if milestone_ids:
+        milestone_rows = {row['id']: row for row in milestones.values(Milestone.objects.filter(pk__in=milestone_ids).order_by())}
+
+    return {
+        'projects': projects.represent([project_rows[pk] for pk in project_ids if pk in project_rows]),
+        'milestones': milestones.represent([milestone_rows[pk] for pk in milestone_ids if pk in milestone_rows]),
+        'deleted': {
+            'projects': [pk for pk in project_ids if pk not in project_rows],
+            'milestones': [pk for pk in milestone_ids if pk not in milestone_rows],
+        },
+        'since': encode_token(position or START),
+        'has_more': has_more,
+    }
@@ -0,0 +1,252 @@
+import datetime
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+from .models import DUE_SOON_DAYS, Milestone, Project
+from .serializers import MilestoneSerializer, ProjectSerializer
+
+
+# ISO 8601 dates and datetimes are left for the renderer to write:
+# JSONRenderer and FastJSONRenderer both write them the way DRF's fields
+# format them, the fast one in C.
+
+def datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None:
+        return None
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+    # the database hands back UTC datetimes, which need no conversion when
+    # the output is in UTC too
+    utc = field_timezone is datetime.timezone.utc or getattr(field_timezone, 'key', None) in ('UTC', 'Etc/UTC')
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        if utc and value.tzinfo is datetime.timezone.utc:
+            return value
+        return value.astimezone(field_timezone)
+    return convert
+
+
+def date_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() == ISO_8601:
+        return None
+    return field.to_representation
+
+
+def choice_converter(field):
+    choices = field.choice_strings_to_values
+    return lambda value: value if value == '' else choices.get(str(value), value)
+
+
+def bigint_converter(field):
+    if getattr(field, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING):
+        return str
+    return int
+
+
+def related_converter(field):
+    return None if field.pk_field is None else field.pk_field.to_representation
+
+
+def json_converter(field):
+    return field.to_representation if field.binary else None
+
+
+# DRF field class: function returning the converter of a non-None column
+# value, None meaning the value is output as is. Subclasses use their
+# base's converter unless they override to_representation(), other field
+# classes go through their own to_representation().
+CONVERTERS = {
+    serializers.CharField: lambda field: str,
+    serializers.IntegerField: lambda field: int,
+    serializers.BigIntegerField: bigint_converter,
+    serializers.BooleanField: lambda field: None,
+    serializers.ChoiceField: choice_converter,
+    serializers.DateField: date_converter,
+    serializers.DateTimeField: datetime_converter,
+    serializers.JSONField: json_converter,
+    serializers.PrimaryKeyRelatedField: related_converter,
+    serializers.ReadOnlyField: lambda field: None,
+}
+
+
+class CompiledSerializer:
+    """
+    Read-only twin of a ModelSerializer for list responses. Output is built
+    from values() rows: every field that reads a column gets its column
+    name and value converter worked out once, when the compiled serializer
+    is created, instead of going through the DRF field machinery per
+    object. Fields needing more than the row are filled in by a
+    load_<field>(rows) method, once per page. A loader that queries yields
+    its queryset and is sent back the rows, so the same loaders serve
+    represent() and the async ORM in arepresent(). "today" is fixed for the
+    whole request. Rendered, the output is the same as serializer_class's.
+    """
+    serializer_class = None
+    # row columns read by each load_<field> method
+    load_columns = {}
+
+    def __init__(self, fields=None, today=None):
+        self.today = today or timezone.now().date()
+        self.columns = ['id']
+        # (output name, row key, converter, relation column, skip when the relation is null)
+        self.fields = []
+        self.loaders = []
+        for name, field in self.serializer_class().fields.items():
+            if fields is not None and name not in fields:
+                continue
+            loader = getattr(self, f'load_{name}', None)
+            if loader is not None:
+                self.loaders.append(loader)
+                self.add_columns(self.load_columns.get(name, []))
+                self.fields.append((name, name, None, None, False))
+            else:
+                self.fields.append(self.compile_field(name, field))
+
+    def add_columns(self, columns):
+        for column in columns:
+            if column not in self.columns:
+                self.columns.append(column)
+
+    def compile_field(self, name, field):
+        if field.source == '*' or isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)):
+            raise ImproperlyConfigured(f"{type(self).__name__} needs a load_{name}() method")
+        column = '__'.join(field.source_attrs)
+        convert = field.to_representation
+        for cls in type(field).__mro__:
+            if cls in CONVERTERS:
+                convert = CONVERTERS[cls](field)
+                break
+            if 'to_representation' in vars(cls):
+                break
+        relation, skip = None, False
+        if len(field.source_attrs) > 1:
+            # DRF outputs null, or leaves the field out, when the relation is null
+            if field.default is not empty:
+                raise ImproperlyConfigured(f"{type(self).__name__} cannot read {name}, a related field with a default")
+            relation, skip = field.source_attrs[0], not field.allow_null
+            if skip and field.required:
+                raise ImproperlyConfigured(f"{type(self).__name__} cannot read {name}, a required related field")
+            self.add_columns([relation])
+        self.add_columns([column])
+        return name, column, convert, relation, skip
+
+    def values(self, queryset):
+        """
+        The queryset as values() rows holding the columns the fields read
+        and the columns it is ordered by, which keyset cursors are made of.
+        """
+        columns = list(self.columns)
+        for field in queryset.query.order_by:
+            if isinstance(field, str) and field.lstrip('-') not in ('pk', '?', *columns):
+                columns.append(field.lstrip('-'))
+        return queryset.values(*columns)
+
+    def build(self, rows):
+        """
+        Generator behind represent() and arepresent(): yields the querysets
+        the loaders need, is sent the rows of each and returns the output.
+        """
+        for loader in self.loaders:
+            loading = loader(rows)
+            if loading is not None:
+                yield from loading
+        return self.items(rows)
+
+    def represent(self, rows):
+        building = self.build(list(rows))
+        try:
+            queryset = next(building)
+            while True:
+                queryset = building.send(list(queryset))
+        except StopIteration as done:
+            return done.value
+
+    async def arepresent(self, rows):
+        """
+        represent() with every query run through the async ORM. Querysets
+        are read with async for, aiterator() on values() querysets starts
+        the query in the event loop on Django 5.2.
+        """
+        if not isinstance(rows, list):
+            rows = [row async for row in rows]
+        building = self.build(rows)
+        try:
+            queryset = next(building)
+            while True:
+                queryset = building.send([row async for row in queryset])
+        except StopIteration as done:
+            return done.value
+
+    def items(self, rows):
+        fields = self.fields
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert, relation, skip in fields:
+                if relation is not None and row[relation] is None:
+                    if not skip:
+                        item[name] = None
+                    continue
+                value = row[column]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
+
+
+class CompiledMilestoneSerializer(CompiledSerializer):
+    serializer_class = MilestoneSerializer
+    load_columns = {
+        'is_overdue': ['due_date', 'completed'],
+        'is_due_soon': ['due_date', 'completed'],
+    }
+
+    def load_is_overdue(self, rows):
+        today = self.today
+        for row in rows:
+            due_date = row['due_date']
+            row['is_overdue'] = bool(due_date) and not row['completed'] and due_date < today
+
+    def load_is_due_soon(self, rows):
+        due_soon_date = self.today + timedelta(days=DUE_SOON_DAYS)
+        for row in rows:
+            due_date = row['due_date']
+            row['is_due_soon'] = bool(due_date) and not row['completed'] and due_date <= due_soon_date
+
+
+class CompiledProjectSerializer(CompiledSerializer):
+    serializer_class = ProjectSerializer
+
+    def load_team_roster(self, rows):
+        roster = {row['id']: [] for row in rows}
+        if roster:
+            members = yield (
+                Project.team_roster.through.objects.filter(project__in=roster)
+                .order_by('user')
+                .values_list('project', 'user')
+            )
+            for project_id, user_id in members:
+                roster[project_id].append(user_id)
+        for row in rows:
+            row['team_roster'] = roster[row['id']]
+
+    def load_milestones(self, rows):
+        milestones = {row['id']: [] for row in rows}
+        if milestones:
+            compiled = CompiledMilestoneSerializer(today=self.today)
+            queryset = Milestone.objects.filter(project__in=milestones).order_by('due_date', 'id')
+            milestone_rows = yield compiled.values(queryset)
+            items = yield from compiled.build(milestone_rows)
+            for row, item in zip(milestone_rows, items):
+                milestones[row['project']].append(item)
+        for row in rows:
+            row['milestones'] = milestones[row['id']]
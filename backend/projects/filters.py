@@ -0,0 +1,63 @@
+import django_filters
+from django.db.models import Q
+from rest_framework import filters
+
+from .models import Project
+
+TAG_MATCH_CHOICES = [
+    ('all', 'All'),
+    ('any', 'Any'),
+]
+
+
+def split_tags(value):
+    return [tag.strip() for tag in value.split(',') if tag.strip()]
+
+
+def user_prefix_filter(text):
+    """
+    Typeahead match for users: every word has to start the username, first
+    name or last name, ignoring case. Served by the upper() prefix indexes
+    on auth_user.
+    """
+    condition = Q()
+    for word in text.split():
+        condition &= Q(username__istartswith=word) | Q(first_name__istartswith=word) | Q(last_name__istartswith=word)
+    return condition
+
+
+# Field filters for the project list, tags=a,b matches tags exactly
+class ProjectFilter(django_filters.FilterSet):
+    tags = django_filters.CharFilter(method='filter_tags')
+    # whether a project needs all of the given tags or any one of them
+    tags_match = django_filters.ChoiceFilter(choices=TAG_MATCH_CHOICES, method='filter_tags_match')
+
+    class Meta:
+        model = Project
+        fields = ['status', 'owner', 'health']
+
+    def filter_tags(self, queryset, name, value):
+        match = self.form.cleaned_data.get('tags_match') or 'all'
+        return queryset.with_tags(split_tags(value), match)
+
+    def filter_tags_match(self, queryset, name, value):
+        # applied by filter_tags
+        return queryset
+
+
+# SearchFilter backed by the project full-text index instead of icontains scans
+class ProjectSearchFilter(filters.SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return queryset.search(' '.join(terms))
+
+
+# Orders search results by relevance unless the caller picked an ordering
+class ProjectOrderingFilter(filters.OrderingFilter):
+    def get_ordering(self, request, queryset, view):
+        searching = request.query_params.get(ProjectSearchFilter.search_param)
+        if searching and not request.query_params.get(self.ordering_param):
+            return ['-rank', *self.get_default_ordering(view)]
+        return super().get_ordering(request, queryset, view)
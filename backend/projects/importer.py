@@ -0,0 +1,263 @@
+import codecs
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Milestone, Project, empty_rollup, health_from_rollup, milestone_contribution, progress_from_rollup
+from .signals import projects_changed
+
+IMPORT_FORMATS = ['ndjson', 'csv', 'json']
+
+# Request content types accepted by the import endpoint
+IMPORT_CONTENT_TYPES = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+    'application/json': 'json',
+}
+
+# Columns read from each record, anything else (ids, counters, timestamps
+# from an export) is ignored. Users are given by id or by username.
+PROJECT_IMPORT_FIELDS = ['title', 'description', 'status', 'tags']
+MILESTONE_IMPORT_FIELDS = ['name', 'description', 'completed', 'due_date', 'completed_date', 'priority']
+
+IMPORT_BATCH_SIZE = 1000
+
+
+def csv_records(lines):
+    """
+    Projects from the CSV layout written by the export endpoint: project_*
+    and milestone_* columns, one row per milestone. Consecutive rows with
+    the same project columns belong to the same project, a row with an
+    empty milestone_name is a project without milestones.
+    """
+    reader = csv.DictReader(lines)
+    record = key = None
+    for row in reader:
+        project = {name[8:]: value for name, value in row.items() if name and name.startswith('project_') and value != ''}
+        milestone = {name[10:]: value for name, value in row.items() if name and name.startswith('milestone_') and value != ''}
+        row_key = sorted(project.items())
+        if record is None or row_key != key:
+            if record is not None:
+                yield line_number, record
+            if 'tags' in project:
+                project['tags'] = [tag for tag in project['tags'].split(';') if tag]
+            record, key, line_number = dict(project, milestones=[]), row_key, reader.line_num
+        if milestone.get('name'):
+            record['milestones'].append(milestone)
+    if record is not None:
+        yield line_number, record
+
+
+def read_records(stream, input_format):
+    """
+    Yields (row number, record) pairs from a text or binary stream of
+    NDJSON, CSV or a JSON array. A record that cannot be parsed is yielded
+    as a ValueError instead of a dict.
+    """
+    if hasattr(stream, 'mode') and 'b' not in stream.mode:
+        lines = stream
+    else:
+        lines = codecs.getreader('utf-8')(stream)
+
+    if input_format == 'csv':
+        yield from csv_records(lines)
+    elif input_format == 'ndjson':
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                yield number, ValueError(f"Invalid JSON: {e}")
+    else:
+        try:
+            records = json.load(lines)
+        except ValueError as e:
+            yield 1, ValueError(f"Invalid JSON: {e}")
+            return
+        if not isinstance(records, list):
+            yield 1, ValueError("Expected a JSON array of projects.")
+            return
+        yield from enumerate(records, start=1)
+
+
+def user_reference(record, field):
+    """The (id, username) a record uses for a user column, either may be None."""
+    value = record.get(field)
+    if value not in (None, ''):
+        return value, None
+    username = record.get(f'{field}_name')
+    return None, username or None
+
+
+def resolve_users(records):
+    """
+    Looks up every user referenced by a batch of records, by id or
+    username, with one query. Returns ({id: id}, {username: id}).
+    """
+    ids, usernames = set(), set()
+    for record in records:
+        references = [user_reference(record, 'owner')]
+        references += [user_reference(milestone, 'assigned_to') for milestone in record.get('milestones') or [] if isinstance(milestone, dict)]
+        for user_id, username in references:
+            if user_id is not None:
+                try:
+                    ids.add(int(user_id))
+                except (TypeError, ValueError):
+                    pass
+            elif username is not None:
+                usernames.add(username)
+
+    by_id, by_username = {}, {}
+    if ids or usernames:
+        for pk, username in get_user_model().objects.filter(Q(pk__in=ids) | Q(username__in=usernames)).values_list('pk', 'username'):
+            by_id[pk] = pk
+            by_username[username] = pk
+    return by_id, by_username
+
+
+def find_user(record, field, users, required):
+    by_id, by_username = users
+    user_id, username = user_reference(record, field)
+    if user_id is not None:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            raise ValidationError({field: ["A valid user id is required."]})
+        if user_id not in by_id:
+            raise ValidationError({field: [f"User {user_id} does not exist."]})
+        return user_id
+    if username is not None:
+        if username not in by_username:
+            raise ValidationError({field: [f"User '{username}' does not exist."]})
+        return by_username[username]
+    if required:
+        raise ValidationError({field: ["This field is required."]})
+    return None
+
+
+def build_milestone(data, users, today):
+    if not isinstance(data, dict):
+        raise ValidationError({'non_field_errors': ["Expected an object."]})
+    milestone = Milestone(**{field: data[field] for field in MILESTONE_IMPORT_FIELDS if field in data})
+    errors = {}
+    try:
+        milestone.assigned_to_id = find_user(data, 'assigned_to', users, required=False)
+    except ValidationError as e:
+        errors.update(e.message_dict)
+    try:
+        milestone.clean_fields(exclude=['project', 'assigned_to'])
+    except ValidationError as e:
+        errors.update(e.message_dict)
+    if errors:
+        raise ValidationError(errors)
+    milestone.sync_completed_date(today)
+    return milestone
+
+
+def build_project(record, users, today):
+    """
+    Validates one record. Returns the unsaved project and milestones, with
+    the rollup counters, progress and health already worked out, and the
+    field errors, which are empty when the record is valid.
+    """
+    if not isinstance(record, dict):
+        return None, [], {'non_field_errors': ["Expected an object."]}
+    project = Project(**{field: record[field] for field in PROJECT_IMPORT_FIELDS if field in record})
+    errors = {}
+    try:
+        project.owner_id = find_user(record, 'owner', users, required=True)
+    except ValidationError as e:
+        errors.update(e.message_dict)
+    try:
+        project.clean_fields(exclude=['owner', 'search_vector'])
+    except ValidationError as e:
+        errors.update(e.message_dict)
+    if not isinstance(project.tags, list) or not all(isinstance(tag, str) for tag in project.tags):
+        errors['tags'] = ["Must be a list of strings."]
+
+    milestones, milestone_errors = [], []
+    for data in record.get('milestones') or []:
+        try:
+            milestones.append(build_milestone(data, users, today))
+            milestone_errors.append({})
+        except ValidationError as e:
+            milestone_errors.append(e.message_dict)
+    if any(milestone_errors):
+        # one entry per milestone, empty for the valid ones
+        errors['milestones'] = milestone_errors
+    if errors:
+        return project, milestones, errors
+
+    rollup = empty_rollup()
+    for milestone in milestones:
+        for counter, value in milestone_contribution(milestone.completed, milestone.due_date, today).items():
+            rollup[counter] += value
+    for counter, value in rollup.items():
+        setattr(project, counter, value)
+    project.progress = progress_from_rollup(rollup)
+    project.health = health_from_rollup(rollup)
+    return project, milestones, {}
+
+
+def insert_batch(batch):
+    projects = Project.objects.bulk_create([project for project, milestones in batch])
+    milestones = []
+    for project, project_milestones in batch:
+        for milestone in project_milestones:
+            milestone.project = project
+            milestones.append(milestone)
+    Milestone.objects.bulk_create(milestones, batch_size=IMPORT_BATCH_SIZE)
+    # bulk_create sends no post_save, let the response cache know
+    projects_changed.send(sender=Project, project_ids=[project.pk for project in projects])
+
+
+def import_projects(records, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validates and inserts (row number, record) pairs from read_records().
+    Records are validated batch by batch, each batch resolving its users in
+    one query and inserting its projects and milestones with bulk_create.
+    Counters, progress and health are computed from the imported
+    milestones before the insert, so no project is recomputed afterwards.
+    The import is all or nothing: after the first invalid row the rest is
+    only validated, and any error or dry_run rolls everything back.
+    Returns {'projects', 'milestones', 'errors', 'dry_run'}.
+    """
+    today = timezone.now().date()
+    result = {'projects': 0, 'milestones': 0, 'errors': [], 'dry_run': dry_run}
+
+    def flush(pending):
+        users = resolve_users([record for number, record in pending if isinstance(record, dict)])
+        batch = []
+        for number, record in pending:
+            if isinstance(record, ValueError):
+                project, milestones, errors = None, [], {'non_field_errors': [str(record)]}
+            else:
+                project, milestones, errors = build_project(record, users, today)
+            if errors:
+                result['errors'].append({'row': number, 'errors': errors})
+                continue
+            batch.append((project, milestones))
+            result['projects'] += 1
+            result['milestones'] += len(milestones)
+        if batch and not dry_run and not result['errors']:
+            insert_batch(batch)
+
+    with transaction.atomic():
+        pending = []
+        for number, record in records:
+            pending.append((number, record))
+            if len(pending) >= batch_size:
+                flush(pending)
+                pending = []
+        if pending:
+            flush(pending)
+        if dry_run or result['errors']:
+            transaction.set_rollback(True)
+    return result
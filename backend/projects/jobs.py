@@ -0,0 +1,167 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job, Milestone, Project
+from .signals import projects_changed
+
+# Units of work (projects or milestones) a job step handles in one transaction
+JOB_CHUNK_SIZE = 1000
+
+
+# Job kinds. total() is the number of units of work in a payload, step()
+# runs the next chunk after `done` units and returns how many units it
+# completed and the counts to add to the job's result. Each step runs in
+# a transaction of its own, so locks are only held for one chunk.
+
+class ProjectBatchJob:
+    """Runs update() over the payload's project ids, a chunk at a time"""
+
+    def total(self, payload):
+        return len(payload['ids'])
+
+    def step(self, payload, done, chunk_size):
+        ids = payload['ids'][done:done + chunk_size]
+        return len(ids), {'updated': self.update(payload, ids)}
+
+
+# ProjectViewSet.bulk_update
+class ProjectBulkUpdateJob(ProjectBatchJob):
+    def update(self, payload, ids):
+        return Project.objects.filter(id__in=ids, deleted=False).update_status_and_tags(
+            payload.get('status'), payload.get('tags'),
+        )
+
+
+# ProjectViewSet.bulk_update_status
+class ProjectStatusJob(ProjectBatchJob):
+    def update(self, payload, ids):
+        updated = Project.objects.filter(id__in=ids).update(status=payload['status'], last_updated=timezone.now())
+        projects_changed.send(sender=Project, project_ids=ids)
+        return updated
+
+
+# MilestoneViewSet.bulk_update_status, the rollups of each chunk's
+# projects are refreshed with it
+class MilestoneStatusJob:
+    def total(self, payload):
+        return len(payload['ids'])
+
+    def step(self, payload, done, chunk_size):
+        ids = payload['ids'][done:done + chunk_size]
+        milestones = Milestone.objects.filter(id__in=ids)
+        affected_projects = list(milestones.values_list('project_id', flat=True).order_by().distinct())
+        now = timezone.now()
+        updated = milestones.update(
+            completed=payload['completed'],
+            completed_date=now.date() if payload['completed'] else None,
+            updated_at=now,
+        )
+        Project.objects.filter(pk__in=affected_projects).refresh_rollups()
+        return len(ids), {'updated': updated}
+
+
+# ProjectViewSet.permanent_delete of a project with many milestones. The
+# project is soft deleted when the job is queued, the milestones are
+# deleted a chunk at a time and the project itself last. The milestone
+# count is only an estimate, milestones may still be added to the project,
+# so the job is only done once the project row is gone.
+class ProjectDeleteJob:
+    def total(self, payload):
+        return payload['milestones'] + 1
+
+    def step(self, payload, done, chunk_size):
+        milestone_ids = list(
+            Milestone.objects.filter(project=payload['project']).order_by().values_list('id', flat=True)[:chunk_size]
+        )
+        if milestone_ids:
+            # no Milestone.delete(), the project goes with them. The change
+            # log records the deletes, the caches are invalidated here.
+            Milestone.objects.filter(id__in=milestone_ids).delete()
+            projects_changed.send(sender=Milestone, project_ids=[payload['project']], milestone_ids=milestone_ids)
+            # the last unit of work is the project itself
+            completed = min(len(milestone_ids), max(self.total(payload) - 1 - done, 0))
+            return completed, {'milestones_deleted': len(milestone_ids)}
+        deleted, _ = Project.objects.filter(pk=payload['project']).delete()
+        return max(self.total(payload) - done, 1), {'projects_deleted': min(deleted, 1)}
+
+
+JOB_KINDS = {
+    'project_bulk_update': ProjectBulkUpdateJob(),
+    'project_bulk_update_status': ProjectStatusJob(),
+    'project_permanent_delete': ProjectDeleteJob(),
+    'milestone_bulk_update_status': MilestoneStatusJob(),
+}
+
+
+def enqueue(kind, payload):
+    return Job.objects.create(kind=kind, payload=payload, total=JOB_KINDS[kind].total(payload))
+
+
+def lease_expiry():
+    return timezone.now() + datetime.timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+
+def claim_job():
+    """
+    The oldest queued job, or a running one whose worker stopped renewing
+    its lease, marked running for this worker. The row is locked with SKIP
+    LOCKED only while it is claimed, concurrent workers pass over it and
+    take the next one. Returns None when there is nothing to do.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # out of attempts, the job keeps stopping its workers
+        Job.objects.filter(
+            status=Job.RUNNING, lease_expires_at__lt=now, attempts__gte=settings.JOB_MAX_ATTEMPTS,
+        ).update(status=Job.FAILED, error="Worker stopped while running the job", finished_at=now)
+
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Job.QUEUED) | Q(status=Job.RUNNING, lease_expires_at__lt=now))
+            .order_by('created_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.started_at = job.started_at or now
+        job.lease_expires_at = lease_expiry()
+        job.save(update_fields=['status', 'attempts', 'started_at', 'lease_expires_at'])
+    return job
+
+
+def run_job(job, chunk_size=JOB_CHUNK_SIZE):
+    """
+    Runs a claimed job step by step. Each step commits with the job's
+    progress, so a job picked up again after its worker stopped resumes
+    where it was. A step first checks the job is still this worker's: once
+    the lease expired and another worker claimed it, `attempts` has moved
+    on and this one stops.
+    """
+    kind = JOB_KINDS[job.kind]
+    attempt = job.attempts
+    try:
+        while job.done < job.total:
+            with transaction.atomic():
+                current = Job.objects.select_for_update().get(pk=job.pk)
+                if current.attempts != attempt or current.status != Job.RUNNING:
+                    return current
+                completed, counts = kind.step(job.payload, job.done, chunk_size)
+                job.done = min(job.done + completed, job.total)
+                for name, count in counts.items():
+                    job.result[name] = job.result.get(name, 0) + count
+                job.lease_expires_at = lease_expiry()
+                job.save(update_fields=['done', 'result', 'lease_expires_at'])
+    except Exception as e:
+        job.status = Job.FAILED
+        job.error = str(e)
+    else:
+        job.status = Job.SUCCEEDED
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
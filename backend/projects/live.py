@@ -0,0 +1,303 @@
+import asyncio
+import functools
+import json
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import Milestone, Project
+from .renderers import FastJSONRenderer
+from .signals import projects_changed
+
+# Seconds PostgresBroker waits before listening again after losing its connection
+RECONNECT_DELAY = 5
+
+# Seconds a process trusts its last look for listening processes, see
+# PostgresBroker.has_listeners()
+LISTENER_CHECK_SECONDS = 5
+
+# Bytes of JSON per NOTIFY, Postgres refuses payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_SIZE = 7000
+
+render = FastJSONRenderer().render
+
+
+# Live updates pushed to the project event stream. A delta is
+# {"project": id, "progress": 40, "health": "warning", "milestones": [ids]}
+# with the milestones changed since the last delta of that project, None
+# when there were too many to list. Projects that were deleted are sent as
+# {"project": id, "deleted": true}.
+
+class Subscription:
+    """
+    The queue of one event stream, read with next() in the event loop that
+    subscribed. Deltas are coalesced by project: a stream that falls behind
+    gets the latest state of every project that changed since its last read
+    instead of each step in between. Past `max_pending` projects the queue
+    is dropped and the stream told to resync, reloading what it shows.
+    """
+
+    def __init__(self, project_ids=None, max_pending=1000):
+        self.project_ids = project_ids
+        self.max_pending = max_pending
+        self.loop = asyncio.get_running_loop()
+        self.pending = {}
+        self.resync = False
+        self.ready = asyncio.Event()
+
+    def deliver(self, deltas):
+        for delta in deltas:
+            project_id = delta['project']
+            if self.project_ids is not None and project_id not in self.project_ids:
+                continue
+            previous = self.pending.get(project_id)
+            if previous is not None and 'milestones' in delta:
+                delta = {**delta, 'milestones': merge_milestones(previous.get('milestones', []), delta['milestones'])}
+            self.pending[project_id] = delta
+        if len(self.pending) > self.max_pending:
+            self.pending.clear()
+            self.resync = True
+        if self.pending or self.resync:
+            self.ready.set()
+
+    def deliver_resync(self):
+        self.pending.clear()
+        self.resync = True
+        self.ready.set()
+
+    async def next(self, timeout):
+        """
+        The deltas queued since the last call, waiting up to `timeout`
+        seconds for one. Returns [] on timeout and None to resync.
+        """
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self.ready.clear()
+        if self.resync:
+            self.resync = False
+            self.pending.clear()
+            return None
+        deltas = list(self.pending.values())
+        self.pending.clear()
+        return deltas
+
+
+def merge_milestones(previous, current):
+    if previous is None or current is None:
+        return None
+    return sorted(set(previous) | set(current))
+
+
+class LocalBroker:
+    """
+    In-process pub/sub: deltas published by a request thread reach the
+    streams of the same process. publish() may be called from any thread,
+    every subscription is handed the deltas in its own event loop.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+
+    def subscribe(self, project_ids=None):
+        subscription = Subscription(project_ids, settings.LIVE_EVENTS_MAX_PENDING)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def has_listeners(self):
+        """Whether published deltas can reach any stream"""
+        return bool(self.subscriptions)
+
+    def publish(self, deltas):
+        self.deliver(deltas)
+
+    def deliver(self, deltas):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, deltas)
+            except RuntimeError:
+                # its event loop has been closed
+                self.unsubscribe(subscription)
+
+    def resync(self):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.deliver_resync)
+
+
+class PostgresBroker(LocalBroker):
+    """
+    Shares deltas between processes: publish() sends them with pg_notify
+    and every process with streams listens on a connection of its own,
+    handing what it receives to its local subscriptions. Streams are told
+    to resync after the listening connection was lost, as notifications
+    sent meanwhile are gone.
+    """
+    channel = 'project_live'
+    # application_name of the listening connections, how other processes
+    # find out whether anyone listens
+    application_name = 'project_live listener'
+
+    def __init__(self):
+        super().__init__()
+        # listening task of each event loop with streams
+        self.listeners = weakref.WeakKeyDictionary()
+        # (monotonic time, result) of the last has_listeners() query
+        self.listeners_checked = (None, False)
+
+    def subscribe(self, project_ids=None):
+        loop = asyncio.get_running_loop()
+        if loop not in self.listeners:
+            self.listeners[loop] = loop.create_task(self.listen())
+        return super().subscribe(project_ids)
+
+    def has_listeners(self):
+        """
+        Whether a process listens, its own or another, looked up in
+        pg_stat_activity at most every LISTENER_CHECK_SECONDS. Deltas sent
+        while a new listener was not known yet are missed, so a listener
+        tells its streams to resync once that long after it connected.
+        """
+        if self.listeners:
+            return True
+        checked_at, listening = self.listeners_checked
+        now = time.monotonic()
+        if checked_at is None or now - checked_at >= LISTENER_CHECK_SECONDS:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT EXISTS (SELECT 1 FROM pg_stat_activity '
+                    'WHERE application_name = %s AND datname = current_database())',
+                    [self.application_name],
+                )
+                listening = cursor.fetchone()[0]
+            self.listeners_checked = (now, listening)
+        return listening
+
+    def publish(self, deltas):
+        with connection.cursor() as cursor:
+            for payload in notify_payloads(deltas):
+                cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    async def listen(self):
+        import psycopg
+
+        # what Django connects with, OPTIONS (sslmode, options...) included,
+        # less its cursor class, a sync one
+        params = connection.get_connection_params()
+        params.pop('cursor_factory', None)
+        params['application_name'] = self.application_name
+        reconnected = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(autocommit=True, **params) as listener:
+                    await listener.execute(f'LISTEN {self.channel}')
+                    if reconnected:
+                        self.resync()
+                    else:
+                        asyncio.get_running_loop().call_later(LISTENER_CHECK_SECONDS, self.resync)
+                    async for notify in listener.notifies():
+                        self.deliver(json.loads(notify.payload))
+            except psycopg.Error:
+                pass
+            reconnected = True
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+def notify_payloads(deltas):
+    """JSON arrays of the deltas, each small enough for one NOTIFY."""
+    chunk, size = [], 2
+    for delta in deltas:
+        encoded = render(delta)
+        if len(encoded) + 2 > NOTIFY_PAYLOAD_SIZE:
+            encoded = render({**delta, 'milestones': None})
+        if chunk and size + len(encoded) + 1 > NOTIFY_PAYLOAD_SIZE:
+            yield (b'[' + b','.join(chunk) + b']').decode()
+            chunk, size = [], 2
+        chunk.append(encoded)
+        size += len(encoded) + 1
+    if chunk:
+        yield (b'[' + b','.join(chunk) + b']').decode()
+
+
+@functools.cache
+def get_broker():
+    return import_string(settings.LIVE_EVENTS_BROKER)()
+
+
+# Publishing. Changes are collected per thread and published once the
+# transaction commits, one delta per project with the state it committed.
+# Changes of a transaction that rolled back go out with the next commit,
+# with the state the project is in by then.
+
+_pending = threading.local()
+
+
+def changed(milestones_by_project):
+    """
+    Queue the projects in `milestones_by_project`, {project id: changed
+    milestone ids}, for the event stream.
+    """
+    pending = getattr(_pending, 'changes', None)
+    if pending is None:
+        pending = _pending.changes = {}
+    for project_id, milestone_ids in milestones_by_project.items():
+        if project_id is not None:
+            pending.setdefault(project_id, set()).update(milestone_ids)
+    # robust: a failing broker must not fail the write that committed
+    transaction.on_commit(publish_pending, robust=True)
+
+
+def publish_pending():
+    pending = getattr(_pending, 'changes', None)
+    _pending.changes = None
+    # no stream to send to, skip reading the projects
+    if not pending or not get_broker().has_listeners():
+        return
+    deltas = []
+    rows = Project.objects.filter(pk__in=list(pending)).values_list('id', 'progress', 'health', 'deleted')
+    for project_id, progress, health, deleted in rows:
+        milestone_ids = pending.pop(project_id)
+        if deleted:
+            deltas.append({'project': project_id, 'deleted': True})
+        else:
+            deltas.append({'project': project_id, 'progress': progress, 'health': health, 'milestones': sorted(milestone_ids)})
+    deltas += [{'project': project_id, 'deleted': True} for project_id in pending]
+    get_broker().publish(deltas)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_written(sender, instance, **kwargs):
+    changed({instance.pk: []})
+
+
+# Milestone.delete() sends projects_changed with the milestone id, a
+# post_delete receiver would stop cascades from deleting milestones without
+# loading them
+@receiver(post_save, sender=Milestone)
+def milestone_written(sender, instance, **kwargs):
+    changed({instance.project_id: [instance.pk]})
+
+
+@receiver(projects_changed)
+def projects_bulk_written(sender, project_ids=None, milestone_ids=(), **kwargs):
+    # unknown projects only come from status and tag updates, which leave
+    # progress and health alone
+    if project_ids is not None:
+        changed({project_id: milestone_ids for project_id in project_ids})
@@ -0,0 +1,101 @@
+import io
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from projects.parsers import FastJSONParser
+from projects.renderers import FastJSONRenderer, orjson
+
+
+def project_list_payload(projects, milestones):
+    """
+    A paginated project list shaped like ProjectSerializer's output with
+    ?expand=milestones, built in memory so no database is needed.
+    """
+    now = timezone.now()
+    today = now.date()
+    results = []
+    for n in range(projects):
+        results.append({
+            'id': n + 1,
+            'title': f'Project {n} – platform migration',
+            'description': 'Move the reporting stack onto the new platform and retire the old cluster. ' * 3,
+            'owner': n % 40 + 1,
+            'owner_name': f'user{n % 40}',
+            'team_roster': list(range(1, n % 8 + 2)),
+            'progress': n * 7 % 101,
+            'health': ('good', 'warning', 'critical')[n % 3],
+            'status': ('active', 'on_hold', 'completed')[n % 3],
+            'tags': ['Frontend', 'High Priority', f'Team {n % 12}'],
+            'deleted': False,
+            'created_at': (now - timedelta(days=n)).isoformat().replace('+00:00', 'Z'),
+            'last_updated': (now - timedelta(hours=n)).isoformat().replace('+00:00', 'Z'),
+            'milestones': [
+                {
+                    'id': n * milestones + m + 1,
+                    'name': f'Milestone {m}',
+                    'description': 'Sign-off from the stakeholders.',
+                    'completed': m % 2 == 0,
+                    'due_date': str(today + timedelta(days=m * 7 - 14)),
+                    'completed_date': str(today) if m % 2 == 0 else None,
+                    'priority': ('low', 'medium', 'high', 'critical')[m % 4],
+                    'assigned_to': m % 40 + 1,
+                    'assigned_to_name': f'user{m % 40}',
+                    'project': n + 1,
+                    'created_at': now.isoformat().replace('+00:00', 'Z'),
+                    'updated_at': now.isoformat().replace('+00:00', 'Z'),
+                    'is_overdue': m == 1,
+                    'is_due_soon': m == 2,
+                }
+                for m in range(milestones)
+            ],
+        })
+    return {'count': projects, 'next': None, 'previous': None, 'results': results}
+
+
+class Command(BaseCommand):
+    help = "Compare JSON rendering and parsing throughput of the stdlib and orjson based classes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=100, help="Projects in the payload")
+        parser.add_argument('--milestones', type=int, default=8, help="Milestones per project")
+        parser.add_argument('--seconds', type=float, default=2.0, help="How long to run each case")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed, the fast classes fall back to the stdlib"))
+
+        data = project_list_payload(options['projects'], options['milestones'])
+        body = JSONRenderer().render(data)
+        self.stdout.write(
+            f"Payload: {options['projects']} projects x {options['milestones']} milestones, {len(body) / 1024:.0f} KiB"
+        )
+
+        cases = [
+            ('render', 'JSONRenderer', lambda: JSONRenderer().render(data)),
+            ('render', 'FastJSONRenderer', lambda: FastJSONRenderer().render(data)),
+            ('parse', 'JSONParser', lambda: JSONParser().parse(io.BytesIO(body))),
+            ('parse', 'FastJSONParser', lambda: FastJSONParser().parse(io.BytesIO(body))),
+        ]
+        baseline = {}
+        for operation, name, run in cases:
+            rate = self.measure(run, options['seconds'])
+            baseline.setdefault(operation, rate)
+            self.stdout.write(
+                f"{operation:<7} {name:<17} {rate:9.1f}/s {rate * len(body) / 2 ** 20:8.1f} MiB/s"
+                f" {rate / baseline[operation]:6.2f}x"
+            )
+
+    def measure(self, run, seconds):
+        run()
+        count = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            run()
+            count += 1
+        return count / (time.perf_counter() - start)
@@ -0,0 +1,69 @@
+import copy
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+
+from projects.compiled import CompiledProjectSerializer
+from projects.models import Project
+from projects.renderers import FastJSONRenderer
+from projects.serializers import ProjectListSerializer, ProjectSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare ProjectSerializer with the compiled serializer on a page of projects from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=100, help="Projects in the page")
+        parser.add_argument('--expand', action='store_true', help="Include the nested milestones")
+        parser.add_argument('--seconds', type=float, default=2.0, help="How long to run each case")
+
+    def handle(self, *args, **options):
+        serializer_class = ProjectSerializer if options['expand'] else ProjectListSerializer
+        queryset = Project.objects.filter(deleted=False).order_by('-last_updated')
+        ids = list(queryset.values_list('id', flat=True)[:options['projects']])
+        if not ids:
+            raise CommandError("No projects to serialize, seed some first")
+        page = queryset.filter(id__in=ids)
+        compiled = CompiledProjectSerializer(fields=serializer_class.Meta.fields)
+
+        if options['expand']:
+            loaded = page.with_related()
+        else:
+            # the DRF serializer without milestones needs only the roster prefetched
+            loaded = page.with_related().prefetch_related(None).prefetch_related(
+                Prefetch('team_roster', queryset=User.objects.only('id').order_by('id'))
+            )
+
+        # loaded once, so the first two cases leave out the page query, the
+        # compiled serializer still queries rosters and milestones itself.
+        # Rendering is included as the compiled output leaves dates to the renderer.
+        instances = list(loaded)
+        rows = list(compiled.values(page))
+        render = FastJSONRenderer().render
+        if render(compiled.represent(copy.deepcopy(rows))) != render(serializer_class(instances, many=True).data):
+            raise CommandError("The compiled serializer's output differs from the DRF serializer's")
+
+        self.stdout.write(f"Page: {len(ids)} projects{' with milestones' if options['expand'] else ''}")
+        cases = [
+            ('serialize+render', 'DRF', lambda: render(serializer_class(instances, many=True).data)),
+            ('serialize+render', 'compiled', lambda: render(compiled.represent(rows))),
+            ('query+serialize+render', 'DRF', lambda: render(serializer_class(loaded.all(), many=True).data)),
+            ('query+serialize+render', 'compiled', lambda: render(compiled.represent(compiled.values(page)))),
+        ]
+        baseline = {}
+        for operation, name, run in cases:
+            rate = self.measure(run, options['seconds'])
+            baseline.setdefault(operation, rate)
+            self.stdout.write(f"{operation:<22} {name:<9} {rate:9.1f}/s {rate / baseline[operation]:6.2f}x")
+
+    def measure(self, run, seconds):
+        run()
+        count = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            run()
+            count += 1
+        return count / (time.perf_counter() - start)
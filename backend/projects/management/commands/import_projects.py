@@ -0,0 +1,50 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.importer import IMPORT_BATCH_SIZE, IMPORT_FORMATS, import_projects, read_records
+
+
+class Command(BaseCommand):
+    help = "Import projects with their milestones from an NDJSON, CSV or JSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, - reads standard input")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Input format, by default taken from the file extension")
+        parser.add_argument('--dry-run', action='store_true', help="Only validate, do not write anything")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="Projects validated and inserted per batch")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format']
+        if input_format is None:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            input_format = {'jsonl': 'ndjson'}.get(extension, extension)
+            if input_format not in IMPORT_FORMATS:
+                raise CommandError("Cannot tell the format from the file name, pass --format")
+
+        if path == '-':
+            result = self.run_import(sys.stdin.buffer, input_format, options)
+        else:
+            try:
+                with open(path, 'rb') as stream:
+                    result = self.run_import(stream, input_format, options)
+            except OSError as e:
+                raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        if result['errors']:
+            raise CommandError(f"{len(result['errors'])} invalid rows, nothing was imported")
+        action = "Validated" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {result['projects']} projects with {result['milestones']} milestones"
+        ))
+
+    def run_import(self, stream, input_format, options):
+        return import_projects(
+            read_records(stream, input_format),
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size'],
+        )
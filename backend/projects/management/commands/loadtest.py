@@ -0,0 +1,177 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+async def read_response(reader):
+    """Reads one HTTP/1.1 response, returns (status, keep-alive)."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+class Client:
+    """One keep-alive connection to the server, reopened when it is closed."""
+
+    def __init__(self, host, port, request):
+        self.host, self.port, self.request = host, port, request
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def get(self, slow_delay=0):
+        if self.writer is None:
+            await self.connect()
+        if slow_delay:
+            # the request line, then the rest of the headers after a pause
+            first, rest = self.request.split(b'\r\n', 1)
+            self.writer.write(first + b'\r\n')
+            await self.writer.drain()
+            await asyncio.sleep(slow_delay)
+            self.writer.write(rest)
+        else:
+            self.writer.write(self.request)
+        await self.writer.drain()
+        status, keep_alive = await read_response(self.reader)
+        if not keep_alive:
+            self.close()
+        return status
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test a running server: active clients polling a read endpoint while slow clients "
+        "dawdle over their requests and idle keep-alive connections are held open. Run it against "
+        "the sync and the async setup (see gunicorn.conf.py) to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/projects/', help="Endpoint to request")
+        parser.add_argument('--clients', type=int, default=50, help="Clients sending requests back to back")
+        parser.add_argument('--slow-clients', type=int, default=100, help="Clients sending each request slowly")
+        parser.add_argument('--slow-delay', type=float, default=2.0, help="Seconds a slow client pauses mid-request")
+        parser.add_argument('--idle', type=int, default=1000, help="Keep-alive connections opened and left idle")
+        parser.add_argument('--seconds', type=float, default=10.0, help="How long to run")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError("Only http:// URLs are supported")
+        path = url.path + (f'?{url.query}' if url.query else '')
+        request = (
+            f"GET {path or '/'} HTTP/1.1\r\nHost: {url.netloc}\r\nAccept: application/json\r\n"
+            f"Connection: keep-alive\r\n\r\n"
+        ).encode()
+        results = asyncio.run(self.run(url.hostname, url.port or 80, request, options))
+
+        latencies = sorted(results['latencies'])
+        seconds = options['seconds']
+        self.stdout.write(f"{options['url']} for {seconds:.0f}s")
+        self.stdout.write(
+            f"active:  {options['clients']} clients, {len(latencies)} requests, "
+            f"{len(latencies) / seconds:.1f} req/s, {results['errors']} errors"
+        )
+        if latencies:
+            quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(
+                f"latency: p50 {quantiles[49] * 1000:.0f}ms  p95 {quantiles[94] * 1000:.0f}ms  "
+                f"p99 {quantiles[98] * 1000:.0f}ms  max {latencies[-1] * 1000:.0f}ms"
+            )
+        self.stdout.write(
+            f"slow:    {options['slow_clients']} clients, {results['slow_requests']} requests, "
+            f"{results['slow_errors']} errors"
+        )
+        self.stdout.write(
+            f"idle:    {results['idle_open']}/{options['idle']} connections kept open, "
+            f"{results['idle_alive']} still answering at the end"
+        )
+
+    async def run(self, host, port, request, options):
+        results = {'latencies': [], 'errors': 0, 'slow_requests': 0, 'slow_errors': 0, 'idle_open': 0, 'idle_alive': 0}
+
+        async def active():
+            client = Client(host, port, request)
+            while time.monotonic() < deadline:
+                start = time.monotonic()
+                try:
+                    status = await client.get()
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    client.close()
+                    results['errors'] += 1
+                    await asyncio.sleep(0.1)
+                    continue
+                if status == 200:
+                    results['latencies'].append(time.monotonic() - start)
+                else:
+                    results['errors'] += 1
+            client.close()
+
+        async def slow():
+            client = Client(host, port, request)
+            while time.monotonic() < deadline:
+                try:
+                    await client.get(slow_delay=options['slow_delay'])
+                    results['slow_requests'] += 1
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    client.close()
+                    results['slow_errors'] += 1
+                    await asyncio.sleep(0.1)
+            client.close()
+
+        # idle connections make one request, like a dashboard loading, then
+        # sit on the open connection until the end
+        idle_clients = [Client(host, port, request) for _ in range(options['idle'])]
+
+        async def open_idle(client):
+            try:
+                await client.get()
+                if client.writer is not None:
+                    results['idle_open'] += 1
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                client.close()
+
+        await asyncio.gather(*(open_idle(client) for client in idle_clients))
+        deadline = time.monotonic() + options['seconds']
+        await asyncio.gather(
+            *(active() for _ in range(options['clients'])),
+            *(slow() for _ in range(options['slow_clients'])),
+        )
+
+        async def still_alive(client):
+            # answering on the same connection, without reconnecting
+            if client.writer is None:
+                return
+            try:
+                client.writer.write(request)
+                await client.writer.drain()
+                await asyncio.wait_for(read_response(client.reader), timeout=30)
+                results['idle_alive'] += 1
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                pass
+            finally:
+                client.close()
+
+        await asyncio.gather(*(still_alive(client) for client in idle_clients))
+        return results
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from projects.models import Change
+
+
+class Command(BaseCommand):
+    help = (
+        "Compact the change log: drop changes of objects that changed again later, "
+        "and deletions older than CHANGE_LOG_RETENTION_DAYS, the change feed sends "
+        "older clients to a full sync"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help="Changes checked per DELETE")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = Change.objects.aggregate(last=Max('id'))['last'] or 0
+        superseded = 0
+        for start in range(0, last_pk, batch_size):
+            deleted, _ = Change.objects.filter(id__gt=start, id__lte=start + batch_size).superseded().delete()
+            superseded += deleted
+        expired, _ = Change.objects.expired().delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {superseded} superseded and {expired} expired changes"))
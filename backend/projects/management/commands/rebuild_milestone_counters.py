@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from projects.models import (
+    Project,
+    ROLLUP_COUNTERS,
+    ROLLUP_FIELDS,
+    health_from_rollup,
+    progress_from_rollup,
+)
+
+
+class Command(BaseCommand):
+    help = "Recount the denormalized milestone counters on every project and repair drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report drift, do not write anything")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Projects recounted per query")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        today = timezone.now().date()
+        checked = drifted = 0
+        last_pk = 0
+
+        while True:
+            ids = list(Project.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_pk = ids[-1]
+            checked += len(ids)
+
+            with transaction.atomic():
+                projects = Project.objects.filter(pk__in=ids).order_by('pk')
+                if not options['check']:
+                    # milestone deltas committing during the recount wait
+                    # for the repair instead of being overwritten by it
+                    list(projects.select_for_update().values_list('pk', flat=True))
+                batch = list(projects.values('pk', *ROLLUP_FIELDS))
+                rollups = projects.milestone_rollups(today)
+                repaired = []
+                for row in batch:
+                    rollup = rollups[row['pk']]
+                    expected = dict(
+                        rollup,
+                        progress=progress_from_rollup(rollup),
+                        health=health_from_rollup(rollup),
+                    )
+                    if all(row[field] == expected[field] for field in ROLLUP_FIELDS):
+                        continue
+                    drifted += 1
+                    self.stdout.write(
+                        f"project {row['pk']}: stored "
+                        + ", ".join(f"{field}={row[field]}" for field in ROLLUP_COUNTERS)
+                        + " recounted "
+                        + ", ".join(f"{field}={expected[field]}" for field in ROLLUP_COUNTERS)
+                    )
+                    repaired.append(Project(pk=row['pk'], **expected))
+
+                if repaired and not options['check']:
+                    Project.objects.bulk_update(repaired, ROLLUP_FIELDS)
+
+        if options['check'] and drifted:
+            raise CommandError(f"{drifted} of {checked} projects have drifted milestone counters")
+        action = "found" if options['check'] else "repaired"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} projects, {action} {drifted} with drift"))
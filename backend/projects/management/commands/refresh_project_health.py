@@ -0,0 +1,66 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from projects.models import Checkpoint, DUE_SOON_DAYS, Milestone, Project
+
+CHECKPOINT_NAME = 'project_health'
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-evaluate progress and health of projects whose open milestones became "
+        "overdue or due soon since the last run"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Projects recomputed per transaction")
+        parser.add_argument('--loop', action='store_true', help="Keep running, re-evaluating every --interval seconds")
+        parser.add_argument('--interval', type=int, default=3600, help="Seconds between runs with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            self.refresh(options['batch_size'])
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def refresh(self, batch_size):
+        today = timezone.now().date()
+        checkpoint = Checkpoint.objects.filter(name=CHECKPOINT_NAME).first()
+
+        if checkpoint is None:
+            # first run, nothing is known about the stored counters
+            project_ids = list(Project.objects.order_by('pk').values_list('pk', flat=True))
+        else:
+            project_ids = self.crossed_projects(checkpoint.evaluated_on, today)
+
+        for start in range(0, len(project_ids), batch_size):
+            with transaction.atomic():
+                Project.objects.filter(pk__in=project_ids[start:start + batch_size]).refresh_rollups(today)
+
+        Checkpoint.objects.update_or_create(name=CHECKPOINT_NAME, defaults={'evaluated_on': today})
+        self.stdout.write(self.style.SUCCESS(f"Re-evaluated {len(project_ids)} projects for {today}"))
+
+    def crossed_projects(self, last_run, today):
+        """
+        Projects with an open milestone that became overdue, or entered the
+        due-soon window, between the last run and today.
+        """
+        if last_run >= today:
+            return []
+        window = timedelta(days=DUE_SOON_DAYS)
+        crossed = (
+            Q(due_date__gte=last_run, due_date__lt=today)
+            | Q(due_date__gt=last_run + window, due_date__lte=today + window)
+        )
+        return list(
+            Milestone.objects.filter(crossed, completed=False)
+            .values_list('project_id', flat=True)
+            .order_by('project_id')
+            .distinct()
+        )
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.jobs import JOB_CHUNK_SIZE, claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the jobs queued by the bulk endpoints, oldest first. Several workers "
+        "can run side by side, each job is claimed by one of them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=JOB_CHUNK_SIZE, help="Units of work per transaction")
+        parser.add_argument('--loop', action='store_true', help="Keep running, polling every --interval seconds when idle")
+        parser.add_argument('--interval', type=float, default=1, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_job()
+            if job is not None:
+                job = run_job(job, options['chunk_size'])
+                self.stdout.write(f"{job}: {job.done}/{job.total} {job.error}".rstrip())
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:43
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+# Frozen copies of the rollup rules as they were when the counters were
+# added, so later changes to projects.models leave this migration alone
+DUE_SOON_DAYS = 7
+
+HEALTH_RULES = [
+    (90, 0, 'good'),
+    (70, 1, 'good'),
+    (50, 2, 'warning'),
+    (30, 3, 'warning'),
+]
+
+
+def rollup_aggregates(today):
+    due_soon_date = today + timedelta(days=DUE_SOON_DAYS)
+    return {
+        'milestones_total': Count('id'),
+        'milestones_completed': Count('id', filter=Q(completed=True)),
+        'milestones_overdue': Count('id', filter=Q(completed=False, due_date__lt=today)),
+        'milestones_due_soon': Count('id', filter=Q(completed=False, due_date__gte=today, due_date__lte=due_soon_date)),
+    }
+
+
+def progress_from_rollup(rollup):
+    if not rollup['milestones_total']:
+        return 0
+    return rollup['milestones_completed'] * 100 // rollup['milestones_total']
+
+
+def health_from_rollup(rollup):
+    if not rollup['milestones_total']:
+        return 'good'
+    progress = progress_from_rollup(rollup)
+    for min_progress, max_overdue, health in HEALTH_RULES:
+        if progress >= min_progress and rollup['milestones_overdue'] <= max_overdue:
+            return health
+    return 'critical'
+
+
+def backfill_milestone_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Milestone = apps.get_model('projects', 'Milestone')
+    rows = Milestone.objects.values('project_id').order_by().annotate(**rollup_aggregates(timezone.now().date()))
+    for row in rows:
+        project_id = row.pop('project_id')
+        Project.objects.filter(pk=project_id).update(
+            progress=progress_from_rollup(row),
+            health=health_from_rollup(row),
+            **row,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_milestone_assigned_to_milestone_completed_date_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='milestones_completed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='milestones_due_soon',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='milestones_overdue',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='milestones_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='team_roster',
+            field=models.ManyToManyField(blank=True, related_name='team_projects', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_milestone_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:48
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+from django.db.models import F
+
+# Projects whose search vector is filled in per UPDATE, each batch commits
+# on its own so row locks are held briefly
+BACKFILL_BATCH_SIZE = 1000
+
+# Keeps projects_project.search_vector in sync on every insert and on any
+# update touching title, description or tags, including queryset.update()
+SEARCH_VECTOR_TRIGGER = """
+CREATE OR REPLACE FUNCTION projects_project_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(
+            CASE WHEN jsonb_typeof(NEW.tags) = 'array'
+                THEN (SELECT string_agg(tag, ' ') FROM jsonb_array_elements_text(NEW.tags) AS tag)
+            END, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER projects_project_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, description, tags ON projects_project
+    FOR EACH ROW EXECUTE FUNCTION projects_project_search_vector();
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER IF EXISTS projects_project_search_vector_update ON projects_project;
+DROP FUNCTION IF EXISTS projects_project_search_vector();
+"""
+
+
+def backfill_search_vectors(apps, schema_editor):
+    # touching the title fires the trigger
+    Project = apps.get_model('projects', 'Project')
+    last_pk = 0
+    while True:
+        ids = list(Project.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BACKFILL_BATCH_SIZE])
+        if not ids:
+            break
+        Project.objects.filter(pk__in=ids).update(title=F('title'))
+        last_pk = ids[-1]
+
+
+class Migration(migrations.Migration):
+    # batched backfill and indexes built without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ('projects', '0004_milestone_open_due_idx_checkpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddField(
+            model_name='project',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGER, DROP_SEARCH_VECTOR_TRIGGER),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='project_search_vector_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('title', name='gin_trgm_ops'), name='project_title_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:49
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ('projects', '0005_project_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='project_tags_idx', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:50
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ('projects', '0006_project_tags_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='milestone',
+            index=models.Index(fields=['due_date', 'id'], name='milestone_due_date_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['-last_updated', '-id'], name='project_active_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:51
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ('projects', '0007_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='milestone',
+            index=models.Index(fields=['project', 'due_date', 'id'], name='milestone_project_due_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['status', '-last_updated'], name='project_active_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['health', '-last_updated'], name='project_active_health_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['owner', '-last_updated'], name='project_active_owner_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(condition=models.Q(('deleted', True)), fields=['-last_updated', '-id'], name='project_deleted_updated_idx'),
+        ),
+    ]
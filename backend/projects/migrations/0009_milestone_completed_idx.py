@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build the index without locking writes on a large table
+    atomic = False
+
+    dependencies = [
+        ('projects', '0008_filter_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='milestone',
+            index=models.Index(condition=models.Q(('completed', True)), fields=['completed_date', 'project'], name='milestone_completed_idx'),
+        ),
+    ]
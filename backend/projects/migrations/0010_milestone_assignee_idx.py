@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:20
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build the index without locking writes on a large table
+    atomic = False
+
+    dependencies = [
+        ('projects', '0009_milestone_completed_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='milestone',
+            index=models.Index(fields=['assigned_to', 'completed', 'due_date'], name='milestone_assignee_idx'),
+        ),
+    ]
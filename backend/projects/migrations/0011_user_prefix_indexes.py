@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:40
+
+from django.conf import settings
+from django.db import migrations
+
+# Typeahead indexes on auth_user for the istartswith lookups of
+# get_users, which compile to UPPER(column::text) LIKE UPPER('prefix%').
+# auth_user belongs to django.contrib.auth, so they are created with SQL.
+USER_PREFIX_COLUMNS = ['username', 'first_name', 'last_name']
+
+
+class Migration(migrations.Migration):
+    # build the indexes without locking writes on a large table
+    atomic = False
+
+    dependencies = [
+        ('projects', '0010_milestone_assignee_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS auth_user_{column}_prefix_idx '
+            f'ON auth_user (UPPER({column}::text) text_pattern_ops)',
+            f'DROP INDEX CONCURRENTLY IF EXISTS auth_user_{column}_prefix_idx',
+        )
+        for column in USER_PREFIX_COLUMNS
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# Existing projects and milestones logged per INSERT, each batch commits on
+# its own so the tables are not scanned in one long transaction
+SEED_BATCH_SIZE = 10000
+
+# Logs every insert, update and delete of projects and milestones into
+# projects_change, queryset updates and cascades included. Statement level,
+# a bulk update writes its changes in one INSERT. Updates that change
+# nothing (e.g. a rollup recount that comes out the same) are not logged.
+CHANGE_LOG_TRIGGERS = """
+CREATE OR REPLACE FUNCTION projects_log_changes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO projects_change (kind, object_id, txid, changed_at)
+        SELECT TG_ARGV[0], n.id, pg_current_xact_id()::text::bigint, clock_timestamp() FROM new_rows n;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO projects_change (kind, object_id, txid, changed_at)
+        SELECT TG_ARGV[0], n.id, pg_current_xact_id()::text::bigint, clock_timestamp()
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE o IS DISTINCT FROM n;
+    ELSE
+        INSERT INTO projects_change (kind, object_id, txid, changed_at)
+        SELECT TG_ARGV[0], o.id, pg_current_xact_id()::text::bigint, clock_timestamp() FROM old_rows o;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER projects_project_log_insert
+    AFTER INSERT ON projects_project REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION projects_log_changes('project');
+CREATE TRIGGER projects_project_log_update
+    AFTER UPDATE ON projects_project REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION projects_log_changes('project');
+CREATE TRIGGER projects_project_log_delete
+    AFTER DELETE ON projects_project REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION projects_log_changes('project');
+
+CREATE TRIGGER projects_milestone_log_insert
+    AFTER INSERT ON projects_milestone REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION projects_log_changes('milestone');
+CREATE TRIGGER projects_milestone_log_update
+    AFTER UPDATE ON projects_milestone REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION projects_log_changes('milestone');
+CREATE TRIGGER projects_milestone_log_delete
+    AFTER DELETE ON projects_milestone REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION projects_log_changes('milestone');
+"""
+
+DROP_CHANGE_LOG_TRIGGERS = """
+DROP TRIGGER IF EXISTS projects_project_log_insert ON projects_project;
+DROP TRIGGER IF EXISTS projects_project_log_update ON projects_project;
+DROP TRIGGER IF EXISTS projects_project_log_delete ON projects_project;
+DROP TRIGGER IF EXISTS projects_milestone_log_insert ON projects_milestone;
+DROP TRIGGER IF EXISTS projects_milestone_log_update ON projects_milestone;
+DROP TRIGGER IF EXISTS projects_milestone_log_delete ON projects_milestone;
+DROP FUNCTION IF EXISTS projects_log_changes();
+"""
+
+
+def seed_change_log(apps, schema_editor):
+    # one change per existing object, so a client syncing from scratch gets
+    # everything from the log
+    for kind, model_name in [('project', 'Project'), ('milestone', 'Milestone')]:
+        model = apps.get_model('projects', model_name)
+        last_pk = model.objects.aggregate(last=models.Max('pk'))['last'] or 0
+        for start in range(0, last_pk, SEED_BATCH_SIZE):
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO projects_change (kind, object_id, txid, changed_at) "
+                    f"SELECT %s, id, pg_current_xact_id()::text::bigint, now() FROM {model._meta.db_table} "
+                    f"WHERE id > %s AND id <= %s",
+                    [kind, start, start + SEED_BATCH_SIZE],
+                )
+
+
+class Migration(migrations.Migration):
+    # batched seeding, without scanning large tables in one transaction
+    atomic = False
+
+    dependencies = [
+        ('projects', '0011_user_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Project'), ('milestone', 'Milestone')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('txid', models.BigIntegerField()),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['txid', 'id'], name='change_position_idx'),
+                    models.Index(fields=['kind', 'object_id'], name='change_object_idx'),
+                ],
+            },
+        ),
+        migrations.RunSQL(CHANGE_LOG_TRIGGERS, DROP_CHANGE_LOG_TRIGGERS),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,419 @@
-from django.db import models
+import re
+
+from django.db import connection, models, transaction
+from django.db.models import Avg, Case, Count, Exists, F, FilteredRelation, Func, OuterRef, Q, Sum, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.lookups import Exact, GreaterThanOrEqual, LessThanOrEqual
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField, TrigramSimilarity
 from django.utils import timezone
 from datetime import timedelta
 
+from .signals import projects_changed
+
+# Milestones due within this many days count as upcoming
+DUE_SOON_DAYS = 7
+
+# Denormalized milestone counters stored on every project
+ROLLUP_COUNTERS = [
+    'milestones_total',
+    'milestones_completed',
+    'milestones_overdue',
+    'milestones_due_soon',
+]
+
+# Fields that are only written by milestone changes, never by Project.save()
+ROLLUP_FIELDS = ROLLUP_COUNTERS + ['progress', 'health']
+
+# Text search configuration used by the search_vector trigger and queries
+SEARCH_CONFIG = 'english'
+
+# (minimum progress, maximum overdue milestones, health), first match wins
+HEALTH_RULES = [
+    (90, 0, 'good'),
+    (70, 1, 'good'),
+    (50, 2, 'warning'),
+    (30, 3, 'warning'),
+]
+
+
+def empty_rollup():
+    return {counter: 0 for counter in ROLLUP_COUNTERS}
+
+
+def rollup_aggregates(today=None):
+    """
+    Conditional COUNT expressions for a milestone rollup, usable with
+    aggregate() for one project or annotate() on values('project') for many.
+    """
+    if today is None:
+        today = timezone.now().date()
+    due_soon_date = today + timedelta(days=DUE_SOON_DAYS)
+    return {
+        'milestones_total': Count('id'),
+        'milestones_completed': Count('id', filter=Q(completed=True)),
+        'milestones_overdue': Count('id', filter=Q(completed=False, due_date__lt=today)),
+        'milestones_due_soon': Count('id', filter=Q(completed=False, due_date__gte=today, due_date__lte=due_soon_date)),
+    }
+
+
+def workload_aggregates(today=None):
+    """
+    Counts of a user's open assigned milestones, for annotate() on a user
+    queryset. Only open milestones are joined so completed history is
+    never read.
+    """
+    if today is None:
+        today = timezone.now().date()
+    due_soon_date = today + timedelta(days=DUE_SOON_DAYS)
+    return {
+        'open_milestone': FilteredRelation('assigned_milestones', condition=Q(assigned_milestones__completed=False)),
+        'open': Count('open_milestone'),
+        'overdue': Count('open_milestone', filter=Q(open_milestone__due_date__lt=today)),
+        'due_soon': Count('open_milestone', filter=Q(open_milestone__due_date__gte=today, open_milestone__due_date__lte=due_soon_date)),
+    }
+
+
+def milestone_contribution(completed, due_date, today=None):
+    """
+    What a single milestone adds to its project's rollup, classified the
+    same way as rollup_aggregates().
+    """
+    if today is None:
+        today = timezone.now().date()
+    is_open = not completed and due_date is not None
+    return {
+        'milestones_total': 1,
+        'milestones_completed': int(bool(completed)),
+        'milestones_overdue': int(is_open and due_date < today),
+        'milestones_due_soon': int(is_open and today <= due_date <= today + timedelta(days=DUE_SOON_DAYS)),
+    }
+
+
+def progress_from_rollup(rollup):
+    if not rollup['milestones_total']:
+        return 0
+    return rollup['milestones_completed'] * 100 // rollup['milestones_total']
+
+
+def health_from_rollup(rollup):
+    if not rollup['milestones_total']:
+        return 'good'
+
+    progress = progress_from_rollup(rollup)
+    overdue_milestones = rollup['milestones_overdue']
+
+    # Health calculation logic
+    for min_progress, max_overdue, health in HEALTH_RULES:
+        if progress >= min_progress and overdue_milestones <= max_overdue:
+            return health
+    return 'critical'
+
+
+def progress_expression(counters):
+    """SQL version of progress_from_rollup() over counter expressions."""
+    return Case(
+        When(Exact(counters['milestones_total'], 0), then=Value(0)),
+        default=counters['milestones_completed'] * 100 / counters['milestones_total'],
+        output_field=models.PositiveIntegerField(),
+    )
+
+
+def health_expression(counters):
+    """SQL version of health_from_rollup() over counter expressions."""
+    progress = progress_expression(counters)
+    rules = [When(Exact(counters['milestones_total'], 0), then=Value('good'))]
+    for min_progress, max_overdue, health in HEALTH_RULES:
+        rules.append(When(
+            Q(GreaterThanOrEqual(progress, min_progress)) & Q(LessThanOrEqual(counters['milestones_overdue'], max_overdue)),
+            then=Value(health),
+        ))
+    return Case(*rules, default=Value('critical'), output_field=models.CharField())
+
+
+class TagUnion(Func):
+    """
+    Append tags to a JSONB array column inside the database, keeping the
+    existing order and dropping duplicates. A column holding NULL or any
+    other non-array value counts as no tags, as in tag_counts().
+    """
+    arg_joiner = ' || '
+    template = (
+        "(SELECT COALESCE(jsonb_agg(tag ORDER BY position), '[]'::jsonb) FROM ("
+        "SELECT DISTINCT ON (tag) tag, position "
+        "FROM jsonb_array_elements(%(expressions)s) WITH ORDINALITY AS merged(tag, position) "
+        "ORDER BY tag, position) AS merged)"
+    )
+    output_field = models.JSONField()
+
+    def __init__(self, expression, tags, **extra):
+        super().__init__(
+            Func(
+                expression,
+                template="CASE WHEN jsonb_typeof(%(expressions)s) = 'array' THEN %(expressions)s ELSE '[]'::jsonb END",
+                output_field=models.JSONField(),
+            ),
+            Value(list(tags), output_field=models.JSONField()),
+            **extra,
+        )
+
+
+def count_rollups(project_ids, today=None):
+    """
+    The rollups of the given projects, counted with one grouped query.
+    Returns {project_id: rollup}.
+    """
+    rollups = {pk: empty_rollup() for pk in project_ids}
+    rows = (
+        Milestone.objects.filter(project_id__in=list(rollups))
+        .values('project_id')
+        .order_by()
+        .annotate(**rollup_aggregates(today))
+    )
+    for row in rows:
+        rollups[row.pop('project_id')] = row
+    return rollups
+
+
+class ProjectQuerySet(models.QuerySet):
+    def apply_milestone_delta(self, delta, today=None):
+        """
+        Shift the total and completed counters by `delta` with F expressions,
+        recount the overdue and due-soon counters from the open milestones
+        and re-derive progress and health in the same UPDATE. The date based
+        counters depend on the day
+        a milestone was counted on, so a delta computed today could not undo
+        an earlier contribution. The projects are locked before the recount,
+        so it sees every milestone write committed ahead of this one.
+        """
+        project_ids = list(self.select_for_update().order_by('pk').values_list('pk', flat=True))
+        aggregates = rollup_aggregates(today)
+        open_counts = {pk: {'milestones_overdue': 0, 'milestones_due_soon': 0} for pk in project_ids}
+        rows = (
+            Milestone.objects.filter(project_id__in=project_ids, completed=False)
+            .values('project_id')
+            .order_by()
+            .annotate(milestones_overdue=aggregates['milestones_overdue'], milestones_due_soon=aggregates['milestones_due_soon'])
+        )
+        for row in rows:
+            open_counts[row.pop('project_id')] = row
+
+        updated = 0
+        for pk in project_ids:
+            counters = {
+                'milestones_total': F('milestones_total') + delta.get('milestones_total', 0),
+                'milestones_completed': F('milestones_completed') + delta.get('milestones_completed', 0),
+            }
+            counters.update({counter: Value(count) for counter, count in open_counts[pk].items()})
+            updated += Project.objects.filter(pk=pk).update(
+                progress=progress_expression(counters),
+                health=health_expression(counters),
+                **counters,
+            )
+        return updated
+
+    def with_related(self):
+        """
+        Load everything ProjectSerializer reads (owner, team roster ids and
+        milestones with their assignees) in a fixed number of queries.
+        Roster ids and milestones come in the order the compiled serializer
+        lists them.
+        """
+        return self.defer('search_vector').select_related('owner').prefetch_related(
+            models.Prefetch('team_roster', queryset=get_user_model().objects.only('id').order_by('id')),
+            models.Prefetch('milestones', queryset=Milestone.objects.select_related('assigned_to').order_by('due_date', 'id')),
+        )
+
+    def search(self, text):
+        """
+        Full-text search over title, tags and description with prefix
+        matching on every word, plus fuzzy trigram matching on the title.
+        Matches are annotated with a `rank`.
+        """
+        words = re.findall(r'\w+', text)
+        if not words:
+            return self.none()
+        query = SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config=SEARCH_CONFIG)
+        return self.filter(Q(search_vector=query) | Q(title__trigram_similar=text)).annotate(
+            rank=SearchRank(F('search_vector'), query) + TrigramSimilarity('title', text),
+        )
+
+    def with_tags(self, tags, match='all'):
+        """
+        Exact tag membership using JSONB containment, served by the GIN index
+        on tags. `match` is 'all' (every tag present) or 'any'.
+        """
+        tags = list(tags)
+        if not tags:
+            return self
+        if match == 'any':
+            condition = Q()
+            for tag in tags:
+                condition |= Q(tags__contains=[tag])
+            return self.filter(condition)
+        return self.filter(tags__contains=tags)
+
+    def tag_counts(self):
+        """
+        How many projects in the queryset carry each tag, most used first.
+        """
+        sql, params = self.order_by().values('tags').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tag, COUNT(*) AS count "
+                f"FROM ({sql}) AS filtered "
+                "CROSS JOIN LATERAL jsonb_array_elements_text("
+                "CASE WHEN jsonb_typeof(filtered.tags) = 'array' THEN filtered.tags ELSE '[]'::jsonb END"
+                ") AS tag "
+                "GROUP BY tag ORDER BY count DESC, tag",
+                params,
+            )
+            return [{'tag': tag, 'count': count} for tag, count in cursor.fetchall()]
+
+    def portfolio_totals(self):
+        """
+        Project count, average progress, milestone totals and the number of
+        projects per status and health, read from the stored counters with
+        one aggregate query.
+        """
+        aggregates = {
+            'projects': Count('id'),
+            'average_progress': Avg('progress'),
+            'milestones_total': Sum('milestones_total', default=0),
+            'milestones_completed': Sum('milestones_completed', default=0),
+            'milestones_overdue': Sum('milestones_overdue', default=0),
+        }
+        for value, label in Project.STATUS_CHOICES:
+            aggregates[f'status_{value}'] = Count('id', filter=Q(status=value))
+        for value, label in Project.HEALTH_CHOICES:
+            aggregates[f'health_{value}'] = Count('id', filter=Q(health=value))
+        row = self.order_by().aggregate(**aggregates)
+
+        average_progress = row['average_progress']
+        return {
+            'projects': row['projects'],
+            'average_progress': round(average_progress, 1) if average_progress is not None else None,
+            'milestones': {
+                'total': row['milestones_total'],
+                'completed': row['milestones_completed'],
+                'overdue': row['milestones_overdue'],
+            },
+            'by_status': {value: row[f'status_{value}'] for value, label in Project.STATUS_CHOICES},
+            'by_health': {value: row[f'health_{value}'] for value, label in Project.HEALTH_CHOICES},
+        }
+
+    def overdue_by_owner(self):
+        """
+        Projects and overdue milestones per owner, most overdue first.
+        """
+        rows = (
+            self.order_by()
+            .values('owner', 'owner__username')
+            .annotate(projects=Count('id'), overdue=Sum('milestones_overdue'))
+            .order_by('-overdue', 'owner__username')
+        )
+        return [
+            {'owner': row['owner'], 'owner_name': row['owner__username'], 'projects': row['projects'], 'overdue': row['overdue']}
+            for row in rows
+        ]
+
+    def overdue_by_tag(self):
+        """
+        Projects and overdue milestones per tag, most overdue first.
+        """
+        sql, params = self.order_by().values('tags', 'milestones_overdue').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tag, COUNT(*) AS projects, SUM(filtered.milestones_overdue) AS overdue "
+                f"FROM ({sql}) AS filtered "
+                "CROSS JOIN LATERAL jsonb_array_elements_text("
+                "CASE WHEN jsonb_typeof(filtered.tags) = 'array' THEN filtered.tags ELSE '[]'::jsonb END"
+                ") AS tag "
+                "GROUP BY tag ORDER BY overdue DESC, tag",
+                params,
+            )
+            return [
+                {'tag': tag, 'projects': projects, 'overdue': overdue}
+                for tag, projects, overdue in cursor.fetchall()
+            ]
+
+    def completion_throughput(self, start, end):
+        """
+        Milestones of the queryset's projects completed in each week from
+        `start` to `end`, weeks starting on Monday. Weeks without a
+        completion are included with a count of 0.
+        """
+        # grouped by day so milestone_completed_idx is read index-only,
+        # the days are folded into weeks here
+        rows = (
+            Milestone.objects.filter(
+                project__in=self.order_by().values('pk'),
+                completed=True,
+                completed_date__gte=start,
+                completed_date__lte=end,
+            )
+            .values('completed_date')
+            .annotate(completed=Count('*'))
+            .order_by()
+        )
+        counts = {}
+        for row in rows:
+            day = row['completed_date']
+            week = day - timedelta(days=day.weekday())
+            counts[week] = counts.get(week, 0) + row['completed']
+        week = start - timedelta(days=start.weekday())
+        throughput = []
+        while week <= end:
+            throughput.append({'week': week, 'completed': counts.get(week, 0)})
+            week += timedelta(weeks=1)
+        return throughput
+
+    def update_status_and_tags(self, status=None, tags=None):
+        """
+        Set the status and merge tags of every project in the queryset with
+        one UPDATE. Neither field affects the rollup so Project.save() is
+        skipped entirely.
+        """
+        values = {'last_updated': timezone.now()}
+        if status:
+            values['status'] = status
+        if tags:
+            values['tags'] = TagUnion(F('tags'), tags)
+        updated = self.update(**values)
+        projects_changed.send(sender=Project, project_ids=None)
+        return updated
+
+    def milestone_rollups(self, today=None):
+        """
+        Recount the rollup of every project in the queryset with one grouped
+        query. Returns {project_id: rollup}.
+        """
+        return count_rollups(self.values_list('pk', flat=True), today)
+
+    def refresh_rollups(self, today=None, batch_size=1000):
+        """
+        Recount the rollup of every project in the queryset and write the
+        counters, progress and health back with bulk_update, for the
+        projects where they changed only. The projects are locked first, as
+        in apply_milestone_delta, so a milestone delta committing during the
+        recount waits for it instead of being overwritten.
+        """
+        with transaction.atomic(savepoint=False):
+            project_ids = list(self.select_for_update().order_by('pk').values_list('pk', flat=True))
+            stored = {row.pop('pk'): row for row in Project.objects.filter(pk__in=project_ids).values('pk', *ROLLUP_FIELDS)}
+            changed = []
+            for pk, rollup in count_rollups(stored, today).items():
+                values = dict(rollup, progress=progress_from_rollup(rollup), health=health_from_rollup(rollup))
+                if values != stored[pk]:
+                    changed.append(Project(pk=pk, **values))
+            Project.objects.bulk_update(changed, ROLLUP_FIELDS, batch_size=batch_size)
+        # the milestones of every project may have changed, e.g. renamed
+        projects_changed.send(sender=Project, project_ids=list(stored))
+        return len(stored)
+
+
 # The project Model
 class Project(models.Model):
     HEALTH_CHOICES = [
@@ -31,21 +442,61 @@ class Project(models.Model):
 
     deleted = models.BooleanField(default=False)
 
+    # Weighted title/tags/description document, maintained by a database
+    # trigger so every write path keeps it current
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Milestone counters, kept up to date by Milestone writes. The overdue
+    # and due-soon counters are classified on the day of the write.
+    milestones_total = models.IntegerField(default=0)
+    milestones_completed = models.IntegerField(default=0)
+    milestones_overdue = models.IntegerField(default=0)
+    milestones_due_soon = models.IntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateTimeField(auto_now=True)
 
+    objects = ProjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='project_search_vector_idx'),
+            GinIndex(OpClass('title', name='gin_trgm_ops'), name='project_title_trgm_idx'),
+            GinIndex(fields=['tags'], name='project_tags_idx', opclasses=['jsonb_path_ops']),
+            # keyset pages of active projects, newest first
+            models.Index(fields=['-last_updated', '-id'], condition=Q(deleted=False), name='project_active_updated_idx'),
+            # list filters on active projects, each ordered by last_updated
+            models.Index(fields=['status', '-last_updated'], condition=Q(deleted=False), name='project_active_status_idx'),
+            models.Index(fields=['health', '-last_updated'], condition=Q(deleted=False), name='project_active_health_idx'),
+            models.Index(fields=['owner', '-last_updated'], condition=Q(deleted=False), name='project_active_owner_idx'),
+            # deleted_projects
+            models.Index(fields=['-last_updated', '-id'], condition=Q(deleted=True), name='project_deleted_updated_idx'),
+        ]
+
+    # Returns the stored milestone counters
+    def stored_rollup(self):
+        return {counter: getattr(self, counter) for counter in ROLLUP_COUNTERS}
+
+    # Recounts the milestones the progress and health rules run on
+    def milestone_rollup(self):
+        """
+        Count total, completed, overdue and due-soon milestones in a single
+        conditional aggregation query.
+        """
+        if not self.pk:
+            return empty_rollup()
+        return self.milestones.aggregate(**rollup_aggregates())
+
     # Calculated the progress of the project
-    def calculate_progress(self):
+    def calculate_progress(self, rollup=None):
         # if the project hasn't been saved yet we skip
         if not self.pk:
             return 0
-        milestones = self.milestones.all()
-        if not milestones:
-            return 0
-        completed = milestones.filter(completed=True).count()
-        return int((completed / milestones.count()) * 100)
+        if rollup is None:
+            rollup = self.stored_rollup()
+        return progress_from_rollup(rollup)
 
-    def calculate_health(self):
+    def calculate_health(self, rollup=None):
         """
         Calculate project health based on multiple factors:
         - Progress percentage
@@ -55,44 +506,21 @@ class Project(models.Model):
         """
         if not self.pk:
             return 'good'
-        
-        milestones = self.milestones.all()
-        if not milestones:
-            return 'good'
-        
-        # Calculate progress
-        progress = self.calculate_progress()
-        
-        # Check for overdue milestones
-        today = timezone.now().date()
-        overdue_milestones = milestones.filter(
-            due_date__lt=today,
-            completed=False
-        ).count()
-        
-        # Check for upcoming deadlines (within 7 days)
-        upcoming_deadline = timezone.now().date() + timedelta(days=7)
-        upcoming_milestones = milestones.filter(
-            due_date__lte=upcoming_deadline,
-            due_date__gte=today,
-            completed=False
-        ).count()
-        
-        # Health calculation logic
-        if progress >= 90 and overdue_milestones == 0:
-            return 'good'
-        elif progress >= 70 and overdue_milestones <= 1:
-            return 'good'
-        elif progress >= 50 and overdue_milestones <= 2:
-            return 'warning'
-        elif progress >= 30 and overdue_milestones <= 3:
-            return 'warning'
-        else:
-            return 'critical'
+        if rollup is None:
+            rollup = self.stored_rollup()
+        return health_from_rollup(rollup)
 
     def save(self, *args, **kwargs):
-        self.progress = self.calculate_progress()
-        self.health = self.calculate_health()
+        # The rollup fields are maintained by milestone writes and the search
+        # vector by the database, a regular save must not overwrite them
+        # with whatever this instance loaded
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = set(ROLLUP_FIELDS) | {'search_vector'}
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped and field.attname not in deferred
+            ]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -115,24 +543,85 @@ class Milestone(models.Model):
     completed_date = models.DateField(null=True, blank=True)
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
     assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_milestones')
-    
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, *args, **kwargs):
+    class Meta:
+        indexes = [
+            # open milestones by due date: overdue, due_soon and the health refresh job
+            models.Index(fields=['due_date'], condition=Q(completed=False), name='milestone_open_due_idx'),
+            # keyset pages of milestones by due date
+            models.Index(fields=['due_date', 'id'], name='milestone_due_date_id_idx'),
+            # by_project, ordered by due date
+            models.Index(fields=['project', 'due_date', 'id'], name='milestone_project_due_idx'),
+            # per-assignee workload counts and open milestone lists
+            models.Index(fields=['assigned_to', 'completed', 'due_date'], name='milestone_assignee_idx'),
+            # completion throughput by completed_date, covering the project join
+            models.Index(fields=['completed_date', 'project'], condition=Q(completed=True), name='milestone_completed_idx'),
+        ]
+
+    # The fields that decide where a milestone lands in its project's rollup
+    ROLLUP_STATE_FIELDS = ['project_id', 'completed', 'due_date']
+
+    def _previous_rollup_state(self):
+        """
+        The stored state this write replaces, read with the row locked so
+        concurrent writes to the same milestone apply their deltas one after
+        the other instead of both starting from the same state.
+        """
+        if self._state.adding:
+            return None
+        return Milestone.objects.select_for_update().filter(pk=self.pk).values_list(*self.ROLLUP_STATE_FIELDS).first()
+
+    @staticmethod
+    def _apply_rollup_change(previous, current, milestone_id=None):
+        """
+        Move a milestone's rollup contribution from its previous state to its
+        current one, either of which may be None.
+        """
+        deltas = {}
+        for state, sign in [(previous, -1), (current, 1)]:
+            if state is not None:
+                project_id, completed, due_date = state
+                delta = deltas.setdefault(project_id, {'milestones_total': 0, 'milestones_completed': 0})
+                delta['milestones_total'] += sign
+                delta['milestones_completed'] += sign * int(bool(completed))
+        for project_id, delta in deltas.items():
+            # a changed due date alone still moves the date based counters
+            Project.objects.filter(pk=project_id).apply_milestone_delta(delta)
+        projects_changed.send(
+            sender=Milestone, project_ids=list(deltas), milestone_ids=[milestone_id] if milestone_id else [],
+        )
+
+    def sync_completed_date(self, today=None):
         # Set completed_date when milestone is marked as completed
         if self.completed and not self.completed_date:
-            self.completed_date = timezone.now().date()
+            self.completed_date = today or timezone.now().date()
         elif not self.completed:
             self.completed_date = None
-        
-        super().save(*args, **kwargs)
-        
-        # Update project progress and health when milestone is saved
-        if self.project:
-            self.project.progress = self.project.calculate_progress()
-            self.project.health = self.project.calculate_health()
-            self.project.save(update_fields=['progress', 'health'])
+
+    # The milestone and its project's counters are written in one
+    # transaction, so on_commit hooks see both
+    def save(self, *args, **kwargs):
+        self.sync_completed_date()
+
+        with transaction.atomic(savepoint=False):
+            previous = self._previous_rollup_state()
+            super().save(*args, **kwargs)
+
+            # Update project counters, progress and health when milestone is saved
+            current = (self.project_id, self.completed, self.due_date)
+            if current != previous:
+                self._apply_rollup_change(previous, current, self.pk)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            previous = self._previous_rollup_state()
+            milestone_id = self.pk
+            result = super().delete(*args, **kwargs)
+            self._apply_rollup_change(previous, None, milestone_id)
+        return result
 
     def is_overdue(self):
         """Check if milestone is overdue"""
@@ -140,7 +629,7 @@ class Milestone(models.Model):
             return False
         return self.due_date < timezone.now().date()
 
-    def is_due_soon(self, days=7):
+    def is_due_soon(self, days=DUE_SOON_DAYS):
         """Check if milestone is due within specified days"""
         if not self.due_date or self.completed:
             return False
@@ -149,3 +638,125 @@ class Milestone(models.Model):
 
     def __str__(self):
         return f"{self.name} ({'done' if self.completed else 'pending'})"
+
+
+# Remembers the last day a scheduled job evaluated, e.g. the health refresh
+class Checkpoint(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    evaluated_on = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.evaluated_on})"
+
+
+class ChangeQuerySet(models.QuerySet):
+    def visible(self):
+        """
+        Changes written by transactions that had all ended when the current
+        snapshot was taken. A transaction still running gets a txid at or
+        above the snapshot's xmin, and may yet commit changes that sort
+        before ones already visible, so the feed stops short of it.
+        """
+        return self.filter(txid__lt=RawSQL("pg_snapshot_xmin(pg_current_snapshot())::text::bigint", []))
+
+    def after(self, position):
+        """Changes that sort after a (txid, id) position, None for all"""
+        if position is None:
+            return self
+        txid, pk = position
+        # the >= gives the index scan its start
+        return self.filter(txid__gte=txid).filter(Q(txid__gt=txid) | Q(id__gt=pk))
+
+    def superseded(self):
+        """Changes of objects that changed again later, the feed sends objects as they are now"""
+        newer = Change.objects.filter(kind=OuterRef('kind'), object_id=OuterRef('object_id')).filter(
+            Q(txid__gt=OuterRef('txid')) | Q(txid=OuterRef('txid'), id__gt=OuterRef('id'))
+        )
+        return self.filter(Exists(newer))
+
+    def expired(self, now=None):
+        """
+        The last changes of deleted projects and milestones older than
+        CHANGE_LOG_RETENTION_DAYS, clients that synced before then are sent
+        to a full sync. Only meaningful once superseded changes are gone.
+        """
+        now = now or timezone.now()
+        old = self.filter(changed_at__lt=now - timedelta(days=settings.CHANGE_LOG_RETENTION_DAYS))
+        return old.filter(
+            Q(kind=Change.PROJECT) & ~Exists(Project.objects.filter(pk=OuterRef('object_id')))
+            | Q(kind=Change.MILESTONE) & ~Exists(Milestone.objects.filter(pk=OuterRef('object_id')))
+        )
+
+
+# A project or milestone created, updated or deleted, written by database
+# triggers on every write path, queryset updates and cascades included
+# (migration 0012). The change feed reads them in (txid, id) order.
+class Change(models.Model):
+    PROJECT = 'project'
+    MILESTONE = 'milestone'
+    KIND_CHOICES = [
+        (PROJECT, 'Project'),
+        (MILESTONE, 'Milestone'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # the writing transaction, pg_current_xact_id()
+    txid = models.BigIntegerField()
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    objects = ChangeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # the change feed
+            models.Index(fields=['txid', 'id'], name='change_position_idx'),
+            # superseded changes, pruned by prune_changes
+            models.Index(fields=['kind', 'object_id'], name='change_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+# A bulk operation run by the job worker (manage.py run_jobs) instead of
+# inside the request, see projects/jobs.py
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+
+    # units of work, e.g. projects updated, done out of total
+    total = models.IntegerField(default=0)
+    done = models.IntegerField(default=0)
+    result = models.JSONField(default=dict)
+    error = models.TextField(blank=True)
+
+    # claims by workers, a running job whose lease expired is claimed again
+    attempts = models.IntegerField(default=0)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the worker's queue, oldest first
+            models.Index(fields=['created_at', 'id'], condition=Q(status__in=['queued', 'running']), name='job_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
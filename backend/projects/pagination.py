@@ -0,0 +1,210 @@
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def approximate_count(queryset):
+    """
+    The planner's row estimate for the queryset, read from EXPLAIN instead
+    of running a full COUNT.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def encode_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def keyset_after(ordering, position):
+    """
+    WHERE clause selecting the rows that sort after `position`, the ordering
+    values of the last row of the previous page. NULLs sort last ascending
+    and first descending, as they do in PostgreSQL.
+    """
+    branches = []
+    ties = Q()
+    for field, value in zip(ordering, position):
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        if value is None:
+            # nothing sorts after NULL ascending, everything non-NULL does descending
+            if descending:
+                branches.append(ties & Q(**{f'{name}__isnull': False}))
+            ties &= Q(**{f'{name}__isnull': True})
+        else:
+            after = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+            if not descending:
+                after |= Q(**{f'{name}__isnull': True})
+            branches.append(ties & after)
+            ties &= Q(**{name: value})
+    condition = Q()
+    for branch in branches:
+        condition |= branch
+    return condition
+
+
+# Limit/offset pagination that switches to keyset pagination on ?cursor=
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Without a cursor parameter this behaves exactly like
+    LimitOffsetPagination. With ?cursor= (empty for the first page) each
+    page is selected with a WHERE on the previous page's last ordering
+    values plus the primary key, so deep pages cost the same as the first
+    and no COUNT runs unless ?count=exact or ?count=approximate is passed.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    # subclasses for endpoints without offset pages set this to True
+    keyset_by_default = False
+    keyset = False
+
+    def get_ordering(self, queryset):
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if len(ordering) != len(queryset.query.order_by):
+            return None
+        if not ordering:
+            ordering = ['-pk']
+        # the primary key breaks ties so every row has a unique position
+        if ordering[-1].lstrip('-') not in ('pk', 'id'):
+            ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+        return ordering
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        except (TypeError, ValueError):
+            raise NotFound("Invalid cursor")
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound("Invalid cursor")
+        return position
+
+    def encode_cursor(self, instance):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                # rows from values() are keyed by the full lookup
+                value = instance[self.pk_name if name == 'pk' else name]
+            else:
+                value = instance
+                for attr in name.split('__'):
+                    value = getattr(value, attr)
+            position.append(encode_value(value))
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def get_keyset_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if not mode:
+            return None
+        if mode == 'exact':
+            return queryset.order_by().count()
+        if mode == 'approximate':
+            return approximate_count(queryset)
+        raise ValidationError({self.count_query_param: "Must be 'exact' or 'approximate'."})
+
+    async def aget_keyset_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return await queryset.order_by().acount()
+        if mode == 'approximate':
+            return await sync_to_async(approximate_count)(queryset)
+        return self.get_keyset_count(queryset, request)
+
+    def use_keyset(self, queryset, request):
+        self.keyset = self.keyset_by_default or self.cursor_query_param in request.query_params
+        self.ordering = self.get_ordering(queryset) if self.keyset else None
+        if self.ordering is None:
+            self.keyset = False
+        return self.keyset
+
+    def keyset_queryset(self, queryset, request):
+        """The rows after the cursor, one more than the page to tell if there is a next page"""
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(keyset_after(self.ordering, position))
+        return queryset[:self.limit + 1]
+
+    def keyset_page(self, page):
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_keyset(queryset, request):
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.pk_name = queryset.model._meta.pk.name
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count = self.get_keyset_count(queryset.order_by(*self.ordering), request)
+        return self.keyset_page(list(self.keyset_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() with the queries run through the async ORM"""
+        self.request = request
+        self.pk_name = queryset.model._meta.pk.name
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        if not self.use_keyset(queryset, request):
+            # LimitOffsetPagination.paginate_queryset
+            self.count = await queryset.acount()
+            self.offset = self.get_offset(request)
+            if self.count > self.limit and self.template is not None:
+                self.display_page_controls = True
+            if self.count == 0 or self.offset > self.count:
+                return []
+            return [row async for row in queryset[self.offset:self.offset + self.limit]]
+
+        self.count = await self.aget_keyset_count(queryset.order_by(*self.ordering), request)
+        return self.keyset_page([row async for row in self.keyset_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response['count'] = self.count
+        return Response(response)
+
+
+# Keyset pages without the ?cursor= opt-in, for the workload endpoint
+class WorkloadPagination(KeysetPagination):
+    keyset_by_default = True
+    default_limit = 50
+    max_limit = 500
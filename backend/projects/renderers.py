@@ -0,0 +1,46 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# orjson writes U+2028 and U+2029 raw, JSONRenderer escapes them so the
+# output stays valid JavaScript
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+# JSONRenderer with the encoding done by orjson when it is installed
+class FastJSONRenderer(JSONRenderer):
+    """
+    Produces the same JSON as JSONRenderer's compact output: UTC datetimes
+    end in Z, Decimal becomes a float, and anything else orjson does not
+    know is handed to DRF's JSONEncoder. Unlike STRICT_JSON, NaN and
+    Infinity become null instead of raising. Falls back to JSONRenderer when
+    orjson is missing, for indented output (the browsable API) and for
+    values orjson cannot encode, such as integers wider than 64 bits.
+    """
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+    default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
@@ -1,9 +1,129 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Project, Milestone
+from django.utils import timezone
+from .models import Job, Project, Milestone
+
+
+def requested_fields(request):
+    """
+    The field names asked for with ?fields=a,b,c on a read request, or None
+    when the caller wants every field.
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    fields = request.query_params.get('fields', '')
+    names = {name.strip() for name in fields.split(',') if name.strip()}
+    return names or None
+
+
+# Trims the serializer down to the fields named in ?fields=
+class SparseFieldsMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+# Looks related ids up in objects a bulk request loaded up front, falls
+# back to one query per value outside of bulk requests
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.field_name)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in preloaded:
+            self.fail('does_not_exist', pk_value=data)
+        return preloaded[pk]
+
+
+# Validates and writes lists of milestones with a fixed number of queries
+class MilestoneListSerializer(serializers.ListSerializer):
+    """
+    Related projects and users for the whole list are loaded with one
+    query each. When updating, `instance` is the list of milestones being
+    changed and every item names its milestone with "id". Writes use
+    bulk_create/bulk_update and the rollups of every affected project are
+    recounted once at the end.
+    """
+    preloaded_fields = ['project', 'assigned_to']
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            preloaded = {}
+            for name in self.preloaded_fields:
+                field = self.child.fields[name]
+                ids = set()
+                for item in data:
+                    try:
+                        ids.add(int(item[name]))
+                    except (KeyError, TypeError, ValueError):
+                        pass
+                preloaded[name] = field.get_queryset().in_bulk(ids) if ids else {}
+            self.context['preloaded'] = preloaded
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+        if not hasattr(self, 'instances_by_id'):
+            self.instances_by_id = {milestone.pk: milestone for milestone in self.instance}
+        if not isinstance(data, dict) or data.get('id') is None:
+            raise serializers.ValidationError({'id': ["This field is required."]})
+        try:
+            instance = self.instances_by_id.get(int(data['id']))
+        except (TypeError, ValueError):
+            instance = None
+        if instance is None:
+            raise serializers.ValidationError({'id': [f'Invalid pk "{data["id"]}" - object does not exist.']})
+        self.child.instance = instance
+        self.child.initial_data = data
+        validated = super().run_child_validation(data)
+        validated['id'] = instance.pk
+        return validated
+
+    def create(self, validated_data):
+        today = timezone.now().date()
+        milestones = [Milestone(**attrs) for attrs in validated_data]
+        for milestone in milestones:
+            milestone.sync_completed_date(today)
+        Milestone.objects.bulk_create(milestones)
+        Project.objects.filter(pk__in={milestone.project_id for milestone in milestones}).refresh_rollups(today)
+        return milestones
+
+    def update(self, instances, validated_data):
+        today = timezone.now().date()
+        by_id = {milestone.pk: milestone for milestone in instances}
+        affected_projects = set()
+        fields = {'completed_date', 'updated_at'}
+        updated = []
+        for attrs in validated_data:
+            milestone = by_id[attrs.pop('id')]
+            affected_projects.add(milestone.project_id)
+            for name, value in attrs.items():
+                setattr(milestone, name, value)
+                fields.add(name)
+            milestone.sync_completed_date(today)
+            # bulk_update skips auto_now
+            milestone.updated_at = timezone.now()
+            # the project the milestone moved to, if it moved
+            affected_projects.add(milestone.project_id)
+            updated.append(milestone)
+        Milestone.objects.bulk_update(updated, sorted(fields))
+        Project.objects.filter(pk__in=affected_projects).refresh_rollups(today)
+        return updated
+
 
 # Handles CRUD for milestones with enhanced fields
 class MilestoneSerializer(serializers.ModelSerializer):
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
     assigned_to_name = serializers.CharField(source='assigned_to.username', read_only=True)
     is_overdue = serializers.SerializerMethodField()
     is_due_soon = serializers.SerializerMethodField()
@@ -27,6 +147,7 @@ class MilestoneSerializer(serializers.ModelSerializer):
             'is_due_soon'
         ]
         read_only_fields = ['completed_date', 'created_at', 'updated_at']
+        list_serializer_class = MilestoneListSerializer
     
     def get_is_overdue(self, obj):
         return obj.is_overdue()
@@ -35,7 +156,7 @@ class MilestoneSerializer(serializers.ModelSerializer):
         return obj.is_due_soon()
    
 # Handles CRUD for projects and includes milestones inline     
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # We nest the milestones inside the project responses
     milestones = MilestoneSerializer(many=True, read_only=True)
     owner_name = serializers.CharField(source='owner.username', read_only=True)
@@ -63,4 +184,50 @@ class ProjectSerializer(serializers.ModelSerializer):
             'last_updated',
             'milestones',
         ]
-        read_only_fields = ['progress', 'health', 'created_at', 'last_updated']
\ No newline at end of file
+        read_only_fields = ['progress', 'health', 'created_at', 'last_updated']
+
+# Project cards without the nested milestones, used for list responses
+# unless the caller asks for ?expand=milestones
+class ProjectListSerializer(ProjectSerializer):
+    class Meta(ProjectSerializer.Meta):
+        fields = [field for field in ProjectSerializer.Meta.fields if field != 'milestones']
+
+
+# An open milestone in a user's workload
+class WorkloadMilestoneSerializer(serializers.ModelSerializer):
+    project_title = serializers.CharField(source='project.title', read_only=True)
+    is_overdue = serializers.SerializerMethodField()
+    is_due_soon = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Milestone
+        fields = ['id', 'name', 'project', 'project_title', 'due_date', 'priority', 'is_overdue', 'is_due_soon']
+
+    def get_is_overdue(self, obj):
+        return obj.is_overdue()
+
+    def get_is_due_soon(self, obj):
+        return obj.is_due_soon()
+
+
+# A user with the counts and list of their open assigned milestones
+class UserWorkloadSerializer(serializers.ModelSerializer):
+    open = serializers.IntegerField(read_only=True)
+    overdue = serializers.IntegerField(read_only=True)
+    due_soon = serializers.IntegerField(read_only=True)
+    milestones = WorkloadMilestoneSerializer(source='open_milestones', many=True, read_only=True)
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'open', 'overdue', 'due_soon', 'milestones']
+
+
+# A queued bulk operation, see projects/jobs.py
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'status', 'total', 'done', 'result', 'error',
+            'attempts', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
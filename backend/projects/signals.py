@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent after project or milestone rows changed without going through
+# Model.save()/delete(), e.g. queryset updates. `project_ids` lists the
+# affected projects, or is None when they are not known. Milestone writes
+# also pass `milestone_ids`, the milestones written.
+projects_changed = Signal()
@@ -1,3 +1,1530 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import io
+import json
+import threading
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import JSONField, Value
+from django.core.cache import caches
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .async_views import RenderedResponse
+from .changes import encode_token
+from .jobs import ProjectStatusJob, claim_job, enqueue, run_job
+from .live import PostgresBroker, Subscription, get_broker, notify_payloads
+from .compiled import CompiledMilestoneSerializer, CompiledProjectSerializer
+from .models import Change, Checkpoint, Job, Project, Milestone, count_rollups, empty_rollup, health_from_rollup, progress_from_rollup
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .serializers import MilestoneSerializer, ProjectListSerializer, ProjectSerializer
+from .signals import projects_changed
+from .views import MilestoneViewSet, ProjectViewSet, get_users
+
+
+class QueryCountMixin:
+    """
+    Asserts an endpoint runs a fixed number of queries no matter how many
+    rows it returns, so N+1 regressions fail the build. Subclasses should
+    disable the response cache.
+    """
+
+    def assertEndpointQueries(self, expected, url, method='get', **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400, response.content)
+        executed = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(
+            len(executed), expected,
+            f"{method.upper()} {url} ran {len(executed)} queries, expected {expected}:\n" + "\n".join(executed),
+        )
+        return response
+
+
+def seed_projects(owner, count, milestones=3, deleted=False):
+    users = [User.objects.get_or_create(username=f'{owner.username}-member-{i}')[0] for i in range(2)]
+    today = timezone.now().date()
+    projects = []
+    for i in range(count):
+        project = Project.objects.create(title=f'Project {i}', owner=owner, tags=['Frontend'], deleted=deleted)
+        project.team_roster.set(users)
+        for j in range(milestones):
+            Milestone.objects.create(
+                project=project,
+                name=f'Milestone {j}',
+                due_date=today + timedelta(days=j - 1),
+                assigned_to=users[j % len(users)],
+            )
+        projects.append(project)
+    return projects
+
+
+class ProjectRollupTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='owner')
+        self.project = Project.objects.create(title='Rollup', owner=self.owner)
+        today = timezone.now().date()
+        for completed, due_date in [
+            (True, today - timedelta(days=3)),   # completed, never overdue
+            (False, today - timedelta(days=1)),  # overdue
+            (False, today),                      # due soon
+            (False, today + timedelta(days=7)),  # due soon, last day of the window
+            (False, today + timedelta(days=8)),  # outside the window
+            (False, None),                       # no due date
+        ]:
+            Milestone.objects.create(project=self.project, name='M', completed=completed, due_date=due_date)
+
+    def test_rollup_is_one_query(self):
+        with self.assertNumQueries(1):
+            rollup = self.project.milestone_rollup()
+        self.assertEqual(rollup, {
+            'milestones_total': 6,
+            'milestones_completed': 1,
+            'milestones_overdue': 1,
+            'milestones_due_soon': 2,
+        })
+        self.assertEqual(Project(title='Unsaved', owner=self.owner).milestone_rollup(), empty_rollup())
+
+    def test_progress_and_health_rules(self):
+        rollup = self.project.milestone_rollup()
+        self.assertEqual(self.project.calculate_progress(rollup), 16)
+        self.assertEqual(self.project.calculate_health(rollup), 'critical')
+
+        def health(total, completed, overdue):
+            rollup = {'milestones_total': total, 'milestones_completed': completed, 'milestones_overdue': overdue, 'milestones_due_soon': 0}
+            return health_from_rollup(rollup)
+
+        self.assertEqual(health(0, 0, 0), 'good')
+        self.assertEqual(health(10, 9, 0), 'good')
+        self.assertEqual(health(10, 9, 1), 'good')
+        self.assertEqual(health(10, 7, 2), 'warning')
+        self.assertEqual(health(10, 5, 2), 'warning')
+        self.assertEqual(health(10, 3, 3), 'warning')
+        self.assertEqual(health(10, 3, 4), 'critical')
+        self.assertEqual(health(10, 2, 0), 'critical')
+        self.assertEqual(progress_from_rollup({'milestones_total': 3, 'milestones_completed': 1}), 33)
+
+
+class MilestoneCounterTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='owner')
+        self.project = Project.objects.create(title='Counters', owner=self.owner)
+        self.other = Project.objects.create(title='Other', owner=self.owner)
+        self.today = timezone.now().date()
+
+    def assertCountersMatch(self, *projects):
+        for project in projects:
+            project.refresh_from_db()
+            rollup = project.milestone_rollup()
+            self.assertEqual(project.stored_rollup(), rollup)
+            self.assertEqual((project.progress, project.health), (progress_from_rollup(rollup), health_from_rollup(rollup)))
+
+    def later(self, days):
+        return mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(days=days))
+
+    def test_writes_keep_counters_exact(self):
+        milestone = Milestone.objects.create(project=self.project, name='M1', due_date=self.today + timedelta(days=2))
+        Milestone.objects.create(project=self.project, name='M2', completed=True)
+        self.assertCountersMatch(self.project)
+
+        milestone.due_date = self.today - timedelta(days=1)
+        milestone.save()
+        self.assertCountersMatch(self.project)
+
+        milestone.project = self.other
+        milestone.save()
+        self.assertCountersMatch(self.project, self.other)
+
+        milestone.delete()
+        self.assertCountersMatch(self.other)
+        self.assertEqual(self.other.milestones_total, 0)
+
+    def test_completing_after_the_due_date_passed(self):
+        # counted as due soon, overdue by the time it is completed
+        milestone = Milestone.objects.create(project=self.project, name='M1', due_date=self.today + timedelta(days=1))
+        with self.later(3):
+            milestone.completed = True
+            milestone.save()
+            self.assertCountersMatch(self.project)
+        self.assertEqual((self.project.milestones_overdue, self.project.milestones_due_soon), (0, 0))
+
+        # and reopened a week later
+        with self.later(10):
+            milestone.completed = False
+            milestone.save()
+            self.assertCountersMatch(self.project)
+        self.assertEqual(self.project.milestones_overdue, 1)
+
+    def test_stale_instances_do_not_apply_twice(self):
+        milestone = Milestone.objects.create(project=self.project, name='M1')
+        first, second = Milestone.objects.get(pk=milestone.pk), Milestone.objects.get(pk=milestone.pk)
+        first.completed = True
+        first.save()
+        second.completed = True
+        second.save()
+        self.assertCountersMatch(self.project)
+        self.assertEqual(self.project.milestones_completed, 1)
+
+    def test_rebuild_reports_and_repairs_drift(self):
+        Milestone.objects.create(project=self.project, name='M1', completed=True)
+        Project.objects.filter(pk=self.project.pk).update(milestones_completed=0, progress=0)
+
+        out = io.StringIO()
+        with self.assertRaisesMessage(CommandError, '1 of 2 projects have drifted'):
+            call_command('rebuild_milestone_counters', check=True, stdout=out)
+        self.assertIn(f'project {self.project.pk}: stored', out.getvalue())
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.progress, 0)
+
+        call_command('rebuild_milestone_counters', stdout=io.StringIO())
+        self.assertCountersMatch(self.project)
+        self.assertEqual(self.project.progress, 100)
+
+
+class HealthRefreshTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='owner')
+        self.today = timezone.now().date()
+        self.soon = Project.objects.create(title='Soon', owner=self.owner)
+        self.later = Project.objects.create(title='Later', owner=self.owner)
+        self.quiet = Project.objects.create(title='Quiet', owner=self.owner)
+        Milestone.objects.create(project=self.soon, name='M1', due_date=self.today + timedelta(days=1))
+        Milestone.objects.create(project=self.later, name='M2', due_date=self.today + timedelta(days=9))
+        Milestone.objects.create(project=self.quiet, name='M3', due_date=self.today + timedelta(days=60))
+
+    def refresh(self, days=0):
+        out = io.StringIO()
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(days=days)):
+            call_command('refresh_project_health', stdout=out)
+        return out.getvalue()
+
+    def test_only_crossed_projects_are_refreshed(self):
+        self.assertIn('Re-evaluated 3 projects', self.refresh())
+        self.assertEqual(Checkpoint.objects.get(name='project_health').evaluated_on, self.today)
+        self.assertIn('Re-evaluated 0 projects', self.refresh())
+
+        # three days on, M1 is overdue and M2 entered the due-soon window
+        self.assertIn('Re-evaluated 2 projects', self.refresh(days=3))
+        for project in [self.soon, self.later]:
+            project.refresh_from_db()
+        self.assertEqual((self.soon.milestones_overdue, self.soon.milestones_due_soon, self.soon.health), (1, 0, 'critical'))
+        self.assertEqual((self.later.milestones_overdue, self.later.milestones_due_soon), (0, 1))
+        self.assertEqual(Checkpoint.objects.get(name='project_health').evaluated_on, self.today + timedelta(days=3))
+
+    def test_completed_milestones_are_not_crossed(self):
+        Milestone.objects.filter(project=self.soon).update(completed=True)
+        self.refresh()
+        self.assertIn('Re-evaluated 1 projects', self.refresh(days=3))
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ProjectQueryCountTests(QueryCountMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(username='owner')
+
+    def test_list_is_constant(self):
+        seed_projects(self.owner, 2)
+        self.assertEndpointQueries(3, '/api/projects/')
+        seed_projects(self.owner, 8)
+        response = self.assertEndpointQueries(3, '/api/projects/')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertNotIn('milestones', response.data['results'][0])
+
+    def test_expanded_list_is_constant(self):
+        seed_projects(self.owner, 10)
+        response = self.assertEndpointQueries(4, '/api/projects/', data={'expand': 'milestones'})
+        self.assertEqual(len(response.data['results'][0]['milestones']), 3)
+
+    def test_sparse_fields_list(self):
+        seed_projects(self.owner, 10)
+        response = self.assertEndpointQueries(2, '/api/projects/', data={'fields': 'id,progress,health'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'progress', 'health'})
+
+    def test_retrieve_is_constant(self):
+        project = seed_projects(self.owner, 1, milestones=10)[0]
+        self.assertEndpointQueries(3, f'/api/projects/{project.pk}/')
+
+    def test_advanced_search_is_constant(self):
+        seed_projects(self.owner, 10)
+        self.assertEndpointQueries(3, '/api/projects/advanced_search/', data={'search': 'Project'})
+        self.assertEndpointQueries(4, '/api/projects/advanced_search/', data={'search': 'Project', 'expand': 'milestones'})
+
+    def test_deleted_projects_is_constant(self):
+        seed_projects(self.owner, 10, deleted=True)
+        self.assertEndpointQueries(3, '/api/projects/deleted_projects/')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class MilestoneQueryCountTests(QueryCountMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(username='owner')
+        self.project = seed_projects(self.owner, 1, milestones=10)[0]
+
+    def test_by_project_is_constant(self):
+        self.assertEndpointQueries(1, '/api/milestones/by_project/', data={'project_id': self.project.pk})
+
+    def test_overdue_and_due_soon_are_constant(self):
+        self.assertEndpointQueries(1, '/api/milestones/overdue/')
+        self.assertEndpointQueries(1, '/api/milestones/due_soon/')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class MilestoneBulkStatusTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(username='owner')
+
+    def bulk_update_status(self, projects, completed):
+        milestone_ids = list(Milestone.objects.filter(project__in=projects).values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/milestones/bulk_update_status/', {
+                'milestone_ids': milestone_ids, 'completed': completed,
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), len(context.captured_queries)
+
+    def test_rollups_are_recounted(self):
+        projects = seed_projects(self.owner, 2)
+        data, _ = self.bulk_update_status(projects, True)
+        self.assertEqual(data, {'updated': 6, 'completed': True, 'affected_projects': 2})
+        for project in projects:
+            project.refresh_from_db()
+            self.assertEqual(project.stored_rollup(), project.milestone_rollup())
+            self.assertEqual((project.progress, project.health, project.milestones_overdue), (100, 'good', 0))
+
+        self.bulk_update_status(projects[:1], False)
+        projects[0].refresh_from_db()
+        self.assertEqual(projects[0].stored_rollup(), projects[0].milestone_rollup())
+        self.assertEqual(projects[0].progress, 0)
+        self.assertEqual(Milestone.objects.filter(completed_date__isnull=False).count(), 3)
+
+    def test_query_count_does_not_grow_with_projects(self):
+        _, few = self.bulk_update_status(seed_projects(self.owner, 2), True)
+        _, many = self.bulk_update_status(seed_projects(User.objects.create(username='other'), 8), True)
+        self.assertEqual(few, many)
+
+
+class RollupRefreshRaceTests(TransactionTestCase):
+    def wait_for_lock(self, thread):
+        # until the thread finished or waits on a row lock
+        for attempt in range(100):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND datname = current_database()"
+                )
+                if not thread.is_alive() or cursor.fetchone()[0]:
+                    return
+            thread.join(0.05)
+
+    def test_delta_during_refresh_is_kept(self):
+        project = seed_projects(User.objects.create(username='owner'), 1)[0]
+        # drifted, so the refresh writes
+        Project.objects.filter(pk=project.pk).update(milestones_total=0)
+
+        def add_milestone():
+            Milestone.objects.create(project=project, name='Added')
+            connection.close()
+
+        thread = threading.Thread(target=add_milestone)
+        recount = count_rollups
+
+        def count_then_add(*args, **kwargs):
+            rollups = recount(*args, **kwargs)
+            thread.start()
+            self.wait_for_lock(thread)
+            return rollups
+
+        with mock.patch('projects.models.count_rollups', count_then_add):
+            Project.objects.filter(pk=project.pk).refresh_rollups()
+        thread.join(10)
+        project.refresh_from_db()
+        self.assertEqual(project.milestones_total, 4)
+        self.assertEqual(project.stored_rollup(), project.milestone_rollup())
+
+
+class ProjectSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = User.objects.create(username='owner')
+        self.dashboard = Project.objects.create(title='Analytics dashboard', owner=owner, tags=['Frontend'])
+        self.migration = Project.objects.create(title='Database migration', description='Move reports to the new warehouse', owner=owner)
+
+    def search(self, url, term):
+        response = self.client.get(url, {'search': term})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [project['id'] for project in response.data['results']]
+
+    def test_prefix_and_tag_matches(self):
+        for url in ('/api/projects/', '/api/projects/advanced_search/'):
+            self.assertEqual(self.search(url, 'dash'), [self.dashboard.pk])
+            self.assertEqual(self.search(url, 'frontend'), [self.dashboard.pk])
+            self.assertEqual(self.search(url, 'warehouse'), [self.migration.pk])
+
+    def test_fuzzy_title_match(self):
+        self.assertEqual(self.search('/api/projects/', 'Analytcs dashbord'), [self.dashboard.pk])
+
+    def test_search_vector_follows_queryset_updates(self):
+        Project.objects.filter(pk=self.migration.pk).update_status_and_tags(tags=['Backend'])
+        self.assertEqual(self.search('/api/projects/', 'backend'), [self.migration.pk])
+
+
+class ProjectTagFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = User.objects.create(username='owner')
+        self.ui = Project.objects.create(title='Redesign', owner=owner, tags=['UI', 'Frontend'])
+        self.gui = Project.objects.create(title='Installer', owner=owner, tags=['GUI'])
+        self.api = Project.objects.create(title='Gateway', owner=owner, tags=['Backend', 'Frontend'])
+
+    def ids(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return {project['id'] for project in response.data['results']}
+
+    def test_tags_match_exactly(self):
+        for url in ('/api/projects/', '/api/projects/advanced_search/'):
+            self.assertEqual(self.ids(url, tags='UI'), {self.ui.pk})
+            self.assertEqual(self.ids(url, tags='UI,Frontend'), {self.ui.pk})
+            self.assertEqual(self.ids(url, tags='UI,Backend', tags_match='any'), {self.ui.pk, self.api.pk})
+
+    def test_tag_counts(self):
+        response = self.client.get('/api/projects/tag_counts/')
+        self.assertEqual(response.data[0], {'tag': 'Frontend', 'count': 2})
+        self.assertEqual(len(response.data), 4)
+        response = self.client.get('/api/projects/tag_counts/', {'tags': 'Backend'})
+        self.assertEqual(response.data, [{'tag': 'Backend', 'count': 1}, {'tag': 'Frontend', 'count': 1}])
+
+
+class ProjectBulkUpdateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(username='owner')
+        self.project = Project.objects.create(title='Tagged', owner=self.owner, tags=['Frontend', 'Urgent'])
+
+    def bulk_update(self, **data):
+        return self.client.post('/api/projects/bulk_update/', data, format='json')
+
+    def tags(self, project):
+        return Project.objects.filter(pk=project.pk).values_list('tags', flat=True)[0]
+
+    def test_tag_merge_keeps_order_and_drops_duplicates(self):
+        response = self.bulk_update(ids=[self.project.pk, self.project.pk], tags=['Backend', 'Frontend', 'Backend', 'API'])
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(self.tags(self.project), ['Frontend', 'Urgent', 'Backend', 'API'])
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.status, self.project.milestones_total), ('active', 0))
+
+    def test_non_array_tags_count_as_empty(self):
+        empty = Project.objects.create(title='Empty', owner=self.owner, tags=[])
+        null = Project.objects.create(title='Null', owner=self.owner)
+        scalar = Project.objects.create(title='Scalar', owner=self.owner)
+        Project.objects.filter(pk=null.pk).update(tags=Value(None, JSONField()))
+        Project.objects.filter(pk=scalar.pk).update(tags=Value('Frontend', JSONField()))
+
+        self.bulk_update(ids=[empty.pk, null.pk, scalar.pk], tags=['Backend'])
+        for project in [empty, null, scalar]:
+            self.assertEqual(self.tags(project), ['Backend'])
+
+    def test_status_only_and_validation(self):
+        deleted = Project.objects.create(title='Deleted', owner=self.owner, deleted=True)
+        response = self.bulk_update(ids=[self.project.pk, deleted.pk], status='on_hold')
+        self.assertEqual(response.json(), {'updated': 1, 'status': 'on_hold', 'tags_added': []})
+        self.assertEqual(self.tags(self.project), ['Frontend', 'Urgent'])
+        self.assertEqual(Project.objects.get(pk=deleted.pk).status, 'active')
+
+        self.assertEqual(self.bulk_update(ids=[]).status_code, 400)
+        self.assertEqual(self.bulk_update(ids=[self.project.pk], status='nope').status_code, 400)
+        self.assertEqual(self.bulk_update(ids=[self.project.pk], tags='Backend').status_code, 400)
+        self.assertEqual(self.bulk_update(ids=[self.project.pk], tags=[1]).status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = User.objects.create(username='owner')
+        self.projects = [Project.objects.create(title=f'Project {i}', owner=owner) for i in range(7)]
+        # ties on the ordering column must not drop or repeat rows
+        Project.objects.filter(pk__in=[p.pk for p in self.projects[2:5]]).update(last_updated=timezone.now())
+        today = timezone.now().date()
+        for i in range(7):
+            Milestone.objects.create(project=self.projects[0], name=f'M{i}', due_date=None if i % 3 == 0 else today + timedelta(days=i % 2))
+
+    def walk(self, url, **params):
+        seen = []
+        params = dict(params, cursor='', limit=2)
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200, response.content)
+            seen += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                return seen, response
+            response = self.client.get(response.data['next'])
+
+    def test_project_pages_cover_every_row_once(self):
+        expected = list(Project.objects.order_by('-last_updated', '-pk').values_list('pk', flat=True))
+        seen, _ = self.walk('/api/projects/')
+        self.assertEqual(seen, expected)
+        seen, _ = self.walk('/api/projects/advanced_search/', ordering='title')
+        self.assertEqual(seen, list(Project.objects.order_by('title', 'pk').values_list('pk', flat=True)))
+
+    def test_milestone_pages_with_null_due_dates(self):
+        expected = list(Milestone.objects.order_by('due_date', 'pk').values_list('pk', flat=True))
+        seen, _ = self.walk('/api/milestones/by_project/', project_id=self.projects[0].pk)
+        self.assertEqual(seen, expected)
+
+    def test_counts_are_opt_in(self):
+        response = self.client.get('/api/projects/', {'cursor': ''})
+        self.assertNotIn('count', response.data)
+        response = self.client.get('/api/projects/', {'cursor': '', 'count': 'exact'})
+        self.assertEqual(response.data['count'], 7)
+        response = self.client.get('/api/projects/', {'cursor': '', 'count': 'approximate'})
+        self.assertIn('count', response.data)
+
+    def test_offset_pagination_still_default(self):
+        response = self.client.get('/api/projects/', {'limit': 2, 'offset': 2})
+        self.assertEqual(response.data['count'], 7)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class IndexUsageTests(TestCase):
+    """
+    Runs EXPLAIN on every query an endpoint issues and fails if any of them
+    has to fall back to a sequential scan. Sequential scans are disabled
+    for the EXPLAIN, so one only shows up when no index can serve the query.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='owner')
+        today = timezone.now().date()
+        projects = Project.objects.bulk_create([
+            Project(title=f'Project {i}', owner=owner, tags=[f'Tag {i % 7}'], deleted=i % 10 == 0)
+            for i in range(300)
+        ])
+        Milestone.objects.bulk_create([
+            Milestone(project=project, name=f'Milestone {j}', due_date=today + timedelta(days=j * 3 - 6), assigned_to=owner)
+            for project in projects for j in range(5)
+        ])
+        cls.project = projects[1]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE projects_project; ANALYZE projects_milestone')
+
+    def sequential_scans(self, plan):
+        scans = []
+        if plan['Node Type'] == 'Seq Scan':
+            scans.append(plan['Relation Name'])
+        for child in plan.get('Plans', []):
+            scans += self.sequential_scans(child)
+        return scans
+
+    def assertIndexed(self, url, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {query['sql']}")
+                plan = cursor.fetchone()[0][0]['Plan']
+                scans = self.sequential_scans(plan)
+                self.assertFalse(scans, f"{url} {params} scans {scans} sequentially:\n{query['sql']}")
+            cursor.execute('RESET enable_seqscan')
+
+    def test_project_endpoints(self):
+        self.assertIndexed('/api/projects/')
+        self.assertIndexed('/api/projects/', cursor='')
+        self.assertIndexed('/api/projects/', status='active')
+        self.assertIndexed('/api/projects/', health='good')
+        self.assertIndexed('/api/projects/', owner=self.project.owner_id)
+        self.assertIndexed('/api/projects/', tags='Tag 1', expand='milestones')
+        self.assertIndexed('/api/projects/', search='project')
+        self.assertIndexed(f'/api/projects/{self.project.pk}/')
+        self.assertIndexed('/api/projects/advanced_search/', tags='Tag 1,Tag 2', tags_match='any')
+        self.assertIndexed('/api/projects/deleted_projects/')
+
+    def test_milestone_endpoints(self):
+        self.assertIndexed('/api/milestones/')
+        self.assertIndexed('/api/milestones/by_project/', project_id=self.project.pk)
+        self.assertIndexed('/api/milestones/overdue/')
+        self.assertIndexed('/api/milestones/due_soon/')
+        self.assertIndexed('/api/milestones/workload/', users=str(self.project.owner_id))
+
+    def test_user_endpoints(self):
+        self.assertIndexed('/api/users/', search='own')
+        self.assertIndexed('/api/users/', cursor='')
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.owner = User.objects.create(username='owner')
+        self.project = Project.objects.create(title='Cached', owner=self.owner)
+        self.other = Project.objects.create(title='Other', owner=self.owner)
+        self.milestone = Milestone.objects.create(project=self.project, name='M1')
+
+    def test_repeated_reads_skip_the_database(self):
+        first = self.client.get('/api/projects/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/projects/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+
+    def test_etag_returns_not_modified(self):
+        etag = self.client.get('/api/users/')['ETag']
+        response = self.client.get('/api/users/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        User.objects.create(username='newcomer')
+        response = self.client.get('/api/users/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_milestone_writes_invalidate_their_project_only(self):
+        url = '/api/milestones/by_project/'
+        self.client.get(url, {'project_id': self.project.pk})
+        self.client.get(url, {'project_id': self.other.pk})
+        self.client.get('/api/projects/')
+
+        self.milestone.completed = True
+        self.milestone.save()
+
+        self.assertEqual(self.client.get(url, {'project_id': self.project.pk})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url, {'project_id': self.other.pk})['X-Cache'], 'HIT')
+        response = self.client.get('/api/projects/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        progress = {project['id']: project['progress'] for project in response.json()['results']}
+        self.assertEqual(progress[self.project.pk], 100)
+
+    def test_bulk_updates_invalidate(self):
+        self.client.get('/api/projects/')
+        self.client.post('/api/projects/bulk_update/', {'ids': [self.other.pk], 'status': 'on_hold'}, format='json')
+        self.assertEqual(self.client.get('/api/projects/')['X-Cache'], 'MISS')
+
+        self.client.get('/api/milestones/overdue/')
+        self.client.post('/api/milestones/bulk_update_status/', {'milestone_ids': [self.milestone.pk], 'completed': True}, format='json')
+        self.assertEqual(self.client.get('/api/milestones/overdue/')['X-Cache'], 'MISS')
+
+    def test_bulk_update_status_invalidates(self):
+        self.client.get('/api/projects/')
+        response = self.client.post('/api/projects/bulk_update_status/', {'ids': [self.other.pk], 'status': 'on_hold'}, format='json')
+        self.assertEqual(response.json()['updated'], 1)
+        response = self.client.get('/api/projects/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        statuses = {project['id']: project['status'] for project in response.json()['results']}
+        self.assertEqual(statuses[self.other.pk], 'on_hold')
+
+    def test_stats(self):
+        self.client.get('/api/milestones/due_soon/')
+        self.client.get('/api/milestones/due_soon/')
+        stats = self.client.get('/api/cache-stats/').data
+        self.assertEqual(stats['due_soon_milestones'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+
+class ProjectExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(username='owner')
+        self.project = Project.objects.create(title='Launch', owner=self.owner, tags=['web', 'q3'])
+        Milestone.objects.create(project=self.project, name='Design', assigned_to=self.owner)
+        Milestone.objects.create(project=self.project, name='Ship')
+        Project.objects.create(title='Empty', owner=self.owner)
+        Project.objects.create(title='Gone', owner=self.owner, deleted=True)
+
+    def test_ndjson_nests_milestones(self):
+        response = self.client.get('/api/projects/export/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = {row['title']: row for row in map(json.loads, lines)}
+        self.assertEqual(set(rows), {'Launch', 'Empty'})
+        self.assertEqual([m['name'] for m in rows['Launch']['milestones']], ['Design', 'Ship'])
+        self.assertEqual(rows['Launch']['milestones'][0]['assigned_to_name'], 'owner')
+        self.assertEqual(rows['Empty']['milestones'], [])
+
+    def test_csv_has_a_row_per_milestone(self):
+        response = self.client.get('/api/projects/export/', {'output': 'csv', 'tags': 'web'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['milestone_name'] for row in rows], ['Design', 'Ship'])
+        self.assertEqual(rows[0]['project_tags'], 'web;q3')
+
+    async def test_asgi_export_streams(self):
+        response = await self.async_client.get('/api/projects/export/', {'output': 'csv'})
+        # a sync iterator would be read whole before the first byte is sent
+        self.assertTrue(response.is_async)
+        self.assertTrue(hasattr(response.streaming_content, '__anext__'))
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertCountEqual([row['milestone_name'] for row in rows], ['Design', 'Ship', ''])
+
+    def test_unknown_output_is_rejected(self):
+        response = self.client.get('/api/projects/export/', {'output': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProjectImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(username='owner')
+        self.today = timezone.now().date()
+
+    def post_ndjson(self, records, **params):
+        body = '\n'.join(json.dumps(record) for record in records)
+        query = '?dry_run=true' if params.get('dry_run') else ''
+        return self.client.post(f'/api/projects/import/{query}', body, content_type='application/x-ndjson')
+
+    def test_import_creates_projects_with_rollups(self):
+        records = [
+            {
+                'title': f'Imported {n}',
+                'owner_name': 'owner',
+                'tags': ['migrated'],
+                'milestones': [
+                    {'name': 'Done', 'completed': True},
+                    {'name': 'Late', 'due_date': str(self.today - timedelta(days=3)), 'assigned_to': self.owner.pk},
+                ],
+            }
+            for n in range(20)
+        ]
+        # one user lookup and two inserts inside a savepoint
+        with self.assertNumQueries(5):
+            response = self.post_ndjson(records)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['projects'], 20)
+        self.assertEqual(response.data['milestones'], 40)
+
+        project = Project.objects.get(title='Imported 0')
+        self.assertEqual(project.milestones_overdue, 1)
+        self.assertEqual(project.progress, 50)
+        self.assertEqual(project.health, 'warning')
+        self.assertEqual(project.calculate_progress(project.milestone_rollup()), project.progress)
+        self.assertIsNotNone(project.milestones.get(name='Done').completed_date)
+        self.assertTrue(Project.objects.search('imported').exists())
+
+    def test_errors_are_reported_per_row_and_nothing_is_written(self):
+        response = self.post_ndjson([
+            {'title': 'Fine', 'owner': self.owner.pk},
+            {'title': 'Bad', 'owner_name': 'nobody', 'status': 'unknown'},
+            {'title': 'Bad milestone', 'owner': self.owner.pk, 'milestones': [{'name': 'M'}, {'due_date': 'soon'}]},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(set(errors), {2, 3})
+        self.assertEqual(set(errors[2]), {'owner', 'status'})
+        self.assertEqual(errors[3]['milestones'][0], {})
+        self.assertEqual(set(errors[3]['milestones'][1]), {'name', 'due_date'})
+        self.assertFalse(Project.objects.exists())
+
+    def test_dry_run_validates_only(self):
+        response = self.post_ndjson([{'title': 'Trial', 'owner': self.owner.pk}], dry_run=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['projects'], 1)
+        self.assertFalse(Project.objects.exists())
+
+    def test_export_csv_round_trips(self):
+        project = Project.objects.create(title='Source', owner=self.owner, tags=['a', 'b'])
+        Milestone.objects.create(project=project, name='One', completed=True)
+        Milestone.objects.create(project=project, name='Two', assigned_to=self.owner)
+        Project.objects.create(title='Bare', owner=self.owner)
+        export = b''.join(self.client.get('/api/projects/export/', {'output': 'csv'}).streaming_content)
+
+        response = self.client.post('/api/projects/import/', export, content_type='text/csv')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['projects'], 2)
+        copy = Project.objects.exclude(pk=project.pk).get(title='Source')
+        self.assertEqual(copy.tags, ['a', 'b'])
+        self.assertEqual(copy.progress, 50)
+        self.assertEqual(sorted(copy.milestones.values_list('name', flat=True)), ['One', 'Two'])
+
+
+class MilestoneBulkTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(username='owner')
+        self.project = Project.objects.create(title='Template', owner=self.owner)
+        self.other = Project.objects.create(title='Other', owner=self.owner)
+        self.today = timezone.now().date()
+
+    def test_bulk_create_recounts_each_project_once(self):
+        payload = [
+            {'project': self.project.pk, 'name': f'Step {n}', 'assigned_to': self.owner.pk,
+             'completed': n < 20, 'due_date': str(self.today + timedelta(days=n))}
+            for n in range(60)
+        ]
+        # savepoint, project and user lookups, one insert, project lock,
+        # rollup recount and write
+        with self.assertNumQueries(9):
+            response = self.client.post('/api/milestones/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 60)
+        self.assertEqual(response.data[0]['assigned_to_name'], 'owner')
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.milestones_total, 60)
+        self.assertEqual(self.project.progress, 33)
+        self.assertEqual(self.project.stored_rollup(), self.project.milestone_rollup())
+
+    def test_bulk_create_is_all_or_nothing(self):
+        response = self.client.post('/api/milestones/bulk/', [
+            {'project': self.project.pk, 'name': 'Fine'},
+            {'project': 999999, 'name': 'Orphan'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        # errors are keyed by the position of the invalid items
+        self.assertEqual(list(response.json()), ['1'])
+        self.assertIn('project', response.json()['1'])
+        self.assertFalse(Milestone.objects.exists())
+
+    def test_bulk_update_and_delete(self):
+        first = Milestone.objects.create(project=self.project, name='A')
+        second = Milestone.objects.create(project=self.project, name='B')
+
+        response = self.client.patch('/api/milestones/bulk/', [
+            {'id': first.pk, 'completed': True},
+            {'id': second.pk, 'project': self.other.pk},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        first.refresh_from_db()
+        self.assertTrue(first.completed)
+        self.assertEqual(first.completed_date, self.today)
+        self.assertEqual(first.name, 'A')
+        self.project.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.project.milestones_total, self.project.progress), (1, 100))
+        self.assertEqual(self.other.milestones_total, 1)
+
+        response = self.client.patch('/api/milestones/bulk/', [{'id': 999999, 'name': 'Missing'}], format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.delete('/api/milestones/bulk/', {'ids': [first.pk, second.pk]}, format='json')
+        self.assertEqual(response.data, {'deleted': 2, 'affected_projects': 2})
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.milestones_total, self.project.progress), (0, 0))
+
+    def test_bulk_delete_rejects_bad_ids(self):
+        milestone = Milestone.objects.create(project=self.project, name='A')
+        for ids in [['a'], [milestone.pk, None], [{'id': milestone.pk}]]:
+            response = self.client.delete('/api/milestones/bulk/', {'ids': ids}, format='json')
+            self.assertEqual(response.status_code, 400, ids)
+        self.assertTrue(Milestone.objects.filter(pk=milestone.pk).exists())
+        response = self.client.delete('/api/milestones/bulk/', {'ids': [str(milestone.pk), 2 ** 70]}, format='json')
+        self.assertEqual(response.data, {'deleted': 1, 'affected_projects': 1})
+
+    def test_single_milestone_create_is_unchanged(self):
+        response = self.client.post('/api/milestones/', {'project': self.project.pk, 'name': 'One'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.milestones_total, 1)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class PortfolioStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.today = timezone.now().date()
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        late = Project.objects.create(title='Late', owner=self.alice, tags=['web'])
+        Milestone.objects.create(project=late, name='Overdue', due_date=self.today - timedelta(days=2))
+        Milestone.objects.create(project=late, name='Done', completed=True)
+        on_track = Project.objects.create(title='On track', owner=self.bob, tags=['web', 'api'], status='on_hold')
+        Milestone.objects.create(project=on_track, name='Done', completed=True)
+        old = Milestone.objects.create(project=on_track, name='Done earlier', completed=True)
+        Milestone.objects.filter(pk=old.pk).update(completed_date=self.today - timedelta(weeks=3))
+        Project.objects.create(title='Gone', owner=self.bob, deleted=True)
+
+    def test_stats(self):
+        # totals, per owner, per tag and throughput
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/projects/stats/')
+        data = response.json()
+        self.assertEqual(data['projects'], 2)
+        self.assertEqual(data['average_progress'], 75.0)
+        self.assertEqual(data['milestones'], {'total': 4, 'completed': 3, 'overdue': 1})
+        self.assertEqual(data['by_status']['on_hold'], 1)
+        self.assertEqual(data['overdue_by_owner'][0], {'owner': self.alice.pk, 'owner_name': 'alice', 'projects': 1, 'overdue': 1})
+        self.assertEqual(data['overdue_by_tag'], [
+            {'tag': 'web', 'projects': 2, 'overdue': 1},
+            {'tag': 'api', 'projects': 1, 'overdue': 0},
+        ])
+        weeks = data['completed_per_week']
+        self.assertEqual(len(weeks), 13 if self.today.weekday() else 12)
+        self.assertEqual(weeks[-1]['completed'], 2)
+        self.assertEqual(sum(week['completed'] for week in weeks), 3)
+
+    def test_stats_filters(self):
+        data = self.client.get('/api/projects/stats/', {'owner': self.bob.pk, 'since': str(self.today)}).json()
+        self.assertEqual(data['projects'], 1)
+        self.assertEqual([week['completed'] for week in data['completed_per_week']], [1])
+        response = self.client.get('/api/projects/stats/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class WorkloadTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        today = timezone.now().date()
+        self.users = User.objects.bulk_create([User(username=f'user{n:03}') for n in range(30)])
+        project = Project.objects.create(title='Shared', owner=self.users[0])
+        Milestone.objects.bulk_create([
+            Milestone(project=project, name=f'{user.username} {n}', assigned_to=user, due_date=today + timedelta(days=n * 5 - 5))
+            for user in self.users[:25] for n in range(3)
+        ] + [Milestone(project=project, name='Closed', assigned_to=self.users[0], completed=True)])
+
+    def test_workload_counts_and_milestones(self):
+        # the page of users with their counts, then their open milestones
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/milestones/workload/', {'limit': 200})
+        data = response.json()
+        self.assertEqual(len(data['results']), 25)
+        first = data['results'][0]
+        self.assertEqual(first['username'], 'user000')
+        self.assertEqual((first['open'], first['overdue'], first['due_soon']), (3, 1, 2))
+        self.assertEqual([m['name'] for m in first['milestones']], ['user000 0', 'user000 1', 'user000 2'])
+        self.assertEqual(first['milestones'][0]['project_title'], 'Shared')
+
+    def test_workload_for_chosen_users_pages_by_cursor(self):
+        ids = ','.join(str(user.pk) for user in self.users[20:])
+        response = self.client.get('/api/milestones/workload/', {'users': ids, 'limit': 6})
+        page = response.json()
+        self.assertEqual([user['username'] for user in page['results']], [f'user{n:03}' for n in range(20, 26)])
+        self.assertEqual(page['results'][-1]['open'], 0)
+        rest = self.client.get(page['next']).json()
+        self.assertEqual([user['username'] for user in rest['results']], [f'user{n:03}' for n in range(26, 30)])
+        self.assertIsNone(rest['next'])
+
+
+class UserListTests(TestCase):
+    def setUp(self):
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.jane = User.objects.create(username='jdoe', first_name='Jane', last_name='Doe')
+        self.john = User.objects.create(username='jsmith', first_name='John', last_name='Smith')
+        self.ann = User.objects.create(username='alee', first_name='Ann', last_name='Lee')
+        self.project = Project.objects.create(title='Roster', owner=self.ann)
+
+    def usernames(self, response):
+        rows = response.json()
+        rows = rows['results'] if isinstance(rows, dict) else rows
+        return [row['username'] for row in rows]
+
+    def test_full_list_is_unchanged(self):
+        response = self.client.get('/api/users/')
+        self.assertEqual(self.usernames(response), ['alee', 'jdoe', 'jsmith'])
+        self.assertEqual(set(response.json()[0]), {'id', 'username', 'first_name', 'last_name'})
+
+    def test_prefix_search(self):
+        self.assertEqual(self.usernames(self.client.get('/api/users/', {'search': 'J'})), ['jdoe', 'jsmith'])
+        self.assertEqual(self.usernames(self.client.get('/api/users/', {'search': 'jo sm'})), ['jsmith'])
+        self.assertEqual(self.usernames(self.client.get('/api/users/', {'search': 'lee'})), ['alee'])
+        self.assertEqual(self.usernames(self.client.get('/api/users/', {'search': 'oe'})), [])
+
+    def test_cursor_pages(self):
+        page = self.client.get('/api/users/', {'cursor': '', 'limit': 2}).json()
+        self.assertEqual([row['username'] for row in page['results']], ['alee', 'jdoe'])
+        rest = self.client.get(page['next']).json()
+        self.assertEqual([row['username'] for row in rest['results']], ['jsmith'])
+        self.assertIsNone(rest['next'])
+
+    def test_roster_scope_follows_roster_changes(self):
+        url = '/api/users/'
+        self.project.team_roster.add(self.jane)
+        self.assertEqual(self.usernames(self.client.get(url, {'project': self.project.pk})), ['jdoe'])
+        self.john.team_projects.add(self.project)
+        self.assertEqual(self.usernames(self.client.get(url, {'project': self.project.pk})), ['jdoe', 'jsmith'])
+        self.jane.team_projects.clear()
+        response = self.client.get(url, {'project': self.project.pk})
+        self.assertEqual(self.usernames(response), ['jsmith'])
+        self.assertEqual(self.client.get(url, {'project': self.project.pk})['X-Cache'], 'HIT')
+
+
+class FastJSONTests(TestCase):
+    payload = {
+        'created': datetime.datetime(2026, 10, 17, 6, 30, 15, 250, tzinfo=datetime.timezone.utc),
+        'naive': datetime.datetime(2026, 10, 17, 6, 30),
+        'offset': datetime.datetime(2026, 10, 17, 6, 30, tzinfo=datetime.timezone(timedelta(hours=2))),
+        'due': datetime.date(2026, 10, 20),
+        'budget': Decimal('1250.50'),
+        'token': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'label': gettext_lazy('Active'),
+        'errors': {1: {'name': ['This field is required.']}},
+        'text': 'caf\u00e9 \u2028 \u2029',
+        'huge': 2 ** 70,
+        'nested': [{'tags': ('a', 'b')}, None, True, 1.5],
+    }
+
+    def test_renderer_matches_drf(self):
+        self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+        del self.payload['huge']
+        # without the 70-bit integer orjson encodes it itself
+        self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_parser_matches_drf(self):
+        body = JSONRenderer().render({'name': 'caf\u00e9', 'ids': [1, 2], 'nested': {'ok': None}})
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"name": NaN}'))
+
+    def test_falls_back_without_orjson(self):
+        with mock.patch('projects.renderers.orjson', None), mock.patch('projects.parsers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render({'due': datetime.date(2026, 1, 2)}), b'{"due":"2026-01-02"}')
+            self.assertEqual(FastJSONParser().parse(io.BytesIO(b'[1]')), [1])
+
+    def test_api_round_trip(self):
+        owner = User.objects.create(username='owner')
+        response = self.client.post(
+            '/api/projects/', json.dumps({'title': 'Caf\u00e9', 'owner': owner.pk, 'tags': ['x']}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.client.get(f"/api/projects/{response.json()['id']}/").json()['title'], 'Caf\u00e9')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class CompiledSerializerTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = User.objects.create(username='owner')
+        seed_projects(owner, 4, milestones=4)
+        today = timezone.now().date()
+        # nulls, a finished milestone, an empty roster and non-ASCII text
+        odd = Project.objects.create(title='Caf\u00e9 \u2028', owner=owner, tags=[], status='on_hold')
+        Milestone.objects.create(project=odd, name='Unassigned', due_date=None)
+        Milestone.objects.create(project=odd, name='Done', due_date=today - timedelta(days=3), completed=True, priority='high')
+        Milestone.objects.create(project=odd, name='Late', due_date=today - timedelta(days=1), assigned_to=owner)
+        Project.objects.create(title='Empty', owner=owner, description='')
+
+    def assertSameOutput(self, compiled, expected):
+        # compared rendered, dates are left for the renderer to format
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            self.assertEqual(renderer.render(compiled), renderer.render(expected))
+        self.assertEqual(JSONRenderer().render(compiled), FastJSONRenderer().render(expected))
+
+    def test_projects_match_drf(self):
+        projects = Project.objects.order_by('id')
+        compiled = CompiledProjectSerializer()
+        self.assertSameOutput(
+            compiled.represent(compiled.values(projects)),
+            ProjectSerializer(projects.with_related(), many=True).data,
+        )
+
+    def test_field_subsets_match_drf(self):
+        projects = Project.objects.order_by('-last_updated')
+        for fields in (ProjectListSerializer.Meta.fields, ['id', 'owner_name', 'team_roster'], []):
+            compiled = CompiledProjectSerializer(fields=fields)
+            expected = [{name: item[name] for name in fields} for item in ProjectSerializer(projects.with_related(), many=True).data]
+            self.assertSameOutput(compiled.represent(compiled.values(projects)), expected)
+
+    def test_milestones_match_drf(self):
+        milestones = Milestone.objects.order_by('due_date', 'id')
+        compiled = CompiledMilestoneSerializer()
+        self.assertSameOutput(
+            compiled.represent(compiled.values(milestones)),
+            MilestoneSerializer(milestones.select_related('assigned_to'), many=True).data,
+        )
+        with timezone.override('America/New_York'):
+            compiled = CompiledMilestoneSerializer()
+            self.assertSameOutput(compiled.represent(compiled.values(milestones)), MilestoneSerializer(milestones, many=True).data)
+
+    def test_endpoints_match_drf(self):
+        projects = ProjectSerializer(Project.objects.with_related().order_by('-last_updated', '-id'), many=True).data
+        response = self.client.get('/api/projects/', {'expand': 'milestones', 'limit': 100})
+        self.assertSameOutput(response.data['results'], projects)
+
+        # keyset cursors are built from the values() rows
+        seen, url = [], '/api/projects/advanced_search/?cursor=&limit=2&expand=milestones'
+        while url:
+            response = self.client.get(url).json()
+            seen += response['results']
+            url = response['next']
+        self.assertSameOutput(seen, projects)
+
+        milestones = Milestone.objects.filter(due_date__lt=timezone.now().date(), completed=False).order_by('due_date')
+        self.assertSameOutput(self.client.get('/api/milestones/overdue/').data, MilestoneSerializer(milestones, many=True).data)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(username='owner')
+        self.project = seed_projects(self.owner, 5)[0]
+
+    def sync_response(self, view, path, data):
+        request = APIRequestFactory().get(path, data)
+        response = view(request)
+        response.render()
+        return response
+
+    def test_async_views_match_sync_views(self):
+        endpoints = [
+            (ProjectViewSet.as_view({'get': 'list'}), '/api/projects/', {'expand': 'milestones', 'owner': self.owner.pk}),
+            (ProjectViewSet.as_view({'get': 'advanced_search'}), '/api/projects/advanced_search/', {'search': 'Project', 'page_size': 2}),
+            (ProjectViewSet.as_view({'get': 'advanced_search'}), '/api/projects/advanced_search/', {'cursor': '', 'limit': 2, 'count': 'exact'}),
+            (MilestoneViewSet.as_view({'get': 'by_project'}), '/api/milestones/by_project/', {'project_id': self.project.pk}),
+            (MilestoneViewSet.as_view({'get': 'overdue'}), '/api/milestones/overdue/', {}),
+            (MilestoneViewSet.as_view({'get': 'due_soon'}), '/api/milestones/due_soon/', {'cursor': ''}),
+            (get_users, '/api/users/', {'search': 'owner'}),
+        ]
+        for view, path, data in endpoints:
+            with self.subTest(path=path, data=data):
+                response = self.client.get(path, data)
+                self.assertIsInstance(response, RenderedResponse)
+                expected = self.sync_response(view, path, data)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+
+    def test_errors_are_rendered(self):
+        response = self.client.get('/api/projects/advanced_search/', {'tags': 'x', 'tags_match': 'some'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/projects/', {'cursor': 'bad'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/users/', {'project': 'x'}).json(), {'error': 'project must be a project id'})
+
+    def test_writes_and_browsable_api_use_the_sync_views(self):
+        response = self.client.get('/api/projects/', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/html', response['Content-Type'])
+        response = self.client.post('/api/projects/', {'title': 'New', 'owner': self.owner.pk}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    async def test_asgi_request(self):
+        response = await self.async_client.get('/api/milestones/by_project/', {'project_id': self.project.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+
+# The feed only reads changes of transactions that ended, a TestCase's
+# own transaction would hold it back
+class ChangeFeedTests(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(username='owner')
+        self.projects = seed_projects(self.owner, 3, milestones=2)
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/projects/changes/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_batches_cover_everything_in_order(self):
+        projects, milestones, since = [], [], None
+        for batch in range(10):
+            changes = self.sync(since, limit=4)
+            self.assertLessEqual(len(changes['projects']) + len(changes['milestones']), 4)
+            projects += [project['id'] for project in changes['projects']]
+            milestones += [milestone['id'] for milestone in changes['milestones']]
+            since = changes['since']
+            if not changes['has_more']:
+                break
+        # objects that changed again in a later batch are sent again
+        self.assertEqual(sorted(set(projects)), sorted({project.pk for project in self.projects}))
+        self.assertEqual(sorted(set(milestones)), list(Milestone.objects.order_by('pk').values_list('pk', flat=True)))
+        self.assertEqual(self.sync(since)['projects'], [])
+
+    def test_only_changes_after_the_token_are_sent(self):
+        since = self.sync()['since']
+        updated, soft_deleted, purged = self.projects
+        milestone = updated.milestones.first()
+        removed = updated.milestones.last()
+        purged_milestones = list(purged.milestones.order_by('pk').values_list('pk', flat=True))
+        self.client.patch(f'/api/milestones/{milestone.pk}/', {'completed': True}, format='json')
+        self.client.delete(f'/api/milestones/{removed.pk}/')
+        self.client.delete(f'/api/projects/{soft_deleted.pk}/')
+        self.client.delete(f'/api/projects/{purged.pk}/permanent_delete/')
+
+        with self.assertNumQueries(4):
+            changes = self.sync(since)
+        self.assertEqual({project['id']: project['deleted'] for project in changes['projects']}, {
+            updated.pk: False, soft_deleted.pk: True,
+        })
+        self.assertEqual(
+            next(project for project in changes['projects'] if project['id'] == updated.pk)['progress'], 100,
+        )
+        self.assertEqual([milestone['id'] for milestone in changes['milestones']], [milestone.pk])
+        # the milestones of the purged project went with it
+        self.assertEqual(changes['deleted'], {
+            'projects': [purged.pk],
+            'milestones': [removed.pk, *purged_milestones],
+        })
+        self.assertFalse(changes['has_more'])
+
+    def test_rollup_recount_without_changes_is_not_sent(self):
+        since = self.sync()['since']
+        Project.objects.all().refresh_rollups()
+        self.assertEqual(self.sync(since)['projects'], [])
+
+    def test_long_transactions_hold_the_feed_back(self):
+        since = self.sync()['since']
+        written, commit = threading.Event(), threading.Event()
+
+        def import_projects():
+            with transaction.atomic():
+                Milestone.objects.create(project=self.projects[0], name='Slow')
+                written.set()
+                commit.wait(10)
+            connection.close()
+
+        thread = threading.Thread(target=import_projects)
+        thread.start()
+        try:
+            written.wait(10)
+            Milestone.objects.create(project=self.projects[1], name='Fast')
+            # sending Fast now would move the token past Slow
+            changes = self.sync(since)
+            self.assertEqual(changes['milestones'], [])
+        finally:
+            commit.set()
+            thread.join(10)
+        changes = self.sync(changes['since'])
+        self.assertEqual([milestone['name'] for milestone in changes['milestones']], ['Slow', 'Fast'])
+
+    @mock.patch('projects.views.BULK_INLINE_LIMIT', 1)
+    def test_job_deletes_are_sent(self):
+        since = self.sync()['since']
+        project = self.projects[0]
+        milestone_ids = list(project.milestones.order_by('pk').values_list('pk', flat=True))
+        response = self.client.delete(f'/api/projects/{project.pk}/permanent_delete/')
+        self.assertEqual(response.status_code, 202)
+        call_command('run_jobs', chunk_size=1, stdout=io.StringIO())
+        changes = self.sync(since)
+        self.assertEqual(changes['deleted'], {'projects': [project.pk], 'milestones': milestone_ids})
+
+    def test_bad_and_expired_tokens(self):
+        response = self.client.get('/api/projects/changes/', {'since': 'x'})
+        self.assertEqual(response.status_code, 400)
+        expired = encode_token((0, 0), issued_at=timezone.now() - timedelta(days=31))
+        response = self.client.get('/api/projects/changes/', {'since': expired})
+        self.assertEqual(response.status_code, 410)
+
+    def test_prune_changes(self):
+        kept, purged, removed = self.projects
+        kept.title = 'Renamed'
+        kept.save()
+        deleted_milestones = [*purged.milestones.values_list('pk', flat=True), removed.milestones.first().pk]
+        Project.objects.filter(pk=purged.pk).delete()
+        Milestone.objects.filter(pk=deleted_milestones[-1]).delete()
+        Change.objects.filter(kind=Change.PROJECT, object_id=purged.pk).update(
+            changed_at=timezone.now() - timedelta(days=31),
+        )
+        call_command('prune_changes', batch_size=3, stdout=io.StringIO())
+
+        # one change per object, the deleted milestones are kept for
+        # CHANGE_LOG_RETENTION_DAYS
+        milestones = [*Milestone.objects.values_list('pk', flat=True), *deleted_milestones]
+        self.assertCountEqual(
+            Change.objects.values_list('kind', 'object_id'),
+            [(Change.PROJECT, kept.pk), (Change.PROJECT, removed.pk)] + [(Change.MILESTONE, pk) for pk in milestones],
+        )
+
+
+class LiveEventTests(TestCase):
+    def setUp(self):
+        # published here, along with whatever earlier tests rolled back
+        with mock.patch.object(get_broker(), 'publish'), self.captureOnCommitCallbacks(execute=True):
+            self.owner = User.objects.create(username='owner')
+            self.project = Project.objects.create(title='Live', owner=self.owner)
+            self.milestone = Milestone.objects.create(project=self.project, name='First')
+            Milestone.objects.create(project=self.project, name='Second')
+
+    @mock.patch.object(get_broker(), 'has_listeners', return_value=True)
+    def test_writes_publish_one_delta_per_project_on_commit(self, has_listeners):
+        with mock.patch.object(get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.milestone.completed = True
+                self.milestone.save()
+                self.milestone.name = 'Renamed'
+                self.milestone.save()
+            publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+        publish.assert_called_once_with([
+            {'project': self.project.pk, 'progress': 50, 'health': 'warning', 'milestones': [self.milestone.pk]},
+        ])
+
+        milestone_id = self.milestone.pk
+        with mock.patch.object(get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.milestone.delete()
+        publish.assert_called_once_with([
+            {'project': self.project.pk, 'progress': 0, 'health': 'critical', 'milestones': [milestone_id]},
+        ])
+
+        with mock.patch.object(get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                project_id = self.project.pk
+                self.project.delete()
+        publish.assert_called_once_with([{'project': project_id, 'deleted': True}])
+
+    def test_nothing_published_without_listeners(self):
+        with mock.patch.object(get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.milestone.name = 'Renamed'
+                self.milestone.save()
+            # the projects are not even read
+            with self.assertNumQueries(0):
+                for callback in callbacks:
+                    callback()
+        publish.assert_not_called()
+
+    async def test_subscription_coalesces_filters_and_resyncs(self):
+        subscription = Subscription(project_ids={1, 2}, max_pending=2)
+        subscription.deliver([
+            {'project': 1, 'progress': 10, 'health': 'critical', 'milestones': [5]},
+            {'project': 3, 'progress': 0, 'health': 'good', 'milestones': [9]},
+            {'project': 1, 'progress': 20, 'health': 'critical', 'milestones': [4]},
+        ])
+        self.assertEqual(await subscription.next(1), [
+            {'project': 1, 'progress': 20, 'health': 'critical', 'milestones': [4, 5]},
+        ])
+        self.assertEqual(await subscription.next(0.01), [])
+
+        subscription.project_ids = None
+        subscription.deliver([{'project': project_id, 'deleted': True} for project_id in (1, 2, 3)])
+        self.assertIsNone(await subscription.next(1))
+        self.assertEqual(await subscription.next(0.01), [])
+
+    def test_notify_payloads_stay_under_the_limit(self):
+        deltas = [
+            {'project': project_id, 'progress': 0, 'health': 'good', 'milestones': list(range(2000))}
+            for project_id in range(3)
+        ] + [{'project': project_id, 'deleted': True} for project_id in range(1000)]
+        payloads = list(notify_payloads(deltas))
+        self.assertGreater(len(payloads), 1)
+        self.assertTrue(all(len(payload) < 8000 for payload in payloads))
+        decoded = [delta for payload in payloads for delta in json.loads(payload)]
+        self.assertEqual(len(decoded), len(deltas))
+        self.assertIsNone(decoded[0]['milestones'])
+
+    async def test_event_stream(self):
+        response = await self.async_client.get('/api/projects/events/', {'projects': self.project.pk})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b'retry: 5000\n\n')
+        get_broker().publish([
+            {'project': self.project.pk + 1, 'deleted': True},
+            {'project': self.project.pk, 'progress': 50, 'health': 'warning', 'milestones': [1]},
+        ])
+        self.assertEqual(
+            await anext(events),
+            b'event: progress\ndata: [{"project":%d,"progress":50,"health":"warning","milestones":[1]}]\n\n' % self.project.pk,
+        )
+        with override_settings(LIVE_EVENTS_HEARTBEAT=0.01):
+            self.assertEqual(await anext(events), b': keep-alive\n\n')
+        # the ASGI handler cancels the response when the client disconnects
+        reading = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0.01)
+        reading.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reading
+        self.assertFalse(get_broker().subscriptions)
+
+    def test_event_stream_errors(self):
+        response = self.client.get('/api/projects/events/', {'projects': 'x'})
+        self.assertEqual(response.status_code, 501)
+        response = self.client.post('/api/projects/events/')
+        self.assertEqual(response.status_code, 405)
+
+
+class PostgresBrokerTests(TransactionTestCase):
+    async def test_notifications_reach_subscribers(self):
+        broker = PostgresBroker()
+        subscription = broker.subscribe()
+        # give the listener time to connect
+        for attempt in range(50):
+            await asyncio.sleep(0.1)
+            await sync_to_async(broker.publish)([{'project': 1, 'deleted': True}])
+            deltas = await subscription.next(0.1)
+            if deltas:
+                break
+        self.assertEqual(deltas, [{'project': 1, 'deleted': True}])
+        # another process finds the listening connection
+        self.assertTrue(await sync_to_async(PostgresBroker().has_listeners)())
+        for listener in broker.listeners.values():
+            listener.cancel()
+
+    async def test_listener_connects_with_the_database_options(self):
+        import psycopg
+
+        broker = PostgresBroker()
+        with mock.patch.dict(connection.settings_dict['OPTIONS'], {'sslmode': 'disable'}), \
+                mock.patch.object(psycopg.AsyncConnection, 'connect', side_effect=psycopg.OperationalError) as connect:
+            listening = asyncio.ensure_future(broker.listen())
+            await asyncio.sleep(0.01)
+            listening.cancel()
+        params = connect.call_args.kwargs
+        self.assertEqual(params['sslmode'], 'disable')
+        self.assertEqual(params['application_name'], PostgresBroker.application_name)
+        self.assertNotIn('cursor_factory', params)
+
+
+@mock.patch('projects.views.BULK_INLINE_LIMIT', 2)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(username='owner')
+        self.projects = seed_projects(self.owner, 3)
+        self.ids = [project.pk for project in self.projects]
+
+    def run_jobs(self):
+        call_command('run_jobs', chunk_size=2, stdout=io.StringIO())
+
+    def job(self, response):
+        self.assertEqual(response.status_code, 202, response.content)
+        return self.client.get(response.json()['url']).json()
+
+    def test_large_bulk_update_is_queued(self):
+        response = self.client.post('/api/projects/bulk_update/', {
+            'ids': self.ids, 'status': 'on_hold', 'tags': ['Backend'],
+        }, format='json')
+        job = self.job(response)
+        self.assertEqual((job['status'], job['done'], job['total']), ('queued', 0, 3))
+        self.assertFalse(Project.objects.filter(status='on_hold').exists())
+
+        self.run_jobs()
+        job = self.job(response)
+        self.assertEqual((job['status'], job['done'], job['total']), ('succeeded', 3, 3))
+        self.assertEqual(job['result'], {'updated': 3})
+        for project in Project.objects.filter(pk__in=self.ids):
+            self.assertEqual((project.status, project.tags), ('on_hold', ['Frontend', 'Backend']))
+
+        # below the limit the request still runs inline
+        response = self.client.post('/api/projects/bulk_update_status/', {'ids': self.ids[:2], 'status': 'active'}, format='json')
+        self.assertEqual(response.json(), {'updated': 2, 'status': 'active'})
+        response = self.client.post('/api/projects/bulk_update_status/', {'ids': self.ids, 'status': 'nope'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_milestone_status_job_refreshes_rollups(self):
+        milestone_ids = list(Milestone.objects.filter(project=self.projects[0]).values_list('id', flat=True))
+        response = self.client.post('/api/milestones/bulk_update_status/', {
+            'milestone_ids': milestone_ids, 'completed': True,
+        }, format='json')
+        self.run_jobs()
+        self.assertEqual(self.job(response)['result'], {'updated': 3})
+        self.projects[0].refresh_from_db()
+        self.assertEqual(self.projects[0].progress, 100)
+
+    def test_permanent_delete_in_chunks(self):
+        project = self.projects[0]
+        response = self.client.delete(f'/api/projects/{project.pk}/permanent_delete/')
+        self.assertEqual(self.job(response)['total'], 4)
+        # hidden until the job gets to it
+        self.assertEqual(self.client.get(f'/api/projects/{project.pk}/').status_code, 404)
+
+        logged = Change.objects.latest('id').pk
+        self.run_jobs()
+        job = self.job(response)
+        self.assertEqual((job['status'], job['done']), ('succeeded', 4))
+        self.assertEqual(job['result'], {'milestones_deleted': 3, 'projects_deleted': 1})
+        self.assertFalse(Project.objects.filter(pk=project.pk).exists())
+        self.assertTrue(Change.objects.filter(pk__gt=logged, kind=Change.PROJECT, object_id=project.pk).exists())
+
+    def test_permanent_delete_with_milestones_added_meanwhile(self):
+        project = self.projects[0]
+        response = self.client.delete(f'/api/projects/{project.pk}/permanent_delete/')
+        for n in range(3):
+            Milestone.objects.create(project=project, name=f'Late {n}')
+
+        self.run_jobs()
+        job = self.job(response)
+        self.assertEqual((job['status'], job['done'], job['total']), ('succeeded', 4, 4))
+        self.assertEqual(job['result'], {'milestones_deleted': 6, 'projects_deleted': 1})
+        self.assertFalse(Project.objects.filter(pk=project.pk).exists())
+
+    def test_recover_refused_while_deleting(self):
+        project = self.projects[0]
+        response = self.client.delete(f'/api/projects/{project.pk}/permanent_delete/')
+        self.assertEqual(response.status_code, 202)
+        response = self.client.post(f'/api/projects/{project.pk}/recover/')
+        self.assertEqual(response.status_code, 409)
+        project.refresh_from_db()
+        self.assertTrue(project.deleted)
+
+        # a failed job leaves the project recoverable
+        Job.objects.update(status=Job.FAILED)
+        response = self.client.post(f'/api/projects/{project.pk}/recover/')
+        self.assertEqual(response.status_code, 200)
+        project.refresh_from_db()
+        self.assertFalse(project.deleted)
+
+    def test_permanent_delete_invalidates_per_chunk(self):
+        project = self.projects[0]
+        milestone_ids = list(project.milestones.order_by('pk').values_list('pk', flat=True))
+        self.client.delete(f'/api/projects/{project.pk}/permanent_delete/')
+        sent = []
+
+        def receiver(sender, project_ids=None, milestone_ids=(), **kwargs):
+            sent.append((project_ids, list(milestone_ids)))
+
+        projects_changed.connect(receiver)
+        self.addCleanup(projects_changed.disconnect, receiver)
+        self.run_jobs()
+        self.assertEqual(sent, [([project.pk], milestone_ids[:2]), ([project.pk], milestone_ids[2:])])
+
+    def test_failed_step_keeps_progress(self):
+        job = enqueue('project_bulk_update_status', {'ids': self.ids, 'status': 'on_hold'})
+        with mock.patch.object(ProjectStatusJob, 'update', side_effect=[2, RuntimeError('boom')]):
+            self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.done, job.error, job.result), (Job.FAILED, 2, 'boom', {'updated': 2}))
+
+    def test_expired_lease_is_taken_over(self):
+        job = enqueue('project_bulk_update_status', {'ids': self.ids, 'status': 'on_hold'})
+        stalled = claim_job()
+        self.assertIsNone(claim_job())
+        Job.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        resumed = claim_job()
+        self.assertEqual((resumed.pk, resumed.attempts), (job.pk, 2))
+
+        # the stalled worker finds the job is no longer its own
+        self.assertEqual(run_job(stalled).done, 0)
+        self.assertFalse(Project.objects.filter(status='on_hold').exists())
+        self.assertEqual(run_job(resumed, chunk_size=2).status, Job.SUCCEEDED)
+
+        # a job that keeps stopping its workers is given up on
+        job = enqueue('project_bulk_update_status', {'ids': self.ids, 'status': 'active'})
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=3, lease_expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertIsNone(claim_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+
+class JobClaimTests(TransactionTestCase):
+    def test_workers_skip_claimed_jobs(self):
+        first = enqueue('project_bulk_update_status', {'ids': [1], 'status': 'active'})
+        second = enqueue('project_bulk_update_status', {'ids': [2], 'status': 'active'})
+        claimed = []
+
+        def worker():
+            claimed.append(claim_job())
+            connection.close()
+
+        with transaction.atomic():
+            # another worker is claiming the oldest job
+            Job.objects.select_for_update().get(pk=first.pk)
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join(10)
+        self.assertEqual(claimed[0].pk, second.pk)
@@ -1,12 +1,37 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProjectViewSet, MilestoneViewSet, get_users
+from .async_views import async_read_view
+from .views import JobViewSet, ProjectViewSet, MilestoneViewSet, get_users, aget_users, project_events, response_cache_stats
 
 router = DefaultRouter()
 router.register(r'projects', ProjectViewSet, basename='project')
 router.register(r'milestones', MilestoneViewSet, basename='milestone')
+router.register(r'jobs', JobViewSet, basename='job')
 
-urlpatterns = [
+# The polled read endpoints answer GET with async views, ahead of the
+# router's routes for the same paths, which keep serving everything else
+async_urlpatterns = [
+    path('projects/', async_read_view(
+        ProjectViewSet.as_view({'get': 'list', 'post': 'create'}), ProjectViewSet.alist,
+    )),
+    path('projects/advanced_search/', async_read_view(
+        ProjectViewSet.as_view({'get': 'advanced_search'}), ProjectViewSet.aadvanced_search,
+    )),
+    path('milestones/by_project/', async_read_view(
+        MilestoneViewSet.as_view({'get': 'by_project'}), MilestoneViewSet.aby_project,
+    )),
+    path('milestones/overdue/', async_read_view(
+        MilestoneViewSet.as_view({'get': 'overdue'}), MilestoneViewSet.aoverdue,
+    )),
+    path('milestones/due_soon/', async_read_view(
+        MilestoneViewSet.as_view({'get': 'due_soon'}), MilestoneViewSet.adue_soon,
+    )),
+    path('users/', async_read_view(get_users, aget_users), name='users'),
+]
+
+urlpatterns = async_urlpatterns + [
+    # ahead of the router, which would read "events" as a project id
+    path('projects/events/', project_events, name='project-events'),
     path('', include(router.urls)),
-    path('users/', get_users, name='users'),
-]
\ No newline at end of file
+    path('cache-stats/', response_cache_stats, name='cache-stats'),
+]
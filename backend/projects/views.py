@@ -1,29 +1,289 @@
 # from django.shortcuts import render
-from rest_framework import viewsets, status, filters
+import csv
+import io
+from itertools import islice
+from datetime import date, timedelta
+
+from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.reverse import reverse
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
+from django.db.models import OuterRef, Prefetch
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q
 from django.contrib.auth.models import User
-from .models import Project, Milestone
-from .serializers import ProjectSerializer, MilestoneSerializer
+from .models import Job, Project, Milestone, workload_aggregates
+from .serializers import JobSerializer, ProjectSerializer, ProjectListSerializer, MilestoneSerializer, UserWorkloadSerializer, requested_fields
+from .compiled import CompiledMilestoneSerializer, CompiledProjectSerializer
+from .cache import cached_response, cache_stats
+from .changes import InvalidToken, changes_since, decode_token, token_expired
+from .jobs import enqueue
+from .live import get_broker
+from .renderers import FastJSONRenderer
+from .signals import projects_changed
+from .importer import IMPORT_CONTENT_TYPES, import_projects, read_records
+from .pagination import KeysetPagination, WorkloadPagination
+from .filters import ProjectFilter, ProjectSearchFilter, ProjectOrderingFilter, TAG_MATCH_CHOICES, split_tags, user_prefix_filter
 from django_filters.rest_framework import DjangoFilterBackend
 
+# Bulk requests touching more rows than this are queued as a job for the
+# worker (projects/jobs.py) and answered with 202 and the job
+BULK_INLINE_LIMIT = 1000
+
+
+# Open milestones listed per user by MilestoneViewSet.workload
+WORKLOAD_MILESTONES = 20
+WORKLOAD_MAX_MILESTONES = 100
+
+# Weeks of completion throughput ProjectViewSet.stats reports by default
+STATS_DEFAULT_WEEKS = 12
+
+# Projects fetched per server-side cursor round trip by ProjectViewSet.export
+EXPORT_CHUNK_SIZE = 1000
+# Export lines handed to the ASGI server per hop into the request's thread
+EXPORT_LINES_PER_HOP = 100
+
+# Changes per ProjectViewSet.changes response, by default and at most
+CHANGES_BATCH_SIZE = 500
+CHANGES_MAX_BATCH_SIZE = 2000
+
+# Milliseconds an event stream client waits before reconnecting
+EVENTS_RETRY = 5000
+
+EXPORT_PROJECT_FIELDS = [
+    'id', 'title', 'description', 'owner', 'owner_name', 'status', 'health',
+    'progress', 'tags', 'created_at', 'last_updated',
+]
+
+EXPORT_MILESTONE_FIELDS = [
+    'id', 'name', 'description', 'completed', 'due_date', 'completed_date',
+    'priority', 'assigned_to', 'assigned_to_name',
+]
+
+
+def export_project(project):
+    return {
+        'id': project.id,
+        'title': project.title,
+        'description': project.description,
+        'owner': project.owner_id,
+        'owner_name': project.owner.username,
+        'status': project.status,
+        'health': project.health,
+        'progress': project.progress,
+        'tags': project.tags,
+        'created_at': project.created_at,
+        'last_updated': project.last_updated,
+    }
+
+
+def export_milestone(milestone):
+    return {
+        'id': milestone.id,
+        'name': milestone.name,
+        'description': milestone.description,
+        'completed': milestone.completed,
+        'due_date': milestone.due_date,
+        'completed_date': milestone.completed_date,
+        'priority': milestone.priority,
+        'assigned_to': milestone.assigned_to_id,
+        'assigned_to_name': milestone.assigned_to.username if milestone.assigned_to else None,
+    }
+
+
+def ndjson_rows(projects):
+    encoder = DjangoJSONEncoder()
+    for project in projects:
+        row = export_project(project)
+        row['milestones'] = [export_milestone(milestone) for milestone in project.milestones.all()]
+        yield encoder.encode(row) + '\n'
+
+
+# csv.writer only needs an object with write(), this hands each line back
+class Echo:
+    def write(self, value):
+        return value
+
+
+def csv_rows(projects):
+    writer = csv.writer(Echo())
+    yield writer.writerow(
+        [f'project_{field}' for field in EXPORT_PROJECT_FIELDS]
+        + [f'milestone_{field}' for field in EXPORT_MILESTONE_FIELDS]
+    )
+    empty_milestone = [''] * len(EXPORT_MILESTONE_FIELDS)
+    for project in projects:
+        row = export_project(project)
+        row['tags'] = ';'.join(str(tag) for tag in row['tags'] or [])
+        project_columns = [row[field] for field in EXPORT_PROJECT_FIELDS]
+        milestones = project.milestones.all()
+        if not milestones:
+            yield writer.writerow(project_columns + empty_milestone)
+        for milestone in milestones:
+            milestone_row = export_milestone(milestone)
+            yield writer.writerow(project_columns + [milestone_row[field] for field in EXPORT_MILESTONE_FIELDS])
+
+
+async def aiterate_lines(lines):
+    """
+    The lines of a sync export generator as an async iterator. Given a sync
+    iterator, Django's ASGI handler reads it whole with sync_to_async(list)
+    before sending anything. Each batch is pulled in the request's own
+    thread, where the server-side cursor and its connection live.
+    """
+    next_lines = sync_to_async(lambda: list(islice(lines, EXPORT_LINES_PER_HOP)), thread_sensitive=True)
+    while batch := await next_lines():
+        yield ''.join(batch)
+
+
+# ?output= value: (content type, row generator)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_rows),
+    'csv': ('text/csv', csv_rows),
+}
+
+
+# Builds list responses from values() rows with the view's compiled
+# serializer (see compiled.py), and lets custom list actions serve keyset
+# pages when the request asks for a cursor
+class CursorPageMixin:
+    compiled_serializer_class = None
+
+    def get_compiled_serializer(self):
+        return self.compiled_serializer_class()
+
+    def compiled_list_response(self, queryset):
+        """The list action, paginated as configured"""
+        compiled = self.get_compiled_serializer()
+        rows = compiled.values(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.represent(page))
+        return Response(compiled.represent(rows))
+
+    def cursor_page_response(self, rows, compiled):
+        if not self.cursor_requested():
+            return None
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(compiled.represent(page))
+
+    def cursor_requested(self):
+        paginator = self.paginator
+        return paginator is not None and getattr(paginator, 'cursor_query_param', None) in self.request.query_params
+
+    # Twins of the above for the async handlers (see async_views.py), with
+    # the queries run through the async ORM
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+
+    async def acompiled_list_response(self, queryset):
+        compiled = self.get_compiled_serializer()
+        rows = compiled.values(queryset)
+        page = await self.apaginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(await compiled.arepresent(page))
+        return Response(await compiled.arepresent(rows))
+
+    async def acursor_page_response(self, rows, compiled):
+        if not self.cursor_requested():
+            return None
+        page = await self.apaginate_queryset(rows)
+        return self.get_paginated_response(await compiled.arepresent(page))
+
+
+# 202 response for a bulk request queued as a job (see BULK_INLINE_LIMIT)
+def job_accepted(request, job):
+    return Response({
+        "job": job.pk,
+        "status": job.status,
+        "url": reverse('job-detail', args=[job.pk], request=request),
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 # this handles all CRUD operations for project and also soft delete, restore, and bulk update.
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(CursorPageMixin, viewsets.ModelViewSet):
     queryset = Project.objects.filter(deleted=False).order_by('-last_updated')
     serializer_class = ProjectSerializer
+    compiled_serializer_class = CompiledProjectSerializer
     
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    # Enhanced search fields - now includes tags for better search
+    filter_backends = [DjangoFilterBackend, ProjectSearchFilter, ProjectOrderingFilter]
+    # Full-text search over title, description and tags (see Project.search_vector)
     search_fields = ['title', 'description', 'tags']
-    # filter fields
-    filterset_fields = ['status', 'owner', 'health']
+    # filter fields: status, owner, health and exact tags
+    filterset_class = ProjectFilter
     # ordering fields
     ordering_fields = ['title', 'created_at', 'last_updated', 'progress', 'health']
     ordering = ['-last_updated']
 
+    # actions returning many projects, these default to the slim representation
+    list_actions = ['list', 'advanced_search', 'deleted_projects']
+
+    def expand_milestones(self):
+        expand = self.request.query_params.get('expand', '')
+        return 'milestones' in [name.strip() for name in expand.split(',')]
+
+    def use_slim_serializer(self):
+        return self.action in self.list_actions and not self.expand_milestones()
+
+    def get_serializer_class(self):
+        if self.use_slim_serializer():
+            return ProjectListSerializer
+        return ProjectSerializer
+
+    def get_compiled_serializer(self):
+        """
+        List actions are read through the compiled serializer, with the
+        fields the DRF serializer would output for the request.
+        """
+        fields = self.get_serializer_class().Meta.fields
+        requested = requested_fields(self.request)
+        return self.compiled_serializer_class(fields=[name for name in fields if not requested or name in requested])
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.list_actions:
+            return queryset
+        return queryset.with_related()
+
+    @cached_response('project_list', lambda request: ['projects'])
+    def list(self, request, *args, **kwargs):
+        return self.compiled_list_response(self.filter_queryset(self.get_queryset()))
+
+    @cached_response('project_list', lambda request: ['projects'])
+    async def alist(self, request, *args, **kwargs):
+        # in a thread, validating ?owner= looks the user up
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        return await self.acompiled_list_response(queryset)
+
+    def numbered_page(self, request):
+        """(start, end) of the rows on the ?page=&page_size= page"""
+        page = int(request.query_params.get('page', 1))
+        page_size = int(request.query_params.get('page_size', 12))
+        start = (page - 1) * page_size
+        return start, start + page_size
+
+    def numbered_page_response(self, request, results, total_count):
+        page = int(request.query_params.get('page', 1))
+        page_size = int(request.query_params.get('page_size', 12))
+        return Response({
+            'results': results,
+            'count': total_count,
+            'next': f"?page={page + 1}" if page * page_size < total_count else None,
+            'previous': f"?page={page - 1}" if page > 1 else None,
+            'current_page': page,
+            'total_pages': (total_count + page_size - 1) // page_size
+        })
 
     # we override delete to softdelete 
     def destroy(self, request, *args, **kwargs):
@@ -36,6 +296,11 @@ class ProjectViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def recover(self, request, pk=None):
         project = Project.objects.get(pk=pk)
+        deleting = Job.objects.filter(
+            kind='project_permanent_delete', status__in=[Job.QUEUED, Job.RUNNING], payload__project=project.pk,
+        )
+        if deleting.exists():
+            return Response({"error": "project is being permanently deleted"}, status=status.HTTP_409_CONFLICT)
         project.deleted = False
         project.last_updated = timezone.now()
         project.save()
@@ -45,6 +310,15 @@ class ProjectViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['delete'])
     def permanent_delete(self, request, pk=None):
         project = Project.objects.get(pk=pk)
+        if project.milestones_total > BULK_INLINE_LIMIT:
+            # hidden right away, the job deletes the milestones in chunks
+            with transaction.atomic():
+                project.deleted = True
+                project.save()
+                job = enqueue('project_permanent_delete', {
+                    'project': project.pk, 'milestones': project.milestones_total,
+                })
+            return job_accepted(request, job)
         project.delete()  # This will permanently delete the project
         return Response({"status": "project permanently deleted"})
 
@@ -61,8 +335,16 @@ class ProjectViewSet(viewsets.ModelViewSet):
         ids = request.data.get('ids', [])
         status_value = request.data.get('status')
 
+        if status_value not in dict(Project.STATUS_CHOICES):
+            return Response({"error": f"Invalid status: {status_value}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > BULK_INLINE_LIMIT:
+            return job_accepted(request, enqueue('project_bulk_update_status', {'ids': ids, 'status': status_value}))
+
         with transaction.atomic():
             updated = Project.objects.filter(id__in=ids).update(status=status_value, last_updated=timezone.now())
+            projects_changed.send(sender=Project, project_ids=ids)
 
         return Response({"updated": updated, "status": status_value})
 
@@ -85,26 +367,25 @@ class ProjectViewSet(viewsets.ModelViewSet):
         if not ids:
             return Response({"error": "No project IDs provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-        updated_count = 0
-        
+        if status_value and status_value not in dict(Project.STATUS_CHOICES):
+            return Response({"error": f"Invalid status: {status_value}"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+            return Response({"error": "tags must be a list of strings"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # drop duplicate ids so a project is never counted twice across job chunks
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > BULK_INLINE_LIMIT:
+            return job_accepted(request, enqueue('project_bulk_update', {
+                'ids': ids, 'status': status_value, 'tags': tags,
+            }))
+
         try:
             with transaction.atomic():
-                projects = Project.objects.filter(id__in=ids, deleted=False)
-                
-                for project in projects:
-                    # Update status if provided
-                    if status_value:
-                        project.status = status_value
-                    
-                    # Add tags if provided (merge with existing tags)
-                    if tags:
-                        existing_tags = project.tags if project.tags else []
-                        # Merge tags and remove duplicates
-                        project.tags = list(set(existing_tags + tags))
-                    
-                    project.last_updated = timezone.now()
-                    project.save()
-                    updated_count += 1
+                # Status and tags don't affect progress or health, so this is
+                # a single UPDATE with the tag merge done by the database
+                updated_count = Project.objects.filter(id__in=ids, deleted=False).update_status_and_tags(
+                    status_value, tags,
+                )
 
                 return Response({
                     "updated": updated_count,
@@ -114,6 +395,39 @@ class ProjectViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    # Bulk import of projects with their milestones
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """
+        Create many projects with their milestones in one request.
+        The body is picked by Content-Type:
+        - application/x-ndjson: one project per line, milestones nested
+        - text/csv: the export CSV layout, one row per milestone
+        - application/json: an array of projects
+        Owners and assignees are given by id (owner, assigned_to) or by
+        username (owner_name, assigned_to_name). Pass ?dry_run=true to only
+        validate. Nothing is written unless every row is valid, errors are
+        reported per row.
+        """
+        content_type = request.content_type.partition(';')[0].strip()
+        input_format = IMPORT_CONTENT_TYPES.get(content_type)
+        if input_format is None:
+            return Response(
+                {"error": f"Unsupported content type: {content_type or 'none'}"},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true', 'yes')
+
+        # read the body as a stream instead of through request.data
+        result = import_projects(read_records(request.stream or io.BytesIO(), input_format), dry_run=dry_run)
+        if result['errors']:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif dry_run:
+            response_status = status.HTTP_200_OK
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response(result, status=response_status)
+
     # Get deleted projects
     @action(detail=False, methods=['get'])
     def deleted_projects(self, request):
@@ -126,11 +440,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         # Apply search if provided
         search_query = request.query_params.get('search', '')
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(tags__icontains=search_query)
-            )
+            queryset = queryset.search(search_query)
         
         # Apply filters
         status_filter = request.query_params.get('status')
@@ -141,62 +451,120 @@ class ProjectViewSet(viewsets.ModelViewSet):
         if health_filter:
             queryset = queryset.filter(health=health_filter)
         
-        # Apply ordering
-        ordering = request.query_params.get('ordering', '-last_updated')
-        queryset = queryset.order_by(ordering)
+        # Apply ordering, search results default to most relevant first
+        ordering = request.query_params.get('ordering')
+        if ordering:
+            queryset = queryset.order_by(ordering)
+        elif search_query:
+            queryset = queryset.order_by('-rank', '-last_updated')
+        else:
+            queryset = queryset.order_by('-last_updated')
         
+        # Keyset pages for ?cursor=, numbered pages otherwise
+        compiled = self.get_compiled_serializer()
+        rows = compiled.values(queryset)
+        response = self.cursor_page_response(rows, compiled)
+        if response is not None:
+            return response
+
         # Paginate results
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', 12))
-        
-        start = (page - 1) * page_size
-        end = start + page_size
-        
+        start, end = self.numbered_page(request)
         total_count = queryset.count()
-        results = queryset[start:end]
-        
-        # Serialize results
-        serializer = self.get_serializer(results, many=True)
-        
+        results = compiled.represent(rows[start:end])
+        return self.numbered_page_response(request, results, total_count)
+
+    # Tag facet counts
+    @action(detail=False, methods=['get'])
+    def tag_counts(self, request):
+        """
+        Number of active projects carrying each tag, honouring the same
+        search and filter parameters as the project list
+        """
+        queryset = self.filter_queryset(Project.objects.filter(deleted=False))
+        return Response(queryset.tag_counts())
+
+    # Portfolio dashboard totals
+    @action(detail=False, methods=['get'])
+    @cached_response('project_stats', lambda request: [], timeout=lambda: settings.STATS_CACHE_TIMEOUT)
+    def stats(self, request):
+        """
+        Dashboard totals over active projects, computed in the database:
+        counts by status and health, average progress, overdue milestones
+        per owner and per tag, and milestones completed per week.
+        - honours the same search and filter parameters as the project list
+        - since/until (YYYY-MM-DD) bound the weekly throughput, by default
+          the last STATS_DEFAULT_WEEKS weeks
+        Cached for STATS_CACHE_TIMEOUT seconds.
+        """
+        try:
+            until = date.fromisoformat(request.query_params['until']) if request.query_params.get('until') else timezone.now().date()
+            since = (
+                date.fromisoformat(request.query_params['since']) if request.query_params.get('since')
+                else until - timedelta(weeks=STATS_DEFAULT_WEEKS) + timedelta(days=1)
+            )
+        except ValueError:
+            return Response({"error": "since and until must be dates (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+        if since > until:
+            return Response({"error": "since must not be after until"}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(Project.objects.filter(deleted=False))
         return Response({
-            'results': serializer.data,
-            'count': total_count,
-            'next': f"?page={page + 1}" if end < total_count else None,
-            'previous': f"?page={page - 1}" if page > 1 else None,
-            'current_page': page,
-            'total_pages': (total_count + page_size - 1) // page_size
+            **queryset.portfolio_totals(),
+            'overdue_by_owner': queryset.overdue_by_owner(),
+            'overdue_by_tag': queryset.overdue_by_tag(),
+            'completed_per_week': queryset.completion_throughput(since, until),
         })
 
-    # Advanced search action
+    # Change feed for offline clients
     @action(detail=False, methods=['get'])
-    def advanced_search(self, request):
+    def changes(self, request):
         """
-        Advanced search with multiple criteria:
-        - search: free text search across title, description, and tags
-        - status: filter by project status
-        - owner: filter by project owner
-        - health: filter by project health
-        - tags: filter by specific tags (comma-separated)
-        - ordering: sort by field (prefix with - for descending)
+        What changed since the client last synced, so it downloads changes
+        rather than the full list:
+        - projects: created, updated or soft deleted projects, as listed
+        - milestones: created or updated milestones
+        - deleted: ids of permanently deleted projects and milestones
+        - since: pass back as ?since= for the next batch, without it the
+          feed starts from the beginning
+        - has_more: another batch is ready right away
+        - limit: changes per batch, CHANGES_BATCH_SIZE by default
+        410 means the client fell too far behind and must sync from scratch.
+        """
+        try:
+            limit = int(request.query_params.get('limit', CHANGES_BATCH_SIZE))
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), CHANGES_MAX_BATCH_SIZE)
+
+        position = None
+        if request.query_params.get('since'):
+            try:
+                position, issued_at = decode_token(request.query_params['since'])
+            except InvalidToken as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if token_expired(issued_at):
+                return Response(
+                    {"error": "since is older than the deletion history, sync from scratch"},
+                    status=status.HTTP_410_GONE,
+                )
+        return Response(changes_since(position, limit))
+
+    def advanced_search_queryset(self, request, queryset):
+        """
+        Applies the advanced_search parameters (search, status, owner,
+        health, tags, tags_match and ordering) to a project queryset
         """
         search_query = request.query_params.get('search', '')
         status_filter = request.query_params.get('status')
         owner_filter = request.query_params.get('owner')
         health_filter = request.query_params.get('health')
         tags_filter = request.query_params.get('tags', '')
-        ordering = request.query_params.get('ordering', '-last_updated')
-        
-        # Start with base queryset
-        queryset = Project.objects.filter(deleted=False)
+        ordering = request.query_params.get('ordering')
         
         # Apply search query
         if search_query:
-            # Search across title, description, and tags
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(tags__icontains=search_query)
-            )
+            # Full-text search across title, description, and tags
+            queryset = queryset.search(search_query)
         
         # Apply filters
         if status_filter:
@@ -206,41 +574,111 @@ class ProjectViewSet(viewsets.ModelViewSet):
         if health_filter:
             queryset = queryset.filter(health=health_filter)
         if tags_filter:
-            # Handle multiple tags (comma-separated)
-            tag_list = [tag.strip() for tag in tags_filter.split(',') if tag.strip()]
-            for tag in tag_list:
-                queryset = queryset.filter(tags__icontains=tag)
+            # Handle multiple tags (comma-separated), matched exactly
+            tags_match = request.query_params.get('tags_match', 'all')
+            if tags_match not in dict(TAG_MATCH_CHOICES):
+                raise ValidationError({"error": "tags_match must be 'all' or 'any'"})
+            queryset = queryset.with_tags(split_tags(tags_filter), tags_match)
         
-        # Apply ordering
-        queryset = queryset.order_by(ordering)
+        # Apply ordering, search results default to most relevant first
+        if ordering:
+            queryset = queryset.order_by(ordering)
+        elif search_query:
+            queryset = queryset.order_by('-rank', '-last_updated')
+        else:
+            queryset = queryset.order_by('-last_updated')
+        return queryset
+
+    # Streaming export of projects with their milestones
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every matching project with its milestones.
+        - output: "ndjson" (default, one project per line with nested
+          milestones) or "csv" (one row per milestone)
+        - accepts the same search, filter and ordering parameters as
+          advanced_search
+        Rows are read through a server-side cursor with milestones
+        prefetched per chunk, so memory stays flat however many rows match.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response({"error": "output must be 'ndjson' or 'csv'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        milestones = Milestone.objects.select_related('assigned_to').order_by('due_date', 'id')
+        queryset = self.advanced_search_queryset(
+            request,
+            Project.objects.filter(deleted=False).defer('search_vector').select_related('owner').prefetch_related(
+                Prefetch('milestones', queryset=milestones)
+            ),
+        )
+        projects = queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+        content_type, rows = EXPORT_FORMATS[output]
+        lines = rows(projects)
+        if isinstance(request._request, ASGIRequest):
+            lines = aiterate_lines(lines)
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="projects.{output}"'
+        return response
+
+    # Advanced search action
+    @action(detail=False, methods=['get'])
+    def advanced_search(self, request):
+        """
+        Advanced search with multiple criteria:
+        - search: full-text search across title, description, and tags,
+          every word matches as a prefix and titles also match fuzzily
+        - status: filter by project status
+        - owner: filter by project owner
+        - health: filter by project health
+        - tags: filter by exact tags (comma-separated)
+        - tags_match: "all" (default) or "any" of the given tags
+        - ordering: sort by field (prefix with - for descending), defaults to
+          relevance when searching
+        - fields: only return these fields (comma-separated)
+        - expand: pass "milestones" to include the nested milestones
+        - cursor: keyset pagination, pass it empty for the first page and
+          follow "next"; count=exact|approximate adds a total
+        """
+        # Start with base queryset
+        queryset = self.advanced_search_queryset(request, Project.objects.filter(deleted=False))
         
+        # Keyset pages for ?cursor=, numbered pages otherwise
+        compiled = self.get_compiled_serializer()
+        rows = compiled.values(queryset)
+        response = self.cursor_page_response(rows, compiled)
+        if response is not None:
+            return response
+
         # Paginate results
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', 12))
-        
-        start = (page - 1) * page_size
-        end = start + page_size
-        
+        start, end = self.numbered_page(request)
         total_count = queryset.count()
-        results = queryset[start:end]
-        
-        # Serialize results
-        serializer = self.get_serializer(results, many=True)
-        
-        return Response({
-            'results': serializer.data,
-            'count': total_count,
-            'next': f"?page={page + 1}" if end < total_count else None,
-            'previous': f"?page={page - 1}" if page > 1 else None,
-            'current_page': page,
-            'total_pages': (total_count + page_size - 1) // page_size
-        })
+        results = compiled.represent(rows[start:end])
+        return self.numbered_page_response(request, results, total_count)
+
+    async def aadvanced_search(self, request):
+        queryset = self.advanced_search_queryset(request, Project.objects.filter(deleted=False))
+        compiled = self.get_compiled_serializer()
+        rows = compiled.values(queryset)
+        response = await self.acursor_page_response(rows, compiled)
+        if response is not None:
+            return response
 
+        start, end = self.numbered_page(request)
+        total_count = await queryset.acount()
+        results = await compiled.arepresent(rows[start:end])
+        return self.numbered_page_response(request, results, total_count)
 
-class MilestoneViewSet(viewsets.ModelViewSet):
+
+class MilestoneViewSet(CursorPageMixin, viewsets.ModelViewSet):
     # CRUD for Milestones each belongs to a project
-    queryset = Milestone.objects.all().order_by('due_date')
+    queryset = Milestone.objects.select_related('assigned_to').order_by('due_date')
     serializer_class = MilestoneSerializer
+    compiled_serializer_class = CompiledMilestoneSerializer
+
+    def list(self, request, *args, **kwargs):
+        return self.compiled_list_response(self.filter_queryset(self.get_queryset()))
 
     def perform_create(self, serializer):
         print(f"Creating milestone with data: {serializer.validated_data}")
@@ -248,6 +686,7 @@ class MilestoneViewSet(viewsets.ModelViewSet):
 
     # Get milestones for a specific project
     @action(detail=False, methods=['get'])
+    @cached_response('milestones_by_project', lambda request: ['all_projects', f"project:{request.query_params.get('project_id')}"])
     def by_project(self, request):
         """
         Get all milestones for a specific project
@@ -257,48 +696,193 @@ class MilestoneViewSet(viewsets.ModelViewSet):
             return Response({"error": "project_id is required"}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            milestones = Milestone.objects.filter(project_id=project_id).order_by('due_date')
-            serializer = self.get_serializer(milestones, many=True)
-            return Response(serializer.data)
+            compiled = self.get_compiled_serializer()
+            milestones = compiled.values(Milestone.objects.filter(project_id=project_id).order_by('due_date'))
+            response = self.cursor_page_response(milestones, compiled)
+            if response is not None:
+                return response
+            return Response(compiled.represent(milestones))
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @cached_response('milestones_by_project', lambda request: ['all_projects', f"project:{request.query_params.get('project_id')}"])
+    async def aby_project(self, request):
+        project_id = request.query_params.get('project_id')
+        if not project_id:
+            return Response({"error": "project_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            compiled = self.get_compiled_serializer()
+            milestones = compiled.values(Milestone.objects.filter(project_id=project_id).order_by('due_date'))
+            response = await self.acursor_page_response(milestones, compiled)
+            if response is not None:
+                return response
+            return Response(await compiled.arepresent(milestones))
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     # Get overdue milestones
     @action(detail=False, methods=['get'])
+    @cached_response('overdue_milestones', lambda request: ['milestones'])
     def overdue(self, request):
         """
         Get all overdue milestones
         """
-        from django.utils import timezone
+        compiled = self.get_compiled_serializer()
+        overdue_milestones = compiled.values(self.overdue_queryset())
+
+        response = self.cursor_page_response(overdue_milestones, compiled)
+        if response is not None:
+            return response
+        return Response(compiled.represent(overdue_milestones))
+
+    @cached_response('overdue_milestones', lambda request: ['milestones'])
+    async def aoverdue(self, request):
+        compiled = self.get_compiled_serializer()
+        overdue_milestones = compiled.values(self.overdue_queryset())
+        response = await self.acursor_page_response(overdue_milestones, compiled)
+        if response is not None:
+            return response
+        return Response(await compiled.arepresent(overdue_milestones))
+
+    def overdue_queryset(self):
         today = timezone.now().date()
-        overdue_milestones = Milestone.objects.filter(
+        return Milestone.objects.filter(
             due_date__lt=today,
             completed=False
         ).order_by('due_date')
-        
-        serializer = self.get_serializer(overdue_milestones, many=True)
-        return Response(serializer.data)
 
     # Get milestones due soon
     @action(detail=False, methods=['get'])
+    @cached_response('due_soon_milestones', lambda request: ['milestones'])
     def due_soon(self, request):
         """
         Get milestones due within the next 7 days
         """
-        from django.utils import timezone
-        from datetime import timedelta
-        
+        compiled = self.get_compiled_serializer()
+        due_soon_milestones = compiled.values(self.due_soon_queryset())
+
+        response = self.cursor_page_response(due_soon_milestones, compiled)
+        if response is not None:
+            return response
+        return Response(compiled.represent(due_soon_milestones))
+
+    @cached_response('due_soon_milestones', lambda request: ['milestones'])
+    async def adue_soon(self, request):
+        compiled = self.get_compiled_serializer()
+        due_soon_milestones = compiled.values(self.due_soon_queryset())
+        response = await self.acursor_page_response(due_soon_milestones, compiled)
+        if response is not None:
+            return response
+        return Response(await compiled.arepresent(due_soon_milestones))
+
+    def due_soon_queryset(self):
         today = timezone.now().date()
         due_soon_date = today + timedelta(days=7)
-        
-        due_soon_milestones = Milestone.objects.filter(
+        return Milestone.objects.filter(
             due_date__lte=due_soon_date,
             due_date__gte=today,
             completed=False
         ).order_by('due_date')
-        
-        serializer = self.get_serializer(due_soon_milestones, many=True)
-        return Response(serializer.data)
+
+    # Open, overdue and due-soon milestones per assignee
+    @action(detail=False, methods=['get'], pagination_class=WorkloadPagination)
+    @cached_response('milestone_workload', lambda request: ['milestones', 'users'])
+    def workload(self, request):
+        """
+        Open assigned milestones per user with their open, overdue and
+        due-soon counts, read with one grouped query for the page of users
+        and one query for their listed milestones
+        - users: comma-separated user ids, by default every user with open
+          assigned milestones
+        - milestones: how many of each user's open milestones to list,
+          soonest due first (default 20, at most 100)
+        Pages by cursor (?cursor=, ?limit=), ordered by username
+        """
+        user_ids = request.query_params.get('users', '')
+        try:
+            user_ids = [int(pk) for pk in user_ids.split(',') if pk.strip()]
+            listed = int(request.query_params.get('milestones', WORKLOAD_MILESTONES))
+        except ValueError:
+            return Response({"error": "users must be comma-separated user ids and milestones a number"}, status=status.HTTP_400_BAD_REQUEST)
+        listed = max(0, min(listed, WORKLOAD_MAX_MILESTONES))
+
+        today = timezone.now().date()
+        # each user's soonest open milestones, probed per user on
+        # milestone_assignee_idx inside the grouped query
+        listed_ids = ArraySubquery(
+            Milestone.objects.filter(assigned_to=OuterRef('pk'), completed=False)
+            .order_by('due_date', 'id')
+            .values('id')[:listed]
+        )
+        users = (
+            User.objects.annotate(**workload_aggregates(today), open_milestone_ids=listed_ids)
+            .order_by('username')
+        )
+        if user_ids:
+            users = users.filter(pk__in=user_ids)
+        else:
+            users = users.filter(open__gt=0)
+
+        page = self.paginate_queryset(users)
+        milestones = (
+            Milestone.objects.select_related('project')
+            .only('id', 'name', 'due_date', 'priority', 'completed', 'assigned_to', 'project__id', 'project__title')
+            .in_bulk([pk for user in page for pk in user.open_milestone_ids or []])
+        )
+        for user in page:
+            user.open_milestones = [milestones[pk] for pk in user.open_milestone_ids or [] if pk in milestones]
+
+        serializer = UserWorkloadSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    # Create, update or delete many milestones in one transaction
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        POST: a list of milestones to create
+        PATCH: a list of partial milestones, each with its "id"
+        DELETE: {"ids": [1, 2, 3]}
+        The whole list is applied in one transaction and the progress and
+        health of every affected project is recounted once.
+        """
+        if request.method == 'DELETE':
+            ids = request.data.get('ids') if isinstance(request.data, dict) else None
+            if not ids or not isinstance(ids, list):
+                return Response({"error": "ids is required"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                ids = [int(pk) for pk in ids]
+            except (TypeError, ValueError):
+                return Response({"error": "ids must be a list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                milestones = Milestone.objects.filter(id__in=ids)
+                affected_projects = list(milestones.values_list('project_id', flat=True).order_by().distinct())
+                # a queryset delete skips Milestone.delete(), the rollups are recounted below
+                deleted, _ = milestones.delete()
+                Project.objects.filter(pk__in=affected_projects).refresh_rollups()
+            return Response({"deleted": deleted, "affected_projects": len(affected_projects)})
+
+        if not isinstance(request.data, list) or not request.data:
+            return Response({"error": "Expected a non-empty list of milestones"}, status=status.HTTP_400_BAD_REQUEST)
+
+        instance = None
+        if request.method == 'PATCH':
+            ids = []
+            for item in request.data:
+                try:
+                    ids.append(int(item['id']))
+                except (KeyError, TypeError, ValueError):
+                    pass
+            instance = list(Milestone.objects.filter(id__in=ids).select_related('assigned_to'))
+
+        serializer = self.get_serializer(instance, data=request.data, many=True, partial=request.method == 'PATCH')
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK,
+        )
 
     # Bulk update milestone status
     @action(detail=False, methods=['post'])
@@ -311,25 +895,32 @@ class MilestoneViewSet(viewsets.ModelViewSet):
         
         if not milestone_ids:
             return Response({"error": "milestone_ids is required"}, status=status.HTTP_400_BAD_REQUEST)
-        
+
+        milestone_ids = list(dict.fromkeys(milestone_ids))
+        if len(milestone_ids) > BULK_INLINE_LIMIT:
+            return job_accepted(request, enqueue('milestone_bulk_update_status', {
+                'ids': milestone_ids, 'completed': bool(completed),
+            }))
+
         try:
             with transaction.atomic():
+                affected_projects = list(
+                    Milestone.objects.filter(id__in=milestone_ids)
+                    .values_list('project_id', flat=True)
+                    .order_by()
+                    .distinct()
+                )
+
                 updated = Milestone.objects.filter(id__in=milestone_ids).update(
                     completed=completed,
-                    completed_date=timezone.now().date() if completed else None
+                    completed_date=timezone.now().date() if completed else None,
+                    updated_at=timezone.now(),
                 )
-                
-                # Update project progress and health for affected projects
-                affected_projects = set()
-                for milestone in Milestone.objects.filter(id__in=milestone_ids):
-                    if milestone.project:
-                        affected_projects.add(milestone.project)
-                
-                for project in affected_projects:
-                    project.progress = project.calculate_progress()
-                    project.health = project.calculate_health()
-                    project.save(update_fields=['progress', 'health'])
-                
+
+                # Update project progress and health for affected projects,
+                # recounted with one grouped query and written with bulk_update
+                Project.objects.filter(pk__in=affected_projects).refresh_rollups()
+
                 return Response({
                     "updated": updated,
                     "completed": completed,
@@ -339,16 +930,112 @@ class MilestoneViewSet(viewsets.ModelViewSet):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+# Status and progress of the jobs queued by the bulk endpoints
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Job.objects.order_by('-id')
+    serializer_class = JobSerializer
+
+
 # Simple view to get users for milestone assignment
 from rest_framework.decorators import api_view
 
+def users_scopes(request):
+    return ['users', f"roster:{request.query_params.get('project', '')}"]
+
+
+def users_queryset(request):
+    """The users get_users lists, raises ValidationError for a bad project id"""
+    users = User.objects.all()
+    search = request.query_params.get('search', '').strip()
+    if search:
+        users = users.filter(user_prefix_filter(search))
+    project_id = request.query_params.get('project')
+    if project_id:
+        try:
+            users = users.filter(team_projects=int(project_id))
+        except ValueError:
+            raise ValidationError({"error": "project must be a project id"})
+    return users.values('id', 'username', 'first_name', 'last_name').order_by('username', 'id')
+
+
 @api_view(['GET'])
+@cached_response('users', users_scopes)
 def get_users(request):
     """
     Get list of users for milestone assignment
+    - search: typeahead, every word must start the username, first name
+      or last name
+    - project: only users on that project's team roster
+    - cursor: keyset pages ordered by username (?cursor=&limit=)
+    Without parameters the full list is returned, cached with an ETag.
+    """
+    users = users_queryset(request)
+    paginator = KeysetPagination()
+    if paginator.cursor_query_param in request.query_params:
+        page = paginator.paginate_queryset(users, request)
+        return paginator.get_paginated_response(page)
+    return Response(list(users))
+
+
+# get_users for async_read_view
+@cached_response('users', users_scopes)
+async def aget_users(view, request):
+    users = users_queryset(request)
+    paginator = KeysetPagination()
+    if paginator.cursor_query_param in request.query_params:
+        page = await paginator.apaginate_queryset(users, request)
+        return paginator.get_paginated_response(page)
+    return Response([user async for user in users])
+
+
+@api_view(['GET'])
+def response_cache_stats(request):
     """
-    try:
-        users = User.objects.all().values('id', 'username', 'first_name', 'last_name')
-        return Response(list(users))
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+    Hit/miss counts of the cached read endpoints
+    """
+    return Response(cache_stats())
+
+
+@require_GET
+async def project_events(request):
+    """
+    Server-sent events pushing progress and health changes of projects, in
+    place of polling the project list. Each `progress` event holds a JSON
+    list of deltas, {"project", "progress", "health", "milestones"} with the
+    ids of the milestones changed, or {"project", "deleted": true}.
+    - projects: comma separated ids of the projects to follow, all by default
+    A `resync` event means updates were dropped, the client reloads what it
+    shows and keeps reading. Comments are sent on idle streams to keep the
+    connection open. Served by the ASGI application only.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Event streams need the ASGI server"}, status=501)
+    project_ids = None
+    if request.GET.get('projects'):
+        try:
+            project_ids = {int(project_id) for project_id in request.GET['projects'].split(',')}
+        except ValueError:
+            return JsonResponse({"error": "projects must be a comma separated list of project ids"}, status=400)
+
+    async def events():
+        broker = get_broker()
+        subscription = broker.subscribe(project_ids)
+        render = FastJSONRenderer().render
+        try:
+            yield f'retry: {EVENTS_RETRY}\n\n'.encode()
+            while True:
+                deltas = await subscription.next(settings.LIVE_EVENTS_HEARTBEAT)
+                if deltas is None:
+                    yield b'event: resync\ndata: {}\n\n'
+                elif deltas:
+                    yield b'event: progress\ndata: ' + render(deltas) + b'\n\n'
+                else:
+                    yield b': keep-alive\n\n'
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response